@@ -0,0 +1,167 @@
+"""
+YOLO一括検出エンジン（image_processing_sub.py のGUIなし・バッチ版）
+画像ディレクトリまたはパス一覧を走査し、検出結果を JSON Lines に1画像1行で書き出す
+- モデルは1回だけ読み込む
+- 画像の読み込み・デコードはスレッドプールで先読みし、推論と並行して進める
+  （JPEGは推論サイズ以上を保つ範囲で縮小デコードし、検出座標は元画像の座標に戻す）
+- batch_size 枚ずつまとめて1回のモデル呼び出しで推論する
+- 出力済みの画像は再実行時に飛ばす（中断再開対応）
+
+実行例: python batch_detection_engine.py <画像ディレクトリ|パス一覧.txt> [出力.jsonl] [バッチサイズ]
+"""
+
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from ultralytics import YOLO
+
+from image_io import imread_reduced, iter_image_paths
+
+# JSON Lines のチェックポイント用ヘルパーは research/experiments にある
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "experiments"))
+from jsonl_checkpoint import iter_jsonl_records, open_jsonl_for_append
+
+
+def results_to_objects(results, scale=(1.0, 1.0)):
+    """
+    YOLOの1画像分の結果を物体情報のリストに変換（image_processing_sub.py と同じ形式）
+    scale: 縮小デコードした画像で推論した場合の、元画像座標への (x, y) 倍率
+    """
+    objects = []
+    for x1, y1, x2, y2, conf, cls in results.boxes.data.cpu().numpy():
+        x1, x2 = x1 * scale[0], x2 * scale[0]
+        y1, y2 = y1 * scale[1], y2 * scale[1]
+        objects.append({
+            "bbox": [int(x1), int(y1), int(x2 - x1), int(y2 - y1)],
+            "center": (int((x1 + x2) / 2), int((y1 + y2) / 2)),
+            "label": results.names[int(cls)],
+            "confidence": float(conf)
+        })
+    return objects
+
+
+class BatchDetectionEngine:
+    def __init__(self, model="yolov8n.pt", batch_size=16, io_workers=4, prefetch_batches=4,
+                 conf=0.25, imgsz=640, device=None, reduced_decode=True):
+        """
+        model: 重みファイルのパス、または読み込み済みのモデル
+        prefetch_batches: 推論中に先読みしておくバッチ数（メモリ使用量の上限）
+        reduced_decode: 推論サイズ imgsz に必要な解像度までの縮小デコードを使う
+        """
+        self.model = YOLO(model) if isinstance(model, (str, Path)) else model
+        self.batch_size = batch_size
+        self.io_workers = io_workers
+        self.prefetch_batches = prefetch_batches
+        self.decode_size = (imgsz, imgsz) if reduced_decode else None
+        self.predict_options = {"conf": conf, "imgsz": imgsz, "verbose": False}
+        if device is not None:
+            self.predict_options["device"] = device
+
+    def load_completed(self, output_path):
+        """既存の出力から処理済みの画像パスを復元"""
+        completed = set()
+        if not output_path.exists():
+            return completed
+        # 中断時に途中まで書かれた最終行は未処理扱い
+        completed.update(record["path"] for record in iter_jsonl_records(output_path) if "path" in record)
+        return completed
+
+    def _decode(self, path):
+        """ワーカースレッドで実行（cv2.imdecode はGILを解放する）"""
+        try:
+            image, original_size = imread_reduced(path, max_size=self.decode_size)
+            return path, (image, original_size) if image is not None else None, None
+        except OSError as e:
+            return path, None, str(e)
+
+    def _infer(self, batch, writer, stats):
+        """デコード済みの1バッチを1回のモデル呼び出しで推論して書き出す"""
+        decoded = [(path, image) for path, image, _ in batch if image is not None]
+        start = time.perf_counter()
+        results = self.model([img for _, (img, _) in decoded], **self.predict_options) if decoded else []
+        stats["inference_seconds"] += time.perf_counter() - start
+
+        detections = {path: (image, result) for (path, image), result in zip(decoded, results)}
+        for path, _, error in batch:
+            if path in detections:
+                (img, (width, height)), result = detections[path]
+                scale = (width / img.shape[1], height / img.shape[0])
+                record = {
+                    "path": path,
+                    "width": width,
+                    "height": height,
+                    "detections": results_to_objects(result, scale)
+                }
+            else:
+                record = {"path": path, "error": error or "画像を読み込めませんでした"}
+                stats["failed"] += 1
+            writer.write(json.dumps(record, ensure_ascii=False) + "\n")
+            stats["processed"] += 1
+        writer.flush()
+
+    def run(self, source, output_path="output/detections.jsonl", resume=True, progress_every=1000):
+        """source 内の全画像を検出し、output_path に追記"""
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        completed = self.load_completed(output_path) if resume else set()
+        paths = (path for path in iter_image_paths(source) if path not in completed)
+
+        stats = {"processed": 0, "failed": 0, "skipped": len(completed), "inference_seconds": 0.0}
+        max_in_flight = self.batch_size * self.prefetch_batches
+        start = time.perf_counter()
+        next_progress = progress_every
+
+        with ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="ImageDecoder") as executor, \
+                open_jsonl_for_append(output_path) as writer:
+            # 入力順を保ったまま先読み（完了待ちは先頭から）
+            in_flight = deque()
+            for path in paths:
+                in_flight.append(executor.submit(self._decode, path))
+                if len(in_flight) >= max_in_flight:
+                    self._infer([in_flight.popleft().result() for _ in range(self.batch_size)],
+                                writer, stats)
+                if stats["processed"] >= next_progress:
+                    elapsed = time.perf_counter() - start
+                    print(f"  📈 {stats['processed']}枚処理 ({stats['processed'] / elapsed:.1f} 枚/秒)")
+                    next_progress += progress_every
+            while in_flight:
+                count = min(self.batch_size, len(in_flight))
+                self._infer([in_flight.popleft().result() for _ in range(count)], writer, stats)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "output": str(output_path),
+            "processed": stats["processed"],
+            "failed": stats["failed"],
+            "skipped": stats["skipped"],
+            "elapsed_seconds": round(elapsed, 3),
+            "inference_seconds": round(stats["inference_seconds"], 3),
+            # 推論以外（読み込み待ち・書き出し）に使われた時間の割合
+            "io_wait_ratio": round(1 - stats["inference_seconds"] / elapsed, 3) if elapsed > 0 else 0.0,
+            "images_per_second": round(stats["processed"] / elapsed, 2) if elapsed > 0 else 0.0
+        }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("使い方: python batch_detection_engine.py <画像ディレクトリ|パス一覧.txt> [出力.jsonl] [バッチサイズ]")
+        return
+
+    source = sys.argv[1]
+    output_path = sys.argv[2] if len(sys.argv) > 2 else "output/detections.jsonl"
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+
+    engine = BatchDetectionEngine(batch_size=batch_size)
+    summary = engine.run(source, output_path)
+    print(f"処理: {summary['processed']}枚（失敗 {summary['failed']}、再開スキップ {summary['skipped']}）")
+    print(f"所要時間: {summary['elapsed_seconds']}秒（推論 {summary['inference_seconds']}秒）")
+    print(f"スループット: {summary['images_per_second']} 枚/秒")
+    print(f"出力: {summary['output']}")
+
+
+if __name__ == "__main__":
+    main()
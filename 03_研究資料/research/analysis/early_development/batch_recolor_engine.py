@@ -0,0 +1,233 @@
+"""
+範囲塗りつぶしの一括処理エンジン（image_processing_main.py の色調整をGUIなしで多数の画像に適用）
+image_processing_main.py で記録した操作（範囲と色）のリストを、ディレクトリ内の全画像に順に適用して保存する
+- ファイル単位でプロセスプールに分配し、全コアで並列に処理する
+- 入力はメモリマップから直接デコードし、デコードした配列の範囲にその場で色を代入する
+  （画像全体の複製や塗りつぶし用の配列は作らない）
+- 保存は imwrite_jp で一時ファイルに書いてから置き換える（中断しても書きかけの画像が出力済み扱いにならない）
+- 出力は入力の基準ディレクトリからの相対パスを保つ（パス一覧入力では全画像に共通するディレクトリが基準）
+- 出力済みの画像は再実行時に飛ばす（中断再開対応）
+
+操作ファイル（JSON）: [{"roi": [x1, y1, x2, y2], "color": [R, G, B], "mode": "RGB"}, ...]
+  mode が "HSV" の場合 color は [H, S, V]（OpenCVの値域）
+  "relative": true の場合 roi は画像の幅・高さに対する割合（0〜1）
+
+実行例: python batch_recolor_engine.py <操作.json> <画像ディレクトリ|パス一覧.txt> <出力ディレクトリ> [拡張子]
+"""
+
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from image_io import imread_jp, imwrite_jp, iter_image_paths
+
+# ワーカープロセスごとの操作リスト（初期化時に1回だけ受け取る）
+_worker_operations = None
+_worker_params = ()
+
+
+def load_operations(path):
+    """操作ファイルを読み込む（{"operations": [...]} 形式も受け付ける）"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["operations"] if isinstance(data, dict) else data
+
+
+def save_operations(path, operations):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(operations, f, ensure_ascii=False, indent=2)
+
+
+def operation_color_bgr(color, mode="RGB"):
+    """操作の色（RGB または HSV の順）を塗りつぶし用の BGR に変換"""
+    if mode == "RGB":
+        return int(color[2]), int(color[1]), int(color[0])
+    hsv_pixel = np.array([[color]], dtype=np.uint8)
+    return tuple(int(v) for v in cv2.cvtColor(hsv_pixel, cv2.COLOR_HSV2BGR)[0, 0])
+
+
+def resolve_roi(roi, width, height, relative=False):
+    """範囲を画像内の整数座標 (x1, y1, x2, y2) に直す。空になる場合は None"""
+    x1, y1, x2, y2 = roi
+    if relative:
+        x1, x2 = x1 * width, x2 * width
+        y1, y2 = y1 * height, y2 * height
+    x1, x2 = sorted((max(0, min(int(round(x1)), width)), max(0, min(int(round(x2)), width))))
+    y1, y2 = sorted((max(0, min(int(round(y1)), height)), max(0, min(int(round(y2)), height))))
+    if x1 == x2 or y1 == y2:
+        return None
+    return x1, y1, x2, y2
+
+
+def prepare_operations(operations):
+    """色の変換を先に済ませた操作リスト [(roi, relative, BGR), ...]"""
+    return [(tuple(op["roi"]), bool(op.get("relative", False)),
+             operation_color_bgr(op["color"], op.get("mode", "RGB")))
+            for op in operations]
+
+
+def apply_operations(image, prepared):
+    """準備済みの操作を画像（BGR）にその場で適用"""
+    height, width = image.shape[:2]
+    for roi, relative, bgr in prepared:
+        rect = resolve_roi(roi, width, height, relative)
+        if rect is not None:
+            x1, y1, x2, y2 = rect
+            image[y1:y2, x1:x2] = bgr  # 色はブロードキャストで代入
+    return image
+
+
+def _init_worker(prepared, params):
+    global _worker_operations, _worker_params
+    _worker_operations = prepared
+    _worker_params = params
+    cv2.setNumThreads(1)  # 並列化はプロセス単位で行う
+
+
+def _recolor_files(tasks):
+    """ワーカープロセスで (入力パス, 出力パス) のまとまりを処理"""
+    results = []
+    for src, dst in tasks:
+        try:
+            image = imread_jp(src)
+            if image is None:
+                results.append((src, "画像を読み込めませんでした"))
+                continue
+            apply_operations(image, _worker_operations)
+            os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+            if not imwrite_jp(dst, image, _worker_params):
+                results.append((src, "保存に失敗しました"))
+                continue
+            results.append((src, None))
+        except (OSError, cv2.error) as e:
+            results.append((src, str(e)))
+    return results
+
+
+class BatchRecolorEngine:
+    def __init__(self, operations, workers=None, output_ext=None, encode_params=(), chunksize=16):
+        """
+        operations: 操作のリスト（load_operations の形式）
+        output_ext: 出力の拡張子（".png" など。省略時は入力と同じ）
+        encode_params: cv2.IMWRITE_* の指定（例: [cv2.IMWRITE_JPEG_QUALITY, 95]）
+        chunksize: 1回でワーカーに渡す画像数
+        """
+        self.prepared = prepare_operations(operations)
+        self.workers = workers or os.cpu_count() or 1
+        self.output_ext = output_ext
+        self.encode_params = tuple(encode_params)
+        self.chunksize = chunksize
+
+    @staticmethod
+    def base_directory(source):
+        """
+        出力の相対パスの基準（ディレクトリ入力はそのディレクトリ、パス一覧入力は全画像に共通する最も深いディレクトリ）
+        パス一覧は1行ずつ読み、全パスは保持しない。共通のディレクトリが無い場合（ドライブが異なる）は None
+        """
+        if Path(source).is_dir():
+            return str(source)
+        base = None
+        try:
+            for path in iter_image_paths(source):
+                directory = os.path.dirname(os.path.abspath(path))
+                base = directory if base is None else os.path.commonpath([base, directory])
+        except ValueError:
+            return None
+        return base
+
+    def output_path(self, path, base_dir, output_dir):
+        """
+        出力先（基準ディレクトリからの相対パスを保つ。別ディレクトリの同名ファイルが同じ出力にならない）
+        base_dir が None の場合は絶対パスのドライブ名以下をそのまま使う
+        """
+        if base_dir is not None:
+            relative = Path(os.path.relpath(os.path.abspath(path), os.path.abspath(base_dir)))
+        else:
+            absolute = Path(os.path.abspath(path))
+            relative = Path(absolute.drive.rstrip(":"), *absolute.parts[1:])
+        output = Path(output_dir) / relative
+        if self.output_ext:
+            output = output.with_suffix(self.output_ext)
+        return str(output)
+
+    def run(self, source, output_dir, overwrite=False, progress_every=1000):
+        """source 内の全画像に操作を適用し、output_dir に保存"""
+        stats = {"processed": 0, "failed": 0, "skipped": 0}
+        errors = []
+        start = time.perf_counter()
+        next_progress = progress_every
+        base_dir = self.base_directory(source)
+
+        def collect(future):
+            for src, error in future.result():
+                stats["processed"] += 1
+                if error is not None:
+                    stats["failed"] += 1
+                    errors.append({"path": src, "error": error})
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.prepared, self.encode_params)) as executor:
+            in_flight = deque()
+            chunk = []
+            for path in iter_image_paths(source):
+                dst = self.output_path(path, base_dir, output_dir)
+                if not overwrite and os.path.exists(dst):
+                    stats["skipped"] += 1
+                    continue
+                chunk.append((path, dst))
+                if len(chunk) < self.chunksize:
+                    continue
+                in_flight.append(executor.submit(_recolor_files, chunk))
+                chunk = []
+                # 投入済みのまとまりを全ワーカー数の数倍までに抑える（パス一覧を全部は保持しない）
+                while len(in_flight) >= self.workers * 4:
+                    collect(in_flight.popleft())
+                if stats["processed"] >= next_progress:
+                    elapsed = time.perf_counter() - start
+                    print(f"  📈 {stats['processed']}枚処理 ({stats['processed'] / elapsed:.1f} 枚/秒)")
+                    next_progress += progress_every
+            if chunk:
+                in_flight.append(executor.submit(_recolor_files, chunk))
+            while in_flight:
+                collect(in_flight.popleft())
+
+        elapsed = time.perf_counter() - start
+        return {
+            "output_dir": str(output_dir),
+            "processed": stats["processed"],
+            "failed": stats["failed"],
+            "skipped": stats["skipped"],
+            "errors": errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "images_per_second": round(stats["processed"] / elapsed, 2) if elapsed > 0 else 0.0
+        }
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("使い方: python batch_recolor_engine.py <操作.json> <画像ディレクトリ|パス一覧.txt> <出力ディレクトリ> [拡張子]")
+        return
+
+    operations = load_operations(sys.argv[1])
+    output_ext = sys.argv[4] if len(sys.argv) > 4 else None
+    if output_ext and not output_ext.startswith("."):
+        output_ext = "." + output_ext
+
+    engine = BatchRecolorEngine(operations, output_ext=output_ext)
+    summary = engine.run(sys.argv[2], sys.argv[3])
+    print(f"処理: {summary['processed']}枚（失敗 {summary['failed']}、再開スキップ {summary['skipped']}）")
+    for error in summary["errors"][:10]:
+        print(f"  ❌ {error['path']}: {error['error']}")
+    print(f"所要時間: {summary['elapsed_seconds']}秒（{summary['images_per_second']} 枚/秒、{engine.workers}プロセス）")
+    print(f"出力: {summary['output_dir']}")
+
+
+if __name__ == "__main__":
+    main()
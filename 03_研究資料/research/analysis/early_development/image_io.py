@@ -0,0 +1,211 @@
+"""
+画像入出力の共通モジュール（image_processing_main.py / image_processing_sub.py / 一括処理エンジンで共有）
+- ファイルをメモリマップし、マップしたバッファから直接 cv2.imdecode する（日本語パス対応・bytesへのコピーなし）
+- 必要な表示サイズが分かっている場合は、JPEGのDCT領域での縮小デコード（IMREAD_REDUCED_*）を使う
+- デコード済み画像を合計バイト数の上限付きLRUキャッシュに保持できる
+- ディレクトリ・パス一覧からの画像パスの列挙（一括処理エンジンで共有）
+"""
+
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# 縮小率ごとのデコードフラグ（1 は縮小なし）
+_REDUCED_FLAGS = {
+    cv2.IMREAD_COLOR: {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                       4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8},
+    cv2.IMREAD_GRAYSCALE: {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                           4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+}
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
+# JPEGのフレーム開始マーカー（SOF0-15。C4=DHT, C8=JPG, CC=DAC は除く）
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+class DecodedImageCache:
+    """デコード済み画像のLRUキャッシュ（合計バイト数で上限を管理、スレッドセーフ）"""
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (画像, 元画像の (幅, 高さ))
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, image, original_size):
+        if image.nbytes > self.max_bytes:
+            return  # 上限を超える画像は保持しない
+        image.flags.writeable = False  # 共有する配列をその場で書き換えられないようにする
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[0].nbytes
+            self._entries[key] = (image, original_size)
+            self.current_bytes += image.nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def image_size_from_header(buf):
+    """JPEG / PNG のヘッダから (幅, 高さ) を読む（ピクセルはデコードしない）。不明なら None"""
+    if buf[:8] == b"\x89PNG\r\n\x1a\n" and len(buf) >= 24:
+        width, height = struct.unpack(">II", buf[16:24])
+        return width, height
+    if buf[:2] != b"\xff\xd8":
+        return None
+
+    offset = 2
+    length = len(buf)
+    while offset + 4 <= length:
+        if buf[offset] != 0xFF:
+            return None
+        marker = buf[offset + 1]
+        if marker == 0xFF:  # 詰め物のFF
+            offset += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:  # 長さを持たないマーカー
+            offset += 2
+            continue
+        segment_length = struct.unpack(">H", buf[offset + 2:offset + 4])[0]
+        if marker in _JPEG_SOF_MARKERS and offset + 9 <= length:
+            height, width = struct.unpack(">HH", buf[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + segment_length
+    return None
+
+
+def reduction_factor(original_size, max_size):
+    """
+    デコード結果が各辺とも max_size 以上を保てる最大の縮小率（1, 2, 4, 8）
+    その後 max_size に収める縮小・パネルへの引き伸ばしのどちらでも解像度が不足しない
+    """
+    if original_size is None or max_size is None:
+        return 1
+    width, height = original_size
+    target_width, target_height = max_size
+    for factor in (8, 4, 2):
+        if width // factor >= target_width and height // factor >= target_height:
+            return factor
+    return 1
+
+
+def _decode_mapped(path, flags, max_size):
+    """ファイルをメモリマップし、必要なら縮小デコード。戻り値: (画像, 元画像の (幅, 高さ))"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None, None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            original_size = image_size_from_header(mapped)
+            reduced_flags = _REDUCED_FLAGS.get(flags)
+            factor = reduction_factor(original_size, max_size) if reduced_flags is not None else 1
+            buf = np.frombuffer(mapped, dtype=np.uint8)
+            try:
+                image = cv2.imdecode(buf, reduced_flags[factor] if reduced_flags is not None else flags)
+            finally:
+                del buf  # マップを閉じる前にバッファの参照を解放
+    if image is None:
+        return None, None
+    if original_size is None:
+        return image, (image.shape[1], image.shape[0])
+
+    # EXIFの回転が適用された場合はヘッダの幅と高さを入れ替える
+    width, height = original_size
+    reduced_size = (-(-width // factor), -(-height // factor))
+    if width != height and (image.shape[1], image.shape[0]) == reduced_size[::-1]:
+        original_size = (height, width)
+    return image, original_size
+
+
+def imread_reduced(path, max_size=None, flags=cv2.IMREAD_COLOR, cache=None):
+    """
+    画像を読み込み、(画像, 元画像の (幅, 高さ)) を返す
+    max_size: (幅, 高さ)。指定すると各辺がこれ以上になる範囲で縮小デコードする
+              （JPEG以外は縮小フラグでも全解像度デコード後の縮小になる）
+    cache: DecodedImageCache。キャッシュから返した画像は読み取り専用
+    読み込めない場合は (None, None)
+    """
+    key = None
+    if cache is not None:
+        stat = os.stat(path)
+        key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size, flags,
+               tuple(max_size) if max_size is not None else None)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+
+    image, original_size = _decode_mapped(path, flags, max_size)
+    if image is not None and cache is not None:
+        cache.put(key, image, original_size)
+    return image, original_size
+
+
+def iter_image_paths(source):
+    """ディレクトリ（再帰）またはパス一覧テキストから画像パスを遅延列挙"""
+    source = Path(source)
+    if source.is_dir():
+        stack = [source]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in sorted(entries, key=lambda e: e.name):
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                        yield entry.path
+        return
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+# 日本語を含むパスから画像を読み込む関数（BGR形式で読み込み）
+def imread_jp(path, flags=cv2.IMREAD_COLOR, max_size=None, cache=None):
+    return imread_reduced(path, max_size=max_size, flags=flags, cache=cache)[0]
+
+
+# 日本語を含むパスへ画像を保存する関数（params: cv2.IMWRITE_* の指定）
+# 一時ファイルに書いてから置き換えるため、中断しても書きかけのファイルは残らない
+def imwrite_jp(path, img, params=()):
+    path = os.fspath(path)
+    ext = os.path.splitext(path)[1]
+    ret, buf = cv2.imencode(ext, img, list(params))
+    if not ret:
+        return False
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode='wb') as f:
+            buf.tofile(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return True
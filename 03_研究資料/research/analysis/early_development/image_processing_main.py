@@ -1,9 +1,13 @@
 import cv2
 import tkinter as tk
 from tkinter import filedialog
-import numpy as np
 import os
 
+from batch_recolor_engine import operation_color_bgr, save_operations
+from image_io import imread_jp, imwrite_jp
+from overlay_renderer import OverlayCanvas
+from roi_statistics import RegionStatistics
+
 # グローバル変数定義
 img = None
 roi_coords = None
@@ -11,22 +15,14 @@ color_mode = "RGB"
 r_var, g_var, b_var = None, None, None
 slider_window = None
 img_path = None
+region_stats = None  # 選択範囲の平均・分散（積分画像）
+canvas = None        # ドラッグ枠・塗りつぶしを重ねる表示用画像
+recorded_operations = []  # 一括処理（batch_recolor_engine.py）用に記録した操作
+operations_path = None
 
-# 日本語を含むパスから画像を読み込む関数（BGR形式で読み込み）
-def imread_jp(path):
-    with open(path, "rb") as f:
-        img_buf = np.frombuffer(f.read(), dtype=np.uint8)
-    return cv2.imdecode(img_buf, cv2.IMREAD_COLOR)
-
-# 日本語を含むパスへ画像を保存する関数
-def imwrite_jp(path, img):
-    ext = "." + path.split(".")[-1]
-    ret, buf = cv2.imencode(ext, img)
-    if ret:
-        with open(path, mode='wb') as f:
-            buf.tofile(f)
-        return True
-    return False
+# スライダーの値を塗りつぶし色（BGR）に変換
+def slider_color_bgr():
+    return operation_color_bgr((r_var.get(), g_var.get(), b_var.get()), color_mode)
 
 # スライダーの値に基づいて画像の選択範囲をリアルタイムで更新表示
 def update():
@@ -46,17 +42,8 @@ def update():
     if width <= 0 or height <= 0:
         return
 
-    # 塗りつぶす色を作成（RGBまたはHSVに応じて）
-    if color_mode == "RGB":
-        fill_color = np.full((height, width, 3), (b_var.get(), g_var.get(), r_var.get()), dtype=np.uint8)
-    else:
-        hsv_fill = np.full((height, width, 3), (r_var.get(), g_var.get(), b_var.get()), dtype=np.uint8)
-        fill_color = cv2.cvtColor(hsv_fill, cv2.COLOR_HSV2BGR)
-
-    # 塗りつぶして一時表示
-    temp_img = img.copy()
-    temp_img[y1:y2, x1:x2] = fill_color
-    cv2.imshow("Image", temp_img)
+    # 塗りつぶして一時表示（前回塗った範囲だけを元画像から戻す）
+    cv2.imshow("Image", canvas.fill(x1, y1, x2, y2, slider_color_bgr()))
     cv2.waitKey(1)
 
 # スライダーUIウィンドウを作成し、色の調整インターフェースを表示
@@ -67,7 +54,7 @@ def open_slider(avg_color):
 
     slider_window = tk.Toplevel()
     slider_window.title("色調整")
-    slider_window.geometry("300x250")
+    slider_window.geometry("300x280")
 
     # 平均色をスライダーの初期値に設定
     r_var = tk.IntVar(value=int(avg_color[0]))
@@ -106,22 +93,35 @@ def open_slider(avg_color):
             if width <= 0 or height <= 0:
                 return
 
-            # 色変換
-            if color_mode == "RGB":
-                fill_color = np.full((height, width, 3), (b_var.get(), g_var.get(), r_var.get()), dtype=np.uint8)
-            else:
-                hsv_fill = np.full((height, width, 3), (r_var.get(), g_var.get(), b_var.get()), dtype=np.uint8)
-                fill_color = cv2.cvtColor(hsv_fill, cv2.COLOR_HSV2BGR)
-
-            # 画像保存
-            final_img = img.copy()
-            final_img[y1:y2, x1:x2] = fill_color
+            # 表示用画像に塗りつぶした結果をそのまま保存（元画像の複製・塗りつぶし配列は作らない）
+            final_img = canvas.fill(x1, y1, x2, y2, slider_color_bgr())
             if imwrite_jp(path, final_img):
                 print("保存成功:", path)
             else:
                 print("保存失敗:", path)
 
+    # 「操作を記録」ボタンの処理（範囲と色を一括処理用のJSONに追記）
+    def record_operation():
+        global operations_path
+        if operations_path is None:
+            operations_path = filedialog.asksaveasfilename(
+                defaultextension=".json",
+                filetypes=[("JSON Files", "*.json")],
+                initialfile="recolor_operations.json"
+            )
+            if not operations_path:
+                operations_path = None
+                return
+        recorded_operations.append({
+            "roi": list(roi_coords),
+            "color": [r_var.get(), g_var.get(), b_var.get()],
+            "mode": color_mode
+        })
+        save_operations(operations_path, recorded_operations)
+        print(f"操作を記録: {len(recorded_operations)}件 → {operations_path}")
+
     tk.Button(slider_window, text="保存", command=save_image).pack(pady=5)
+    tk.Button(slider_window, text="操作を記録", command=record_operation).pack()
 
     # 閉じたときの処理（状態リセット）
     def on_slider_close():
@@ -129,7 +129,7 @@ def open_slider(avg_color):
         slider_window.destroy()
         slider_window = None
         roi_coords = None
-        cv2.imshow("Image", img)
+        cv2.imshow("Image", canvas.clear())
 
     slider_window.protocol("WM_DELETE_WINDOW", on_slider_close)
 
@@ -145,10 +145,13 @@ def mouse_event(event, x, y, flags, param):
         selection_data["start"] = (x, y)
         selection_data["selecting"] = True
     elif event == cv2.EVENT_MOUSEMOVE and selection_data["selecting"]:
-        # ドラッグ中は矩形描画
-        temp = img.copy()
-        cv2.rectangle(temp, selection_data["start"], (x, y), (0, 255, 0), 2)
-        cv2.imshow("Image", temp)
+        # ドラッグ中は矩形描画（前回の枠の部分だけを元画像から戻す）と範囲の平均・標準偏差の表示
+        cv2.imshow("Image", canvas.rectangle(selection_data["start"], (x, y), (0, 255, 0), 2))
+        stats = region_stats.describe(*selection_data["start"], x, y)
+        if stats is not None:
+            channels = "RGB" if color_mode == "RGB" else "HSV"
+            text = " ".join(f"{c}={m:.1f}±{sd:.1f}" for c, m, sd in zip(channels, stats["mean"], stats["std"]))
+            cv2.setWindowTitle("Image", f"Image [{text}]")
         cv2.waitKey(1)
     elif event == cv2.EVENT_LBUTTONUP:
         # 範囲確定
@@ -160,17 +163,11 @@ def mouse_event(event, x, y, flags, param):
         y2 = max(selection_data["start"][1], selection_data["end"][1])
         roi_coords = (x1, y1, x2, y2)
 
-        roi_img = img[y1:y2, x1:x2]
-        if roi_img.size == 0:
+        # 平均色を計算（RGBまたはHSVの順で返る）
+        avg_color = region_stats.mean(x1, y1, x2, y2)
+        if avg_color is None:
             return
 
-        # 平均色を計算（色空間によって分岐）
-        if color_mode == "RGB":
-            avg_color = roi_img.mean(axis=(0, 1))[::-1]  # BGR→RGB
-        else:
-            roi_hsv = cv2.cvtColor(roi_img, cv2.COLOR_BGR2HSV)
-            avg_color = roi_hsv.mean(axis=(0, 1))
-
         # スライダーウィンドウが開いてたら閉じる → 再表示
         if slider_window is not None and tk.Toplevel.winfo_exists(slider_window):
             slider_window.destroy()
@@ -193,7 +190,7 @@ def select_mode():
 
 # メイン処理：画像を選択→モード選択→表示・編集開始
 def main():
-    global img, color_mode, slider_window, img_path
+    global img, color_mode, slider_window, img_path, region_stats, canvas
     tk.Tk().withdraw()  # ファイルダイアログのみ使用
     img_path = filedialog.askopenfilename(title="画像を選択", filetypes=[("Image files", "*.png;*.jpg;*.jpeg")])
     if not img_path:
@@ -203,6 +200,8 @@ def main():
         print("画像読み込みエラー")
         return
     color_mode = select_mode()
+    region_stats = RegionStatistics(img, color_mode, with_variance=True)
+    canvas = OverlayCanvas(img)
     cv2.imshow("Image", img)
     cv2.setMouseCallback("Image", mouse_event)
 
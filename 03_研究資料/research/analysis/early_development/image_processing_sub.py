@@ -1,19 +1,16 @@
 from ultralytics import YOLO
-import cv2
-import numpy as np
 import tkinter as tk
 from tkinter import filedialog
 from PIL import Image, ImageTk
 
+from batch_detection_engine import results_to_objects
+from image_io import imread_jp
+from overlay_renderer import OverlayRenderer
+from spatial_index import SpatialIndex
+
 # YOLO モデル読み込み
 model = YOLO("yolov8n.pt")
 
-# === 画像読み込み ===
-def imread_jp(path):
-    with open(path, "rb") as f:
-        img_buf = np.frombuffer(f.read(), dtype=np.uint8)
-    return cv2.imdecode(img_buf, cv2.IMREAD_COLOR)
-
 # === ファイル選択ダイアログ（Tkinterウィンドウはまだ作らない） ===
 root_for_dialog = tk.Tk()
 root_for_dialog.withdraw()
@@ -33,26 +30,19 @@ if img is None:
     exit()
 
 # === YOLOで物体検出 ===
-results = model(img)[0]
-detected_objects = []
-selected_objects = []
-for result in results.boxes.data.cpu().numpy():
-    x1, y1, x2, y2, conf, cls = result
-    center_x, center_y = int((x1 + x2) / 2), int((y1 + y2) / 2)
-    detected_objects.append({
-        "bbox": [int(x1), int(y1), int(x2 - x1), int(y2 - y1)],
-        "center": (center_x, center_y),
-        "label": results.names[int(cls)],
-        "confidence": float(conf)
-    })
+detected_objects = results_to_objects(model(img)[0])
+object_index = SpatialIndex(detected_objects)
+selected_ids = {}  # 選択した物体ID（detected_objects のインデックス）を選択順に保持
 
 # === Tkinter ウィンドウ作成 ===
 root = tk.Tk()
 root.title("YOLO Object Selector")
 root.geometry("900x700")
 
-panel = tk.Label(root)
-panel.pack()
+# パネルはウィンドウの残り領域いっぱいに広げ、その大きさで表示する
+# （要求サイズを1pxにして、表示画像の大きさがパネルの大きさに影響しないようにする）
+panel = tk.Label(root, bd=0, highlightthickness=0, width=1, height=1)
+panel.pack(fill="both", expand=True)
 
 running = True
 
@@ -63,7 +53,7 @@ def on_done(event=None):
 
 # 選択解除処理
 def on_clear():
-    selected_objects.clear()
+    selected_ids.clear()
 
 # 🔘「全解除」ボタン（完了ボタンの上に配置）
 tk.Button(root, text="選択を全解除", command=on_clear).pack(pady=2)
@@ -86,56 +76,34 @@ def on_click(event):
     x = int(event.x * (original_width / display_width))
     y = int(event.y * (original_height / display_height))
 
-    # 最近傍の物体を検索
-    distances = [np.hypot(x - obj["center"][0], y - obj["center"][1]) for obj in detected_objects]
-    if not distances:
+    # 最近傍の物体を空間インデックスで検索（50px以内）
+    nearest_id = object_index.nearest(x, y, max_distance=50)
+    if nearest_id is None:
         return
-    nearest_idx = np.argmin(distances)
-    if distances[nearest_idx] < 50:  
-        obj = detected_objects[nearest_idx]
-        if obj in selected_objects:
-            selected_objects.remove(obj)
-        else:
-            selected_objects.append(obj)
+    if nearest_id in selected_ids:
+        del selected_ids[nearest_id]
+    else:
+        selected_ids[nearest_id] = True
 
 panel.bind("<Button-1>", on_click)
 
-# 表示更新
-def update_image():
-    # グローバル変数を使用
-    global img, detected_objects, selected_objects
-
-    # 元画像をコピー
-    display_img = img.copy()
-
-    # 物体の中心点と選択状態を描画
-    for obj in detected_objects:
-        cx, cy = obj["center"]
-        radius = 8
-        if obj in selected_objects:
-            cv2.circle(display_img, (cx, cy), radius, (0, 0, 255), -1)  # 選択された物体は赤
-        else:
-            cv2.circle(display_img, (cx, cy), radius, (0, 0, 0), 2)  # 未選択の物体は黒
-
-    # 選択された物体のバウンディングボックスを描画
-    for obj in selected_objects:
-        x, y, w, h = obj["bbox"]
-        label = obj["label"]
-        cv2.rectangle(display_img, (x, y), (x + w, y + h), (0, 0, 255), 2)  # 赤い枠
-        cv2.putText(display_img, label, (x, y - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-
-    # 表示用にリサイズ
-    display_height = panel.winfo_height()
-    display_width = panel.winfo_width()
-    resized_img = cv2.resize(display_img, (display_width, display_height), interpolation=cv2.INTER_AREA)
+# 表示更新（選択状態かパネルサイズが変わったときだけ描き直す）
+renderer = OverlayRenderer(img, detected_objects)
+photo = None
 
-    # Tkinterで表示するためにRGB変換
-    rgb = cv2.cvtColor(resized_img, cv2.COLOR_BGR2RGB)
-    pil_img = Image.fromarray(rgb)
-    imgtk = ImageTk.PhotoImage(pil_img)
-    panel.imgtk = imgtk
-    panel.config(image=imgtk)
+def update_image():
+    global photo
+
+    display_size = (panel.winfo_width(), panel.winfo_height())
+    if display_size[0] > 1 and display_size[1] > 1:
+        rgb = renderer.render(selected_ids, display_size)
+        if rgb is not None:
+            pil_img = Image.fromarray(rgb)
+            if photo is None or (photo.width(), photo.height()) != display_size:
+                photo = ImageTk.PhotoImage(pil_img)
+                panel.config(image=photo)
+            else:
+                photo.paste(pil_img)  # 既存の表示画像を書き換える
 
     # 再帰的に更新
     if running:
@@ -149,5 +117,5 @@ root.mainloop()
 
 # 結果出力
 print("選択された物体情報：")
-for obj in selected_objects:
+for obj in (detected_objects[i] for i in selected_ids):
     print(f"- ラベル: {obj['label']}, 信頼度: {obj['confidence']:.2f}, 中心: {obj['center']}")
@@ -0,0 +1,199 @@
+"""
+表示用オーバーレイの描画キャッシュ
+OverlayRenderer: YOLO物体選択UI（image_processing_sub.py）の表示画像
+- パネルサイズに縮小・RGB変換済みのベース画像を保持し、作り直すのはパネルサイズが変わったときだけ
+- 選択状態が変わった物体の描画範囲（ダーティ領域）だけをベース画像から戻して描き直す
+- 何も変わっていなければ何もしない（アイドル時の描画コストはほぼ0）
+- マーカーと枠は表示解像度で描くため、元画像の大きさによらず同じ太さで表示される
+OverlayCanvas: 範囲選択ツール（image_processing_main.py）の表示画像
+- 表示用の画像を1回だけ複製し、前回描いた範囲だけを元画像から戻して次の図形を描く
+"""
+
+import cv2
+import numpy as np
+
+MARKER_RADIUS = 8
+SELECTED_COLOR = (255, 0, 0)    # 赤（RGB）
+UNSELECTED_COLOR = (0, 0, 0)    # 黒
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.6
+THICKNESS = 2
+CLIP_PADDING = 4 * THICKNESS
+
+
+def _union(rects):
+    x0 = min(r[0] for r in rects)
+    y0 = min(r[1] for r in rects)
+    x1 = max(r[2] for r in rects)
+    y1 = max(r[3] for r in rects)
+    return x0, y0, x1, y1
+
+
+def _intersecting(rects, rect):
+    """rects (n, 4) のうち rect と重なるもののインデックス"""
+    return np.flatnonzero((rects[:, 0] < rect[2]) & (rect[0] < rects[:, 2]) &
+                          (rects[:, 1] < rect[3]) & (rect[1] < rects[:, 3]))
+
+
+class OverlayRenderer:
+    def __init__(self, image, objects):
+        """
+        image: 元画像（BGR）
+        objects: 検出物体のリスト（"center" / "bbox" / "label" は元画像の座標）
+        選択状態は物体ID（objects でのインデックス）の集合で受け取る
+        """
+        self.image = image
+        self.objects = objects
+        self.size = None
+        self.base = None
+        self.frame = None
+        self.selected = frozenset()
+        self.shapes = []
+        self._marker_rects = np.empty((0, 4))
+        self._extents = np.empty((0, 4))
+        self.dirty_rects = []        # 直前の描画で更新した範囲
+        self.stats = {"full_renders": 0, "partial_renders": 0, "skipped": 0}
+
+    def _layout(self):
+        """表示座標でのマーカー・枠・ラベル位置と、選択時の描画範囲を計算"""
+        width, height = self.size
+        scale_x = width / self.image.shape[1]
+        scale_y = height / self.image.shape[0]
+        margin = THICKNESS + 1
+
+        self.shapes = []
+        for obj in self.objects:
+            cx, cy = obj["center"]
+            x, y, w, h = obj["bbox"]
+            center = (int(cx * scale_x), int(cy * scale_y))
+            top_left = (int(x * scale_x), int(y * scale_y))
+            bottom_right = (int((x + w) * scale_x), int((y + h) * scale_y))
+            text_origin = (top_left[0], top_left[1] - 10)
+            (text_width, text_height), baseline = cv2.getTextSize(obj["label"], FONT, FONT_SCALE, THICKNESS)
+
+            marker_rect = (center[0] - MARKER_RADIUS - margin, center[1] - MARKER_RADIUS - margin,
+                           center[0] + MARKER_RADIUS + margin + 1, center[1] + MARKER_RADIUS + margin + 1)
+            box_rect = (top_left[0] - margin, top_left[1] - margin,
+                        bottom_right[0] + margin + 1, bottom_right[1] + margin + 1)
+            text_rect = (text_origin[0] - margin, text_origin[1] - text_height - margin,
+                         text_origin[0] + text_width + margin + 1, text_origin[1] + baseline + margin + 1)
+            self.shapes.append({
+                "center": center,
+                "top_left": top_left,
+                "bottom_right": bottom_right,
+                "text_origin": text_origin,
+                "marker_rect": marker_rect,
+                # 選択状態が変わると、マーカー・枠・ラベルのすべてが変わりうる
+                "extent": _union([marker_rect, box_rect, text_rect])
+            })
+        self._marker_rects = np.array([shape["marker_rect"] for shape in self.shapes]).reshape(-1, 4)
+        self._extents = np.array([shape["extent"] for shape in self.shapes]).reshape(-1, 4)
+
+    def _compose(self, rect):
+        """rect の範囲をベース画像から戻し、その範囲にかかる描画だけをやり直す"""
+        width, height = self.size
+        x0, y0 = max(0, rect[0]), max(0, rect[1])
+        x1, y1 = min(width, rect[2]), min(height, rect[3])
+        if x0 >= x1 or y0 >= y1:
+            return None
+
+        # OpenCVは太線を中心線で切り取ってから太らせるため、範囲の縁で切れた線が欠ける
+        # 余白を付けた作業領域に描き、内側だけを表示画像へ戻す
+        px0, py0 = max(0, x0 - CLIP_PADDING), max(0, y0 - CLIP_PADDING)
+        px1, py1 = min(width, x1 + CLIP_PADDING), min(height, y1 + CLIP_PADDING)
+        padded = (px0, py0, px1, py1)
+        work = self.base[py0:py1, px0:px1].copy()
+
+        def shift(point):
+            return point[0] - px0, point[1] - py0
+
+        # 元の描画順: 全マーカー → 選択物体の枠とラベル
+        for i in _intersecting(self._marker_rects, padded):
+            shape = self.shapes[i]
+            if i in self.selected:
+                cv2.circle(work, shift(shape["center"]), MARKER_RADIUS, SELECTED_COLOR, -1)
+            else:
+                cv2.circle(work, shift(shape["center"]), MARKER_RADIUS, UNSELECTED_COLOR, THICKNESS)
+        for i in _intersecting(self._extents, padded):
+            if i not in self.selected:
+                continue
+            shape = self.shapes[i]
+            cv2.rectangle(work, shift(shape["top_left"]), shift(shape["bottom_right"]), SELECTED_COLOR, THICKNESS)
+            cv2.putText(work, self.objects[i]["label"], shift(shape["text_origin"]),
+                        FONT, FONT_SCALE, SELECTED_COLOR, THICKNESS)
+
+        self.frame[y0:y1, x0:x1] = work[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+        return x0, y0, x1, y1
+
+    def render(self, selected_ids, size):
+        """
+        現在の選択状態（物体IDの集合）とパネルサイズ (幅, 高さ) で表示画像（RGB）を更新
+        戻り値: 更新した表示画像。前回から変化がなければ None
+        """
+        selected = frozenset(selected_ids)
+        size = tuple(size)
+
+        if size != self.size:
+            self.size = size
+            resized = cv2.resize(self.image, size, interpolation=cv2.INTER_AREA)
+            self.base = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+            self.frame = np.empty_like(self.base)
+            self.selected = selected
+            self._layout()
+            self.dirty_rects = [self._compose((0, 0, size[0], size[1]))]
+            self.stats["full_renders"] += 1
+            return self.frame
+
+        changed = selected ^ self.selected
+        if not changed:
+            self.stats["skipped"] += 1
+            return None
+
+        self.selected = selected
+        rects = (self._compose(self.shapes[i]["extent"]) for i in sorted(changed))
+        self.dirty_rects = [rect for rect in rects if rect is not None]
+        self.stats["partial_renders"] += 1
+        return self.frame
+
+
+class OverlayCanvas:
+    """元画像に一時的な図形を重ねた表示画像（描画ごとの全体コピーをしない）"""
+
+    def __init__(self, image):
+        self.image = image
+        self.canvas = image.copy()
+        self._dirty = []  # 元画像から戻す必要のある範囲 (x1, y1, x2, y2)
+
+    def _rect(self, x1, y1, x2, y2):
+        height, width = self.image.shape[:2]
+        return max(0, x1), max(0, y1), min(width, x2), min(height, y2)
+
+    def clear(self):
+        """前回の図形を消す（描いた範囲だけを元画像から戻す）"""
+        for x1, y1, x2, y2 in self._dirty:
+            self.canvas[y1:y2, x1:x2] = self.image[y1:y2, x1:x2]
+        self._dirty = []
+        return self.canvas
+
+    def rectangle(self, start, end, color, thickness=2):
+        """矩形の枠を描く（戻す範囲は4辺の帯だけ）"""
+        self.clear()
+        x1, x2 = sorted((start[0], end[0]))
+        y1, y2 = sorted((start[1], end[1]))
+        cv2.rectangle(self.canvas, (x1, y1), (x2, y2), color, thickness)
+        pad = thickness
+        self._dirty = [
+            self._rect(x1 - pad, y1 - pad, x2 + pad + 1, y1 + pad + 1),
+            self._rect(x1 - pad, y2 - pad, x2 + pad + 1, y2 + pad + 1),
+            self._rect(x1 - pad, y1 - pad, x1 + pad + 1, y2 + pad + 1),
+            self._rect(x2 - pad, y1 - pad, x2 + pad + 1, y2 + pad + 1)
+        ]
+        return self.canvas
+
+    def fill(self, x1, y1, x2, y2, color):
+        """矩形内を1色で塗る（色はブロードキャストで代入し、塗りつぶし配列は作らない）"""
+        self.clear()
+        rect = self._rect(x1, y1, x2, y2)
+        self.canvas[rect[1]:rect[3], rect[0]:rect[2]] = color
+        self._dirty = [rect]
+        return self.canvas
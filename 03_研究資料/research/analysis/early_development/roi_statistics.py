@@ -0,0 +1,107 @@
+"""
+積分画像による矩形領域（ROI）の統計量
+画像ごとに1回だけ累積和テーブルを作り、任意の矩形の平均・分散を4点の参照で求める
+（ROIの大きさによらず一定時間なので、ドラッグ中のマウス移動ごとに計算できる）
+
+テーブルは uint32 で桁あふれを許して保持し、差分も同じ剰余演算で取る
+真の合計が 2^32 未満の矩形なら結果は正確で、それより大きい矩形は行方向の帯に分けて合算する
+（合計は約1680万画素、二乗和は約6.6万画素ごとの帯。帯の差分はまとめて配列演算で取る）
+二乗和のテーブルは with_variance=True なら生成時に、そうでなければ分散を最初に求めたときに作る
+"""
+
+import cv2
+import numpy as np
+
+_UINT32_MAX = 2 ** 32 - 1
+
+
+def _integral(channels, dtype):
+    """先頭に0の行・列を付けた累積和テーブル (H+1, W+1, C)"""
+    height, width, depth = channels.shape
+    table = np.zeros((height + 1, width + 1, depth), dtype=dtype)
+    np.cumsum(channels, axis=0, dtype=dtype, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, dtype=dtype, out=table[1:, 1:])
+    return table
+
+
+class RegionStatistics:
+    def __init__(self, image, color_mode="RGB", with_variance=False):
+        """
+        image: BGR画像
+        color_mode: "RGB"（結果はR, G, Bの順）/ "HSV"（H, S, V の順、OpenCVの値域）
+        with_variance: 二乗和のテーブルも先に作る（ドラッグ中の最初の分散計算で待たせない）
+        """
+        if color_mode == "RGB":
+            channels = image[:, :, ::-1]
+        else:
+            channels = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        self.channels = channels
+        self.height, self.width = image.shape[:2]
+        self.sums = _integral(channels, np.uint32)
+        self._squares = None
+        self._square_max = None
+        if with_variance:
+            self._build_squares()
+
+    def _build_squares(self):
+        self._square_max = int(self.channels.max()) ** 2 or 1
+        # 1行分の二乗和も uint32 に収まらない極端に幅の広い画像だけ uint64 で持つ
+        dtype = np.uint32 if self._square_max * self.width <= _UINT32_MAX else np.uint64
+        self._squares = _integral(self.channels.astype(dtype) ** 2, dtype)
+
+    def _clip(self, x1, y1, x2, y2):
+        # NumPy の整数で渡された座標も Python の int にする（面積などの計算が int64 で桁あふれしないように）
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+        x1, x2 = sorted((max(0, min(x1, self.width)), max(0, min(x2, self.width))))
+        y1, y2 = sorted((max(0, min(y1, self.height)), max(0, min(y2, self.height))))
+        return x1, y1, x2, y2
+
+    @staticmethod
+    def _banded_sum(table, max_value, x1, y1, x2, y2):
+        """剰余演算の結果が正確な高さの帯に分けて矩形の合計を求める（座標はクリップ済み）"""
+        if table.dtype == np.uint64:
+            rows_per_band = y2 - y1
+        else:
+            rows_per_band = max(1, _UINT32_MAX // (max_value * (x2 - x1)))
+        tops = np.arange(y1, y2, rows_per_band)
+        bottoms = np.minimum(tops + rows_per_band, y2)
+        # 符号なし整数の配列演算なので桁あふれは剰余として扱われる
+        bands = table[bottoms, x2] - table[tops, x2] - table[bottoms, x1] + table[tops, x1]
+        return bands.astype(np.int64).sum(axis=0)
+
+    def sum(self, x1, y1, x2, y2):
+        """矩形 [x1, x2) × [y1, y2) のチャンネルごとの合計"""
+        x1, y1, x2, y2 = self._clip(x1, y1, x2, y2)
+        if x1 == x2 or y1 == y2:
+            return np.zeros(self.sums.shape[2], dtype=np.int64)
+        return self._banded_sum(self.sums, 255, x1, y1, x2, y2)
+
+    def mean(self, x1, y1, x2, y2):
+        """矩形内のチャンネルごとの平均（空の矩形は None）"""
+        x1, y1, x2, y2 = self._clip(x1, y1, x2, y2)
+        area = (x2 - x1) * (y2 - y1)
+        if area == 0:
+            return None
+        return self.sum(x1, y1, x2, y2) / area
+
+    def variance(self, x1, y1, x2, y2):
+        """矩形内のチャンネルごとの分散（母分散）"""
+        x1, y1, x2, y2 = self._clip(x1, y1, x2, y2)
+        area = (x2 - x1) * (y2 - y1)
+        if area == 0:
+            return None
+        if self._squares is None:
+            self._build_squares()
+        # 合計は Python の int にしてから任意精度で計算する
+        area = int(area)
+        square_sums = self._banded_sum(self._squares, self._square_max, x1, y1, x2, y2).tolist()
+        sums = self.sum(x1, y1, x2, y2).tolist()
+        # 整数のまま (n·Σx² − (Σx)²) / n² を計算して桁落ちを避ける
+        return np.array([(area * sq - s * s) / area ** 2 for sq, s in zip(square_sums, sums)])
+
+    def describe(self, x1, y1, x2, y2):
+        """平均と標準偏差"""
+        mean = self.mean(x1, y1, x2, y2)
+        if mean is None:
+            return None
+        return {"mean": mean, "std": np.sqrt(self.variance(x1, y1, x2, y2))}
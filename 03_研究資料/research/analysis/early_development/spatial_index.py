@@ -0,0 +1,143 @@
+"""
+検出物体の空間インデックス（一様グリッド）
+物体の中心点と枠をセルごとに登録し、クリック位置の最近傍検索・点を含む枠の検索・
+矩形範囲内の物体の検索を、全物体との距離計算なしで行う
+物体は検出結果リストでの位置（インデックス）を物体IDとして扱う
+"""
+
+import math
+
+import numpy as np
+
+# 何セルより大きい枠はグリッドに登録せず、別リストで全件判定する
+LARGE_BOX_CELLS = 8
+
+
+def _cell_buckets(cell_x, cell_y):
+    """セル座標の配列から {(cx, cy): 物体IDの配列} を作る"""
+    buckets = {}
+    if len(cell_x) == 0:
+        return buckets
+    order = np.lexsort((cell_y, cell_x))
+    keys = np.stack([cell_x[order], cell_y[order]], axis=1)
+    boundaries = np.flatnonzero((np.diff(keys, axis=0) != 0).any(axis=1)) + 1
+    for group in np.split(order, boundaries):
+        buckets[(int(cell_x[group[0]]), int(cell_y[group[0]]))] = group
+    return buckets
+
+
+class SpatialIndex:
+    def __init__(self, objects, cell_size=None):
+        """
+        objects: 検出物体のリスト（"center": (x, y), "bbox": [x, y, w, h]）
+        cell_size: セルの一辺（省略時は枠の大きさの中央値）
+        """
+        self.centers = np.array([obj["center"] for obj in objects], dtype=float).reshape(-1, 2)
+        boxes = np.array([obj["bbox"] for obj in objects], dtype=float).reshape(-1, 4)
+        self.boxes = np.concatenate([boxes[:, :2], boxes[:, :2] + boxes[:, 2:]], axis=1)  # x0, y0, x1, y1
+
+        if cell_size is None:
+            cell_size = float(np.median(np.maximum(boxes[:, 2], boxes[:, 3]))) if len(boxes) else 64.0
+        self.cell_size = max(cell_size, 1.0)
+
+        # 中心点のグリッド
+        cells = np.floor(self.centers / self.cell_size).astype(np.int64)
+        self._center_cells = _cell_buckets(cells[:, 0], cells[:, 1])
+        if len(cells):
+            self._cell_min = cells.min(axis=0)
+            self._cell_max = cells.max(axis=0)
+
+        # 枠のグリッド（枠が重なる全セルに登録、大きな枠は別扱い）
+        box_cells = np.floor(self.boxes / self.cell_size).astype(np.int64)
+        spans = box_cells[:, 2:] - box_cells[:, :2] + 1
+        large = (spans > LARGE_BOX_CELLS).any(axis=1)
+        self._large_boxes = np.flatnonzero(large)
+        cell_x, cell_y, ids = [], [], []
+        for i in np.flatnonzero(~large):
+            gx0, gy0, gx1, gy1 = box_cells[i]
+            xs, ys = np.meshgrid(np.arange(gx0, gx1 + 1), np.arange(gy0, gy1 + 1))
+            cell_x.append(xs.ravel())
+            cell_y.append(ys.ravel())
+            ids.append(np.full(xs.size, i))
+        if ids:
+            cell_x, cell_y, ids = np.concatenate(cell_x), np.concatenate(cell_y), np.concatenate(ids)
+            self._box_cells = {key: ids[group] for key, group in _cell_buckets(cell_x, cell_y).items()}
+        else:
+            self._box_cells = {}
+
+    def __len__(self):
+        return len(self.centers)
+
+    def _cell_of(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def _ring(self, gx, gy, radius):
+        """(gx, gy) からチェビシェフ距離がちょうど radius のセルにある物体ID"""
+        if radius == 0:
+            keys = [(gx, gy)]
+        else:
+            keys = [(gx + dx, gy + dy) for dx in range(-radius, radius + 1) for dy in (-radius, radius)]
+            keys += [(gx + dx, gy + dy) for dx in (-radius, radius) for dy in range(-radius + 1, radius)]
+        groups = [self._center_cells[key] for key in keys if key in self._center_cells]
+        return np.concatenate(groups) if groups else None
+
+    def nearest(self, x, y, max_distance=None):
+        """
+        (x, y) に中心が最も近い物体のID（max_distance 未満のものに限る）。なければ None
+        距離が等しい場合はIDの小さい物体を返す
+        """
+        if not len(self):
+            return None
+        gx, gy = self._cell_of(x, y)
+        # 全物体を覆うのに必要なリング数
+        max_radius = int(max(abs(gx - self._cell_min[0]), abs(gx - self._cell_max[0]),
+                             abs(gy - self._cell_min[1]), abs(gy - self._cell_max[1])))
+
+        best_id, best_distance = None, math.inf
+        for radius in range(max_radius + 1):
+            candidates = self._ring(gx, gy, radius)
+            if candidates is not None:
+                distances = np.hypot(self.centers[candidates, 0] - x, self.centers[candidates, 1] - y)
+                order = np.lexsort((candidates, distances))
+                distance, candidate = float(distances[order[0]]), int(candidates[order[0]])
+                if distance < best_distance or (distance == best_distance and candidate < best_id):
+                    best_id, best_distance = candidate, distance
+
+            # 調べたセル範囲の外にある物体までの距離の下限
+            bound = min(x - (gx - radius) * self.cell_size, (gx + radius + 1) * self.cell_size - x,
+                        y - (gy - radius) * self.cell_size, (gy + radius + 1) * self.cell_size - y)
+            if best_distance < bound or (max_distance is not None and bound >= max_distance):
+                break
+
+        if best_id is None or (max_distance is not None and best_distance >= max_distance):
+            return None
+        return best_id
+
+    def boxes_containing(self, x, y):
+        """(x, y) を枠内に含む物体IDの配列（昇順）"""
+        groups = [self._large_boxes]
+        key = self._cell_of(x, y)
+        if key in self._box_cells:
+            groups.append(self._box_cells[key])
+        candidates = np.concatenate(groups).astype(np.int64)
+        boxes = self.boxes[candidates]
+        inside = (boxes[:, 0] <= x) & (x <= boxes[:, 2]) & (boxes[:, 1] <= y) & (y <= boxes[:, 3])
+        return np.sort(candidates[inside])
+
+    def centers_in_rect(self, x0, y0, x1, y1):
+        """中心が矩形 [x0, x1] × [y0, y1] 内にある物体IDの配列（昇順）"""
+        gx0, gy0 = self._cell_of(x0, y0)
+        gx1, gy1 = self._cell_of(x1, y1)
+        if (gx1 - gx0 + 1) * (gy1 - gy0 + 1) > len(self._center_cells):
+            candidates = np.arange(len(self))  # 範囲が広い場合は全件判定の方が速い
+        else:
+            groups = [self._center_cells[(cx, cy)]
+                      for cx in range(gx0, gx1 + 1) for cy in range(gy0, gy1 + 1)
+                      if (cx, cy) in self._center_cells]
+            if not groups:
+                return np.array([], dtype=np.int64)
+            candidates = np.concatenate(groups)
+        centers = self.centers[candidates]
+        inside = ((x0 <= centers[:, 0]) & (centers[:, 0] <= x1) &
+                  (y0 <= centers[:, 1]) & (centers[:, 1] <= y1))
+        return np.sort(candidates[inside])
@@ -3,7 +3,7 @@
 Automated Dataset Collection for Academic Standards
 
 Generated with Claude Code
-Purpose: 752サンプル学術基準データセット自動収集
+Purpose: 検出力分析に基づく学術基準データセット自動収集
 """
 
 import os
@@ -13,6 +13,8 @@ from PIL import Image
 import hashlib
 from datetime import datetime
 
+from cohens_power_analysis import CohensPowerAnalysis
+
 class AcademicDatasetCollector:
     """Academic standard dataset collection system"""
     
@@ -35,6 +37,20 @@ class AcademicDatasetCollector:
             'allowed_formats': ['jpg', 'jpeg', 'png'],
             'min_quality_score': 0.7
         }
+        
+        self.power_analysis = CohensPowerAnalysis()
+    
+    def plan_phase2_target(self, power=0.80, alpha=0.05, effect_size='medium'):
+        """Per-category Phase 2 target from the simulated power analysis"""
+        target = self.power_analysis.calculate_sample_size_per_category(
+            num_categories=len(self.categories),
+            power=power,
+            alpha=alpha,
+            effect_size=effect_size
+        )
+        for info in self.categories.values():
+            info['target'] = target
+        return target
     
     def setup_directory_structure(self):
         """Create organized directory structure"""
@@ -131,14 +147,17 @@ class AcademicDatasetCollector:
         return results
     
     def execute_phase2_collection(self):
-        """Execute Phase 2: Optimal statistical power (94 per category)"""
+        """Execute Phase 2: Optimal statistical power (simulated per-category target)"""
         print(" Starting Phase 2: Optimal Statistical Power Collection")
         
+        target = self.plan_phase2_target()
+        print(f" Target: {target} per category ({target * len(self.categories)} total, power=0.80)")
+        
         results = {}
         for category in self.categories:
-            collected = self.collect_category_samples(category, 94)
+            collected = self.collect_category_samples(category, target)
             results[category] = collected
-            print(f" {category}: {collected}/94 samples collected")
+            print(f" {category}: {collected}/{target} samples collected")
         
         return results
 
@@ -11,10 +11,12 @@ Verified: 実装済み
 import math
 from datetime import datetime
 
+from power_simulation import PowerSimulator
+
 class CohensPowerAnalysis:
     """Cohen's Power Analysis for sample size determination"""
     
-    def __init__(self):
+    def __init__(self, n_simulations=20000, max_workers=None):
         self.z_values = {
             0.80: 0.84,  # 80% power
             0.85: 1.04,  # 85% power
@@ -33,6 +35,9 @@ class CohensPowerAnalysis:
             'medium': 0.5,
             'large': 0.8
         }
+        
+        # カテゴリ別比較の検出力はシミュレーションで推定（Bonferroni補正後のαをそのまま使う）
+        self.power_simulator = PowerSimulator(n_simulations=n_simulations, max_workers=max_workers)
     
     def calculate_sample_size_for_proportion(self, power=0.80, alpha=0.05, 
                                            effect_size='medium', p1=0.812, p0=0.65):
@@ -82,26 +87,38 @@ class CohensPowerAnalysis:
         """
         Calculate required sample size per category for multi-class classification
         
+        Simulates Welch t-tests at the exact Bonferroni-corrected alpha
+        (alpha / num_categories) instead of a table lookup.
+        
         Args:
             num_categories: Number of classification categories
             power: Statistical power
-            alpha: Type I error rate (adjusted for multiple comparisons)
+            alpha: Family-wise Type I error rate (corrected per category)
             effect_size: Effect size
         """
-        # Bonferroni correction for multiple comparisons
-        alpha_corrected = alpha / num_categories
+        result = self.power_simulator.required_sample_size(
+            target_power=power,
+            num_categories=num_categories,
+            effect_size=self.effect_sizes[effect_size],
+            alpha=alpha
+        )
         
-        # Use the closest available alpha value
-        available_alphas = list(self.alpha_values.keys())
-        alpha_corrected = min(available_alphas, key=lambda x: abs(x - alpha_corrected))
+        return result['n_per_group']
+    
+    def category_power_curve(self, sample_sizes=(2, 30, 60, 94, 120, 150),
+                             num_categories=8, alpha=0.05):
+        """
+        Simulated per-category power for each effect size over candidate sample sizes
         
-        n_per_group = self.calculate_sample_size_for_ttest(
-            power=power, 
-            alpha=alpha_corrected, 
-            effect_size=effect_size
+        Returns:
+            List of design-point results from PowerSimulator.power_curve
+        """
+        return self.power_simulator.power_curve(
+            sample_sizes,
+            category_counts=(num_categories,),
+            effect_sizes=tuple(self.effect_sizes.values()),
+            alpha=alpha
         )
-        
-        return n_per_group
     
     def current_study_analysis(self):
         """Current study statistical power analysis"""
@@ -150,6 +167,7 @@ def generate_sample_size_report():
     
     analyzer = CohensPowerAnalysis()
     results = analyzer.current_study_analysis()
+    power_curve = analyzer.category_power_curve()
     
     report = f"""
 #  Cohen's Power Analysis - 学術基準サンプル数計算レポート
@@ -191,6 +209,18 @@ def generate_sample_size_report():
 
 """
     
+    report += """
+### **カテゴリ別検出力曲線（モンテカルロ・シミュレーション）**
+
+8カテゴリ、Bonferroni補正後 α = 0.05/8 でのWelch t検定の検出力
+
+| 効果量 d | カテゴリ毎サンプル数 | 検出力 | 全カテゴリ同時検出率 |
+|---------:|------------------:|------:|------------------:|
+"""
+    for point in power_curve:
+        report += (f"| {point['effect_size']} | {point['n_per_group']} | {point['power']:.3f} | "
+                   f"{point['all_categories_power']:.3f} |\n")
+    
     # 推奨シナリオの選択
     recommended = results[0]  # Power=0.80, α=0.05, medium effect
     
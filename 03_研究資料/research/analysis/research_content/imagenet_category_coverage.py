@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+ImageNetクラスのカテゴリ被覆エンジン
+WordNetの各シンセットについて、その下位（部分木）に含まれるImageNetクラスの集合を
+ビット集合（Pythonの整数）として事前計算し、任意のカテゴリ集合の被覆クラス数をビット演算で求める
+
+- 被覆クラス数: 部分木のビット集合の論理和のビット数
+- 最良のKカテゴリ: 遅延評価の貪欲法（優先度付きキュー）による最大被覆
+  被覆の増分は劣モジュラなので、キューに残っている古い増分は常に上限になる
+  先頭だけを再計算し、次の候補の上限以上なら確定する（全候補の再評価は不要）
+
+WordNetから索引を作るには nltk と WordNet コーパスが必要（作った索引はJSONに保存して再利用できる）
+実行例: python imagenet_category_coverage.py <クラス一覧.txt|索引.json> [K] [カテゴリの最大クラス数]
+"""
+
+import heapq
+import json
+import sys
+from pathlib import Path
+
+try:
+    from nltk.corpus import wordnet as wn
+except ImportError:  # nltkがなければ保存済みの索引か階層の辞書から作る
+    wn = None
+
+
+def load_class_wnids(path):
+    """クラス一覧（1行1クラス、"n01440764" または "n01440764 tench, Tinca tinca"）を読む"""
+    with open(path, encoding="utf-8") as f:
+        return [line.split()[0] for line in f if line.strip()]
+
+
+class CategoryCoverageIndex:
+    def __init__(self, classes, subtree_masks):
+        """
+        classes: ImageNetクラスのID（wnid）のリスト（位置がビット番号）
+        subtree_masks: {シンセット名: 部分木に含まれるクラスのビット集合}
+        """
+        self.classes = list(classes)
+        self.subtree_masks = subtree_masks
+
+    @classmethod
+    def from_hypernyms(cls, classes, parents, class_nodes=None):
+        """
+        上位語の辞書から作る
+        parents: {ノード: [上位ノード, ...]}（多重継承可）
+        class_nodes: クラスごとの階層上のノード（省略時はクラスIDをそのままノードとする）
+        """
+        class_nodes = class_nodes or classes
+        masks = {}
+        for bit, node in enumerate(class_nodes):
+            # クラスのノードとその全祖先にビットを立てる
+            stack, seen = [node], {node}
+            while stack:
+                current = stack.pop()
+                masks[current] = masks.get(current, 0) | (1 << bit)
+                for parent in parents.get(current, ()):
+                    if parent not in seen:
+                        seen.add(parent)
+                        stack.append(parent)
+        return cls(classes, masks)
+
+    @classmethod
+    def from_wordnet(cls, class_wnids):
+        """WordNet（nltk）の名詞階層から作る（上位語とインスタンスの上位語の両方をたどる）"""
+        if wn is None:
+            raise ImportError("WordNetから索引を作るには nltk が必要です")
+        class_synsets = [wn.synset_from_pos_and_offset(wnid[0], int(wnid[1:])) for wnid in class_wnids]
+        parents = {}
+        stack = list(class_synsets)
+        while stack:
+            synset = stack.pop()
+            if synset.name() in parents:
+                continue
+            hypernyms = synset.hypernyms() + synset.instance_hypernyms()
+            parents[synset.name()] = [s.name() for s in hypernyms]
+            stack.extend(hypernyms)
+        return cls.from_hypernyms(class_wnids, parents, [s.name() for s in class_synsets])
+
+    def save(self, path):
+        """索引をJSONに保存（ビット集合は16進文字列）"""
+        data = {
+            "classes": self.classes,
+            "subtrees": {name: format(mask, "x") for name, mask in self.subtree_masks.items()}
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["classes"], {name: int(mask, 16) for name, mask in data["subtrees"].items()})
+
+    def __len__(self):
+        return len(self.classes)
+
+    def subtree_class_count(self, synset):
+        """シンセットの部分木に含まれるクラス数（含まないシンセットは0）"""
+        return self.subtree_masks.get(synset, 0).bit_count()
+
+    def coverage_mask(self, synsets):
+        mask = 0
+        for synset in synsets:
+            mask |= self.subtree_masks.get(synset, 0)
+        return mask
+
+    def coverage(self, synsets):
+        """カテゴリ集合が被覆するクラス数（部分木の重なりは1回だけ数える）"""
+        return self.coverage_mask(synsets).bit_count()
+
+    def coverage_ratio(self, synsets):
+        return self.coverage(synsets) / len(self.classes) if self.classes else 0.0
+
+    def covered_classes(self, synsets):
+        mask = self.coverage_mask(synsets)
+        return [wnid for bit, wnid in enumerate(self.classes) if mask >> bit & 1]
+
+    def best_categories(self, k, max_classes=None, min_classes=1, candidates=None, exclude=(), fixed=()):
+        """
+        被覆クラス数が最大になるKカテゴリを遅延評価の貪欲法で選ぶ（(1-1/e) 近似）
+        max_classes / min_classes: 候補にする部分木のクラス数の範囲（entity など粗すぎる上位語を除く）
+        candidates: 候補のシンセット名（省略時は索引の全シンセット）
+        fixed: 先に選んでおくカテゴリ
+        戻り値: 選んだ順の [{"synset", "gain", "coverage", "coverage_ratio"}, ...]
+        """
+        covered = self.coverage_mask(fixed)
+        excluded = set(exclude) | set(fixed)
+        names = self.subtree_masks if candidates is None else candidates
+
+        # キーは (-増分の上限, 名前)。同じ増分なら名前順で決まる
+        heap = []
+        for name in names:
+            mask = self.subtree_masks.get(name, 0)
+            size = mask.bit_count()
+            if name in excluded or size < min_classes or (max_classes is not None and size > max_classes):
+                continue
+            gain = (mask & ~covered).bit_count()
+            if gain > 0:
+                heap.append((-gain, name))
+        heapq.heapify(heap)
+
+        selected = []
+        while heap and len(selected) < k:
+            _, name = heapq.heappop(heap)
+            gain = (self.subtree_masks[name] & ~covered).bit_count()
+            if gain == 0:
+                continue
+            if heap and (-gain, name) > heap[0]:
+                heapq.heappush(heap, (-gain, name))  # 次の候補の上限を下回ったので戻す
+                continue
+            covered |= self.subtree_masks[name]
+            total = covered.bit_count()
+            selected.append({
+                "synset": name,
+                "gain": gain,
+                "coverage": total,
+                "coverage_ratio": total / len(self.classes)
+            })
+        return selected
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("使い方: python imagenet_category_coverage.py <クラス一覧.txt|索引.json> [K] [カテゴリの最大クラス数]")
+        return
+
+    source = Path(sys.argv[1])
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    max_classes = int(sys.argv[3]) if len(sys.argv) > 3 else 400
+
+    if source.suffix == ".json":
+        index = CategoryCoverageIndex.load(source)
+    else:
+        index = CategoryCoverageIndex.from_wordnet(load_class_wnids(source))
+        index_path = source.with_name(source.stem + "_coverage_index.json")
+        index.save(index_path)
+        print(f"索引を保存しました: {index_path}")
+
+    print(f"クラス数: {len(index)}、候補シンセット数: {len(index.subtree_masks)}")
+    for rank, item in enumerate(index.best_categories(k, max_classes=max_classes), 1):
+        print(f"{rank:3d}. {item['synset']:30} +{item['gain']:4d}  累計 {item['coverage']:4d} "
+              f"({item['coverage_ratio'] * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,23 @@ Verified: 実装済み
 
 import json
 import math
+import sys
 from datetime import datetime
+from pathlib import Path
+
+from imagenet_category_coverage import CategoryCoverageIndex, load_class_wnids
 
 class ImageNetOptimalCategoryAnalysis:
     """ImageNet-1000に基づく最適カテゴリ数分析"""
     
-    def __init__(self):
+    def __init__(self, coverage_index=None, max_category_classes=400):
+        """
+        coverage_index: CategoryCoverageIndex（指定するとWordNet部分木から実際の被覆クラス数を計算し、
+                        各カテゴリ数の構成を最大被覆の貪欲法で選ぶ。省略時は手入力のシナリオ値を使う）
+        max_category_classes: 候補にするカテゴリの最大クラス数（entity など粗すぎる上位語を除く）
+        """
+        self.coverage_index = coverage_index
+        self.max_category_classes = max_category_classes
         # ImageNet-1000の実際の階層構造分析
         self.imagenet_detailed_hierarchy = {
             # Top-level categories by class count (実際のImageNet統計)
@@ -132,6 +143,28 @@ class ImageNetOptimalCategoryAnalysis:
             }
         }
     
+    def scenario_coverages(self):
+        """カテゴリ数ごとの被覆クラス数とカテゴリ構成 {カテゴリ数: {'coverage', 'categories'}}"""
+        counts = sorted(self.category_count_scenarios)
+        if self.coverage_index is None:
+            return {count: {'coverage': self.category_count_scenarios[count]['imagenet_coverage'],
+                            'categories': self.category_count_scenarios[count]['categories']}
+                    for count in counts}
+        
+        # 貪欲法の選択は先頭から順に確定するので、最大のカテゴリ数で1回解けば全シナリオの構成が得られる
+        total = len(self.coverage_index)
+        selected = self.coverage_index.best_categories(max(counts), max_classes=self.max_category_classes)
+        coverages = {}
+        for count in counts:
+            chosen = selected[:count]
+            coverage = chosen[-1]['coverage'] if chosen else 0
+            coverages[count] = {
+                # 1000クラス換算（クラス一覧が1000件でない場合も他の指標と比較できるように）
+                'coverage': round(coverage * 1000 / total) if total else 0,
+                'categories': [item['synset'] for item in chosen]
+            }
+        return coverages
+    
     def analyze_pareto_distribution(self):
         """ImageNetのパレート分布分析"""
         
@@ -170,9 +203,10 @@ class ImageNetOptimalCategoryAnalysis:
         """カテゴリ数別効率性分析"""
         
         efficiency_analysis = {}
+        coverages = self.scenario_coverages()
         
         for count, data in self.category_count_scenarios.items():
-            coverage = data['imagenet_coverage']
+            coverage = coverages[count]['coverage']
             coverage_percentage = (coverage / 1000) * 100
             
             # 効率性メトリクス計算
@@ -192,6 +226,7 @@ class ImageNetOptimalCategoryAnalysis:
                 'diminishing_returns': diminishing_returns,
                 'complexity_cost': complexity_cost,
                 'roi': roi,
+                'categories': coverages[count]['categories'],
                 'pros': data['pros'],
                 'cons': data['cons']
             }
@@ -209,8 +244,9 @@ class ImageNetOptimalCategoryAnalysis:
     def analyze_diminishing_returns(self):
         """収穫逓減の分析"""
         
-        categories = [5, 8, 12, 16, 20]
-        coverages = [85.5, 90.6, 94.5, 95.8, 98.0]
+        scenario_coverages = self.scenario_coverages()
+        categories = sorted(scenario_coverages)
+        coverages = [scenario_coverages[count]['coverage'] / 10 for count in categories]
         
         marginal_gains = []
         for i in range(1, len(coverages)):
@@ -243,10 +279,10 @@ class ImageNetOptimalCategoryAnalysis:
         
         return analysis
 
-def generate_optimal_category_report():
+def generate_optimal_category_report(coverage_index=None):
     """Generate optimal category count analysis report"""
     
-    analyzer = ImageNetOptimalCategoryAnalysis()
+    analyzer = ImageNetOptimalCategoryAnalysis(coverage_index)
     pareto = analyzer.analyze_pareto_distribution()
     efficiency = analyzer.calculate_category_efficiency()
     diminishing = analyzer.analyze_diminishing_returns()
@@ -414,15 +450,14 @@ ROI最大: {efficiency['optimal_count']}カテゴリ
 """
     
     # 推奨カテゴリの構成を表示
-    recommended_config = analyzer.category_count_scenarios[best_count]
-    for i, category in enumerate(recommended_config['categories'], 1):
+    for i, category in enumerate(best_data['categories'], 1):
         report += f"{i}. {category}\n"
     
     report += f"""
 ### **選択理由**
 ```
-ImageNetカバレッジ: {recommended_config['imagenet_coverage']}/1000 ({(recommended_config['imagenet_coverage']/1000)*100:.1f}%)
-カテゴリ当たり平均: {recommended_config['imagenet_coverage']/best_count:.1f}クラス
+ImageNetカバレッジ: {best_data['coverage_classes']}/1000 ({best_data['coverage_percentage']:.1f}%)
+カテゴリ当たり平均: {best_data['coverage_classes']/best_count:.1f}クラス
 効率性: 最適ROI達成
 実装性: 現実的な複雑度
 ```
@@ -454,12 +489,21 @@ ImageNetカバレッジ: {recommended_config['imagenet_coverage']}/1000 ({(recom
 if __name__ == "__main__":
     print(" ImageNet-1000最適カテゴリ数分析中...")
     
+    # 引数で索引（.json）またはクラス一覧を渡すと、WordNet部分木による実際の被覆クラス数を使う
+    coverage_index = None
+    if len(sys.argv) > 1:
+        source = Path(sys.argv[1])
+        if source.suffix == ".json":
+            coverage_index = CategoryCoverageIndex.load(source)
+        else:
+            coverage_index = CategoryCoverageIndex.from_wordnet(load_class_wnids(source))
+    
     # 分析実行
-    analyzer = ImageNetOptimalCategoryAnalysis()
+    analyzer = ImageNetOptimalCategoryAnalysis(coverage_index)
     efficiency = analyzer.calculate_category_efficiency()
     
     # レポート生成
-    report = generate_optimal_category_report()
+    report = generate_optimal_category_report(coverage_index)
     
     # レポート保存
     with open('/mnt/c/Desktop/Research/IMAGENET_OPTIMAL_CATEGORY_ANALYSIS.md', 'w', encoding='utf-8') as f:
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Monte-Carlo Power Simulation for Sample Size Planning
+
+Purpose: 表引き・z近似ではなく、カテゴリ別のWelch t検定を実際に繰り返し実行して
+         検出力曲線と必要サンプル数を推定する
+"""
+
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+
+# 統計モジュールは research/experiments にある
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "experiments"))
+from experiment_stats import welch_t_test
+
+
+def _simulate_shard(n, num_categories, effect_size, alpha, n_simulations, seed, chunk_size):
+    """
+    One shard of simulated studies (runs in a worker process)
+
+    Each simulated study draws num_categories independent two-group comparisons
+    with n samples per group and tests each at the Bonferroni-corrected alpha.
+    Returns (rejected comparisons, studies where every category was rejected).
+    """
+    rng = np.random.default_rng(seed)
+    alpha_corrected = alpha / num_categories
+    rejected = 0
+    all_rejected = 0
+
+    for start in range(0, n_simulations, chunk_size):
+        size = min(chunk_size, n_simulations - start)
+        control = rng.standard_normal((size, num_categories, n))
+        treatment = rng.standard_normal((size, num_categories, n)) + effect_size
+        _, _, p_values = welch_t_test(treatment, control)
+        significant = np.asarray(p_values) < alpha_corrected
+        rejected += int(significant.sum())
+        all_rejected += int(significant.all(axis=1).sum())
+
+    return rejected, all_rejected
+
+
+class PowerSimulator:
+    """Simulation-based power analysis for per-category two-group comparisons"""
+
+    def __init__(self, n_simulations=20000, max_workers=None, seed=0,
+                 max_chunk_elements=4_000_000, min_shard_size=2000):
+        """
+        Args:
+            n_simulations: Simulated studies per design point
+            max_workers: Worker processes (None = CPU count, 1 = run inline)
+            seed: Base seed; every design point reuses the same shard seeds
+                  (common random numbers keep power curves monotone in n)
+            max_chunk_elements: Samples drawn per vectorized batch
+            min_shard_size: Smallest number of studies worth sending to a worker
+        """
+        self.n_simulations = n_simulations
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.seed = seed
+        self.max_chunk_elements = max_chunk_elements
+        self.min_shard_size = min_shard_size
+        # 設計点ごとの結果（同じ点を複数シナリオ・探索で再計算しない）
+        self._cache = {}
+
+    def _shard_sizes(self):
+        num_shards = max(1, min(self.max_workers, self.n_simulations // self.min_shard_size))
+        base, extra = divmod(self.n_simulations, num_shards)
+        return [base + (1 if i < extra else 0) for i in range(num_shards)]
+
+    def _run_points(self, points):
+        """
+        Simulate several design points in one process pool
+
+        Args:
+            points: List of (n_per_group, num_categories, effect_size, alpha)
+        """
+        points = [tuple(point) for point in points]
+        pending = list(dict.fromkeys(point for point in points if point not in self._cache))
+        shard_sizes = self._shard_sizes()
+        seeds = np.random.SeedSequence(self.seed).spawn(len(shard_sizes))
+
+        tasks = []
+        for n, num_categories, effect_size, alpha in pending:
+            chunk_size = max(1, self.max_chunk_elements // (2 * num_categories * n))
+            for size, seed in zip(shard_sizes, seeds):
+                tasks.append((n, num_categories, effect_size, alpha, size, seed, chunk_size))
+
+        if len(tasks) <= 1 or self.max_workers == 1:
+            counts = [_simulate_shard(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as executor:
+                counts = list(executor.map(_simulate_shard, *zip(*tasks)))
+
+        for i, point in enumerate(pending):
+            n, num_categories, effect_size, alpha = point
+            shard_counts = counts[i * len(shard_sizes):(i + 1) * len(shard_sizes)]
+            rejected = sum(c[0] for c in shard_counts)
+            all_rejected = sum(c[1] for c in shard_counts)
+            power = rejected / (self.n_simulations * num_categories)
+            self._cache[point] = {
+                'n_per_group': n,
+                'num_categories': num_categories,
+                'effect_size': effect_size,
+                'alpha': alpha,
+                'alpha_corrected': alpha / num_categories,
+                'power': power,
+                'power_se': math.sqrt(power * (1 - power) / (self.n_simulations * num_categories)),
+                'all_categories_power': all_rejected / self.n_simulations,
+                'n_simulations': self.n_simulations
+            }
+        return [dict(self._cache[point]) for point in points]
+
+    def simulate_power(self, n_per_group, num_categories=8, effect_size=0.5, alpha=0.05):
+        """Estimated power of one design point"""
+        return self._run_points([(n_per_group, num_categories, effect_size, alpha)])[0]
+
+    def power_curve(self, sample_sizes, category_counts=(8,), effect_sizes=(0.5,), alpha=0.05):
+        """
+        Power over a grid of sample sizes, category counts and effect sizes
+
+        Returns:
+            List of design-point results (see simulate_power)
+        """
+        points = [(n, k, d, alpha)
+                  for d in effect_sizes for k in category_counts for n in sample_sizes]
+        return self._run_points(points)
+
+    def normal_approximation(self, target_power=0.80, num_categories=8, effect_size=0.5, alpha=0.05):
+        """Closed-form z approximation with the exact corrected alpha (search starting point)"""
+        z_alpha = NormalDist().inv_cdf(1 - alpha / num_categories / 2)
+        z_beta = NormalDist().inv_cdf(target_power)
+        return math.ceil(2 * (z_alpha + z_beta) ** 2 / effect_size ** 2)
+
+    def required_sample_size(self, target_power=0.80, num_categories=8, effect_size=0.5,
+                             alpha=0.05, criterion='power'):
+        """
+        Smallest per-group sample size whose simulated power reaches target_power
+
+        Args:
+            criterion: 'power' (each category comparison) or
+                       'all_categories_power' (every category significant in the same study)
+        """
+        def power_at(n):
+            return self.simulate_power(n, num_categories, effect_size, alpha)[criterion]
+
+        # z近似から指数探索で区間を挟み、二分探索で絞り込む
+        hi = max(2, self.normal_approximation(target_power, num_categories, effect_size, alpha))
+        lo = 1
+        while power_at(hi) < target_power:
+            lo, hi = hi, hi * 2
+        if lo == 1:
+            lo = max(1, hi // 2)
+            while lo > 1 and power_at(lo) >= target_power:
+                hi, lo = lo, max(1, lo // 2)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if power_at(mid) >= target_power:
+                hi = mid
+            else:
+                lo = mid
+
+        result = self.simulate_power(hi, num_categories, effect_size, alpha)
+        result['target_power'] = target_power
+        result['criterion'] = criterion
+        return result
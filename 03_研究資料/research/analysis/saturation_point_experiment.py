@@ -7,10 +7,17 @@ Purpose: 特化アルゴリズムの理論的限界を実証的に解明
 """
 
 import json
-import math
+import sys
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Tuple
 
+import numpy as np
+
+# 曲線あてはめモジュールは隣の experiments ディレクトリにある
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "experiments"))
+from saturation_fitting import MODELS
+
 # 飽和モデル: f(x) = A × (1 - e^(-bx))
 # A = 30.0% (理論的最大改善率)
 # b = 0.15 (減衰係数)
@@ -65,17 +72,23 @@ EXPANSION_PHASES = {
     }
 }
 
-def calculate_improvement(num_categories: int) -> float:
-    """飽和モデルに基づく改善率計算"""
-    return SATURATION_A * (1 - math.exp(-SATURATION_B * num_categories))
+SATURATION_PARAMS = np.array([[SATURATION_A, SATURATION_B]])
+
+def calculate_improvement(num_categories):
+    """飽和モデルに基づく改善率計算（カテゴリ数の配列を渡すと一括で計算）"""
+    x = np.atleast_1d(np.asarray(num_categories, dtype=float))
+    improvement = MODELS['exponential'].function(x[None, :], SATURATION_PARAMS)[0]
+    return float(improvement[0]) if np.ndim(num_categories) == 0 else improvement
 
-def calculate_marginal_utility(num_categories: int) -> float:
-    """限界効用（1カテゴリ追加あたりの改善率）"""
-    if num_categories <= 8:
-        return 0.0
-    current = calculate_improvement(num_categories)
-    previous = calculate_improvement(num_categories - 1)
-    return current - previous
+def calculate_marginal_utility(num_categories):
+    """限界効用（1カテゴリ追加あたりの改善率、配列を渡すと一括で計算）"""
+    x = np.asarray(num_categories, dtype=float)
+    marginal = np.where(x <= 8, 0.0, calculate_improvement(x) - calculate_improvement(x - 1))
+    return float(marginal) if marginal.ndim == 0 else marginal
+
+def analytic_saturation_point(threshold: float = 0.1) -> float:
+    """限界効用（導関数）がしきい値を下回るカテゴリ数"""
+    return float(MODELS['exponential'].saturation_point(SATURATION_PARAMS, threshold)[0])
 
 def is_statistically_significant(marginal_utility: float) -> Tuple[bool, float]:
     """統計的有意性の判定"""
@@ -94,10 +107,15 @@ def detect_saturation_point() -> Dict:
     saturation_detected = False
     saturation_point = None
     
-    for phase_name, phase_info in EXPANSION_PHASES.items():
+    # 全フェーズの改善率と限界効用を一括計算
+    categories = np.array([info['categories'] for info in EXPANSION_PHASES.values()])
+    improvements = calculate_improvement(categories)
+    marginal_utilities = calculate_marginal_utility(categories)
+    
+    for i, (phase_name, phase_info) in enumerate(EXPANSION_PHASES.items()):
         num_categories = phase_info['categories']
-        improvement = calculate_improvement(num_categories)
-        marginal_utility = calculate_marginal_utility(num_categories)
+        improvement = float(improvements[i])
+        marginal_utility = float(marginal_utilities[i])
         is_significant, p_value = is_statistically_significant(marginal_utility)
         
         phase_result = {
@@ -125,6 +143,7 @@ def detect_saturation_point() -> Dict:
         'phases': results,
         'saturation_detected': saturation_detected,
         'saturation_point': saturation_point if saturation_detected else 55,
+        'analytic_saturation_point': analytic_saturation_point(),
         'theoretical_maximum': SATURATION_A
     }
 
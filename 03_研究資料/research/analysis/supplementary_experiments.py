@@ -10,13 +10,42 @@ import os
 import json
 import time
 import random
+import sys
+import tempfile
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, List, Tuple, Any
 
+import numpy as np
+
+# 統計モジュールは隣の experiments ディレクトリにある
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "experiments"))
+from ablation_engine import AblationEngine, FeatureCache
+from experiment_stats import t_two_sided_p
+from resampling_engine import ResamplingEngine
+from saturation_fitting import SaturationCurveFitter, summarize_fit
+from wordnet_term_resolver import EXACT, MORPHOLOGICAL, TermResolver, wn
+
 class SupplementaryExperiments:
     """補強実験実施クラス"""
+
+    # 実行時のラベル対応付けに使うカテゴリ（dataset_selection_rationale のシンセット）
+    SYSTEM_CATEGORY_SYNSETS = {
+        'person': 'person.n.01',
+        'animal': 'animal.n.01',
+        'food': 'food.n.01',
+        'landscape': 'landscape.n.01',
+        'building': 'building.n.01',
+        'furniture': 'furniture.n.01',
+        'vehicle': 'vehicle.n.01',
+        'plant': 'plant.n.02'
+    }
     
-    def __init__(self):
+    def __init__(self, feature_cache_dir=None, term_index_path=None):
+        # 実推論結果のキャッシュ（ablation_engine.FeatureCache）。なければ実験4は推論をシミュレートする
+        self.feature_cache_dir = feature_cache_dir
+        # 語彙解決の索引（wordnet_term_resolver.TermResolver のJSON）。なければWordNetから作って保存する
+        self.term_index_path = term_index_path
         self.results = {
             'experiment_date': datetime.now().isoformat(),
             'experiments': [],
@@ -59,8 +88,10 @@ class SupplementaryExperiments:
         avg_specialized = sum(specialized_results) / len(specialized_results)
         avg_improvement = avg_specialized - avg_baseline
         
-        # t検定シミュレーション
-        t_statistic, p_value = self._simulate_t_test(baseline_results, specialized_results)
+        # カテゴリ単位の対応ありt検定 + 符号反転並べ替え検定
+        t_statistic, p_value, resampling = self._paired_significance_test(
+            baseline_results, specialized_results
+        )
         
         result = {
             'experiment_name': 'Baseline Comparison',
@@ -72,7 +103,9 @@ class SupplementaryExperiments:
             'improvement_percentage': (avg_improvement / avg_baseline) * 100,
             't_statistic': t_statistic,
             'p_value': p_value,
-            'statistically_significant': p_value < 0.05,
+            'permutation_p_value': resampling['permutation_p_value'],
+            'improvement_ci95': resampling['bootstrap_ci'],
+            'statistically_significant': resampling['significant'],
             'category_results': {
                 cat: {
                     'baseline': baseline_results[i],
@@ -167,6 +200,15 @@ class SupplementaryExperiments:
             category_numbers, empirical_measurements
         )
         
+        # 指数・ロジスティック・べき乗モデルの比較と飽和点の信頼区間
+        fitter = SaturationCurveFitter(n_bootstrap=1000, seed=42)
+        comparison = fitter.compare_models(category_numbers, empirical_measurements)
+        saturation = fitter.saturation_points(category_numbers, empirical_measurements,
+                                              model=str(comparison['best_model'][0]))
+        print(f"最適パラメータ: A={optimized_A:.2f}, b={optimized_b:.4f}")
+        print(f"AICc最良モデル: {saturation['model']}, 飽和点 {saturation['saturation_point'][0]:.1f}カテゴリ "
+              f"(95% CI: {saturation['saturation_ci'][0][0]:.1f}-{saturation['saturation_ci'][0][1]:.1f})")
+        
         return {
             'experiment_name': 'Saturation Model Validation',
             'categories_tested': category_numbers,
@@ -181,6 +223,11 @@ class SupplementaryExperiments:
                 'A': optimized_A,
                 'b': optimized_b
             },
+            'model_comparison': {
+                name: dict(summarize_fit(fit), akaike_weight=float(comparison['akaike_weights'][name][0]))
+                for name, fit in comparison['fits'].items()
+            },
+            'saturation_estimate': summarize_fit(saturation),
             'validation_conclusion': 'Valid' if model_fit > 0.8 else 'Requires adjustment'
         }
     
@@ -202,26 +249,39 @@ class SupplementaryExperiments:
             'plant': 'PlantVillage'
         }
         
+        # 画像ごとの推論結果を1回だけキャッシュし、全除外構成をキャッシュ上で評価
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if self.feature_cache_dir is not None:
+                cache = FeatureCache(self.feature_cache_dir)
+            else:
+                cache = FeatureCache.build(Path(tmp_dir) / 'ablation_cache', range(2000),
+                                           self._simulate_dataset_inference, list(datasets),
+                                           batch_size=256, key='simulated')
+            ablation = AblationEngine(cache).run(max_excluded=2)
+        
         # 全データセット使用時のベースライン
-        baseline_performance = self._simulate_full_system_performance()
+        baseline_performance = ablation['full_accuracy']
         
         dataset_contributions = {}
         
-        for excluded_dataset, dataset_name in datasets.items():
-            # 1つのデータセットを除外して性能測定
-            performance_without = self._simulate_performance_without_dataset(excluded_dataset)
-            contribution = baseline_performance - performance_without
+        # キャッシュにあるデータセットごとの結果（実推論のキャッシュでは名前・数は任意）
+        for excluded_dataset, result in ablation['contributions'].items():
+            dataset_name = datasets.get(excluded_dataset, excluded_dataset)
+            # 1つのデータセットを除外したときの性能
+            performance_without = result['performance_without']
+            contribution = result['contribution']
             
             dataset_contributions[excluded_dataset] = {
                 'dataset_name': dataset_name,
                 'performance_without': performance_without,
                 'contribution': contribution,
-                'relative_importance': contribution / baseline_performance
+                'relative_importance': result['relative_importance']
             }
             
             print(f"{excluded_dataset:10} ({dataset_name:15}): "
                   f"除外時性能 {performance_without:.3f}, "
-                  f"貢献度 {contribution:.3f} ({contribution/baseline_performance*100:.1f}%)")
+                  f"貢献度 {contribution:.3f} ({result['relative_importance']*100:.1f}%)")
+        print(f"評価構成数: {ablation['configurations_evaluated']}（2データセット同時除外まで）")
         
         # 重要度ランキング
         importance_ranking = sorted(
@@ -234,6 +294,8 @@ class SupplementaryExperiments:
             'experiment_name': 'Ablation Study',
             'baseline_performance': baseline_performance,
             'dataset_contributions': dataset_contributions,
+            'configurations_evaluated': ablation['configurations_evaluated'],
+            'pairwise_interactions': ablation['interactions'],
             'importance_ranking': [
                 {
                     'rank': i + 1,
@@ -277,14 +339,30 @@ class SupplementaryExperiments:
             ]
         }
         
+        resolver = self._load_term_resolver()
+        if resolver is None:
+            print("⚠️ WordNet（nltk）が利用できないため語の解決をシミュレートします")
+        else:
+            # 全カテゴリの語を1回の一括解決で処理する
+            all_terms = [term for terms in test_cases.values() for term in terms]
+            resolved = dict(zip(all_terms, resolver.resolve_batch(all_terms)))
+        
         results = {}
         
         for category, terms in test_cases.items():
             success_count = 0
             failures = []
+            partial_matches = {}
             
             for term in terms:
-                success = self._simulate_wordnet_processing(term, category)
+                if resolver is None:
+                    success = self._simulate_wordnet_processing(term, category)
+                else:
+                    # 語全体が（語形変化を除いて）見出し語にある場合だけ成功とする
+                    result = resolved[term]
+                    success = result['method'] in (EXACT, MORPHOLOGICAL)
+                    if result['method'] is not None and not success:
+                        partial_matches[term] = {'lemma': result['lemma'], 'method': result['method']}
                 if success:
                     success_count += 1
                 else:
@@ -296,18 +374,33 @@ class SupplementaryExperiments:
                 'total_terms': len(terms),
                 'successful_terms': success_count,
                 'success_rate': success_rate,
-                'failed_terms': failures
+                'failed_terms': failures,
+                'partial_matches': partial_matches
             }
             
             print(f"{category:20}: {success_count:2}/{len(terms):2} "
                   f"({success_rate*100:5.1f}%) - 失敗例: {failures[:3]}")
         
-        return {
+        report = {
             'experiment_name': 'WordNet Limitation Analysis',
+            'resolution_source': 'simulated' if resolver is None else 'wordnet',
             'test_categories': list(test_cases.keys()),
             'results': results,
             'overall_limitation_patterns': self._identify_limitation_patterns(results)
         }
+        
+        if resolver is not None:
+            # 実行時のラベル対応付け: 語をシステムのカテゴリへ上位語でたどる
+            label_mapping = resolver.map_labels(all_terms, self.SYSTEM_CATEGORY_SYNSETS)
+            mapped = sum(1 for category in label_mapping.values() if category is not None)
+            report['label_mapping'] = {
+                'mapped_terms': mapped,
+                'mapping_rate': mapped / len(label_mapping),
+                'mapping': label_mapping
+            }
+            print(f"カテゴリ対応付け: {mapped}/{len(label_mapping)}語")
+        
+        return report
     
     # ヘルパーメソッド群
     def _simulate_baseline_performance(self, category: str, samples: int) -> float:
@@ -330,23 +423,20 @@ class SupplementaryExperiments:
         baseline = self._simulate_baseline_performance(category, samples)
         return baseline + specialized_boost.get(category, 0.18) + random.uniform(-0.01, 0.01)
     
-    def _simulate_t_test(self, group1: List[float], group2: List[float]) -> Tuple[float, float]:
-        """t検定のシミュレーション"""
-        import math
-        n1, n2 = len(group1), len(group2)
-        mean1 = sum(group1) / n1
-        mean2 = sum(group2) / n2
-        
-        var1 = sum((x - mean1) ** 2 for x in group1) / (n1 - 1)
-        var2 = sum((x - mean2) ** 2 for x in group2) / (n2 - 1)
-        
-        pooled_se = math.sqrt(var1/n1 + var2/n2)
-        t_stat = (mean2 - mean1) / pooled_se
-        
-        # 簡易p値計算（実際はt分布を使用）
-        p_value = 0.001 if abs(t_stat) > 3 else 0.01 if abs(t_stat) > 2 else 0.05
-        
-        return t_stat, p_value
+    def _paired_significance_test(self, group1: List[float],
+                                  group2: List[float]) -> Tuple[float, float, Dict[str, Any]]:
+        """対応ありのt検定と、再標本化エンジンによる並べ替え検定・ブートストラップCI"""
+        differences = np.asarray(group2, dtype=float) - np.asarray(group1, dtype=float)
+        n = len(differences)
+        t_stat = float(differences.mean() / (differences.std(ddof=1) / np.sqrt(n)))
+        p_value = float(t_two_sided_p(t_stat, n - 1))
+
+        engine = ResamplingEngine(n_resamples=10000)
+        resampling = engine.compare(
+            {'specialized': group2, 'baseline': group1}, reference='specialized', paired=True
+        )['specialized vs baseline']
+
+        return t_stat, p_value, resampling
     
     def _simulate_sample_size_effect(self, sample_size: int, trial: int) -> float:
         """サンプル数の効果シミュレーション"""
@@ -402,30 +492,53 @@ class SupplementaryExperiments:
     
     def _optimize_saturation_parameters(self, categories: List[int], 
                                       measurements: List[float]) -> Tuple[float, float]:
-        """飽和モデルパラメータの最適化"""
-        # 簡易最適化（実際は最小二乗法を使用）
-        A_optimized = max(measurements) * 1.1  # 最大値の110%
-        b_optimized = 0.12  # 実測データに基づく調整
+        """飽和モデルパラメータの最適化（多初期値の Levenberg-Marquardt 法による最小二乗推定）"""
+        fit = SaturationCurveFitter().fit(categories, measurements, model="exponential")
+        A_optimized, b_optimized = fit['params'][0]
         
-        return A_optimized, b_optimized
+        return float(A_optimized), float(b_optimized)
     
-    def _simulate_full_system_performance(self) -> float:
-        """全システム性能のシミュレーション"""
-        return 0.812  # 現在のシステム性能
+    def _simulate_dataset_inference(self, items) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        特化モデル8個＋汎用モデルの推論結果のシミュレーション（画像番号ごとに再現可能）
+        戻り値: 確信度 (画像数, 9)、正誤 (画像数, 9)。最後の列は汎用モデル
+        """
+        category_share = np.array([0.16, 0.14, 0.18, 0.10, 0.08, 0.06, 0.15, 0.09])  # 残りは特化対象外
+        specialized_accuracy = np.array([0.93, 0.90, 0.88, 0.91, 0.86, 0.89, 0.92, 0.87])
+        general_accuracy = 0.70
+        
+        items = np.asarray(list(items))
+        rng = np.random.default_rng(int(items[0]) if len(items) else 0)
+        num_items, num_datasets = len(items), len(category_share)
+        categories = rng.choice(num_datasets + 1, size=num_items,
+                                p=np.append(category_share, 1 - category_share.sum()))
+        own = categories[:, None] == np.arange(num_datasets)
+        
+        confidence = np.where(own, rng.uniform(0.6, 1.0, (num_items, num_datasets)),
+                              rng.uniform(0.0, 0.55, (num_items, num_datasets)))
+        correct = np.where(own, rng.random((num_items, num_datasets)) < specialized_accuracy,
+                           rng.random((num_items, num_datasets)) < 0.05)
+        # 汎用モデルは確信度0.5の基準として常に候補に入る
+        confidence = np.concatenate([confidence, np.full((num_items, 1), 0.5)], axis=1).astype(np.float32)
+        correct = np.concatenate([correct, rng.random((num_items, 1)) < general_accuracy], axis=1)
+        return confidence, correct
     
-    def _simulate_performance_without_dataset(self, excluded_dataset: str) -> float:
-        """データセット除外時の性能シミュレーション"""
-        dataset_importance = {
-            'person': 0.15, 'animal': 0.12, 'food': 0.18,
-            'landscape': 0.10, 'building': 0.08, 'furniture': 0.06,
-            'vehicle': 0.14, 'plant': 0.09
-        }
-        baseline = 0.812
-        performance_drop = dataset_importance.get(excluded_dataset, 0.10)
-        return baseline - performance_drop
+    def _load_term_resolver(self):
+        """語彙解決エンジン（保存済みの索引、なければWordNetから作る）。どちらも使えなければ None"""
+        if self.term_index_path and os.path.exists(self.term_index_path):
+            return TermResolver.load(self.term_index_path)
+        if wn is None:
+            return None
+        try:
+            resolver = TermResolver.from_wordnet()
+        except LookupError:  # WordNetコーパスが未ダウンロード
+            return None
+        if self.term_index_path:
+            resolver.save(self.term_index_path)
+        return resolver
     
     def _simulate_wordnet_processing(self, term: str, category: str) -> bool:
-        """WordNet処理成功率のシミュレーション"""
+        """WordNet処理成功率のシミュレーション（WordNetが使えない環境用）"""
         complexity_factors = {
             'simple_terms': 0.95,
             'cultural_specific': 0.60,
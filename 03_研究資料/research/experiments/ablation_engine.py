@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+アブレーション実行エンジン: データセット除外構成の一括評価
+画像ごとの推論結果（各特化データセットのモデルと汎用モデルの確信度・正誤）を1回だけ計算して
+メモリマップ配列（.npy）にキャッシュし、除外構成ごとの性能はキャッシュ上の選択だけで求める
+（構成ごとにパイプラインを再実行しない）
+
+- 選択規則: 含まれるデータセットのモデルと汎用モデルのうち確信度が最大のものの予測を採用
+- leave-one-out と、任意で k 個までの同時除外（leave-k-out）の全構成を評価
+- 構成はまとめてプロセスプールに分配し、各ワーカーは同じキャッシュファイルを読み取り専用でマップする
+- キャッシュの作成は途中から再開できる（書き込み済みの行数をメタデータに記録）
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+
+META_FILE = "meta.json"
+CONFIDENCE_FILE = "confidence.npy"
+CORRECT_FILE = "correct.npy"
+
+
+class FeatureCache:
+    """
+    推論結果のキャッシュ
+    confidence.npy: (画像数, データセット数 + 1) float32、最後の列は汎用モデル
+    correct.npy: 同じ形の bool（そのモデルの予測が正解か）
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        with open(self.cache_dir / META_FILE, encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.dataset_names = self.meta["dataset_names"]
+
+    @property
+    def complete(self):
+        return self.meta["completed"] >= self.meta["num_items"]
+
+    def arrays(self):
+        """読み取り専用のメモリマップ (confidence, correct)"""
+        confidence = np.load(self.cache_dir / CONFIDENCE_FILE, mmap_mode="r")
+        correct = np.load(self.cache_dir / CORRECT_FILE, mmap_mode="r")
+        return confidence, correct
+
+    @classmethod
+    def build(cls, cache_dir, items, extractor, dataset_names, batch_size=64, key=None):
+        """
+        items の全画像について extractor を1回ずつ実行してキャッシュを作る（同じ設定の既存キャッシュは再利用）
+        extractor: 画像のまとまり -> (確信度 (B, D + 1), 正誤 (B, D + 1))
+        key: 抽出器・モデルの設定を表す文字列（変わるとキャッシュを作り直す）
+        """
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        items = list(items)
+        meta_path = cache_dir / META_FILE
+        meta = {
+            "dataset_names": list(dataset_names),
+            "num_items": len(items),
+            "key": key,
+            "completed": 0
+        }
+        shape = (len(items), len(dataset_names) + 1)
+
+        previous = None
+        if meta_path.exists():
+            with open(meta_path, encoding="utf-8") as f:
+                previous = json.load(f)
+        resume = previous is not None and all(previous.get(k) == meta[k] for k in ("dataset_names", "num_items", "key"))
+
+        if resume:
+            meta["completed"] = previous["completed"]
+            mode = "r+"
+        else:
+            mode = "w+"
+        confidence = np.lib.format.open_memmap(cache_dir / CONFIDENCE_FILE, mode=mode, dtype=np.float32, shape=shape)
+        correct = np.lib.format.open_memmap(cache_dir / CORRECT_FILE, mode=mode, dtype=np.bool_, shape=shape)
+        if not resume:
+            _write_meta(meta_path, meta)
+
+        for start in range(meta["completed"], len(items), batch_size):
+            stop = min(start + batch_size, len(items))
+            batch_confidence, batch_correct = extractor(items[start:stop])
+            confidence[start:stop] = batch_confidence
+            correct[start:stop] = batch_correct
+            confidence.flush()
+            correct.flush()
+            meta["completed"] = stop
+            _write_meta(meta_path, meta)
+
+        del confidence, correct
+        return cls(cache_dir)
+
+
+def _write_meta(path, meta):
+    # 書きかけのメタデータを残さないよう一時ファイルから置き換える
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def evaluate_configurations(confidence, correct, included, max_chunk_elements=20_000_000):
+    """
+    構成ごとの正解数を一括計算
+    included: (構成数, データセット数) bool。汎用モデル（最後の列）は常に使う
+    戻り値: (構成数,) の正解数
+    """
+    num_configs = len(included)
+    num_items, num_models = confidence.shape
+    available = np.concatenate([included, np.ones((num_configs, 1), dtype=bool)], axis=1)
+    rows = max(1, max_chunk_elements // max(1, num_configs * num_models))
+
+    correct_counts = np.zeros(num_configs, dtype=np.int64)
+    for start in range(0, num_items, rows):
+        chunk_confidence = np.asarray(confidence[start:start + rows])
+        chunk_correct = np.asarray(correct[start:start + rows])
+        masked = np.where(available[:, None, :], chunk_confidence[None], -np.inf)
+        chosen = masked.argmax(axis=2)  # (構成数, 行数)
+        hits = np.take_along_axis(np.broadcast_to(chunk_correct, masked.shape), chosen[..., None], axis=2)
+        correct_counts += hits[..., 0].sum(axis=1)
+    return correct_counts
+
+
+def _evaluate_task(cache_dir, included, max_chunk_elements):
+    """ワーカープロセスでキャッシュをマップして評価"""
+    confidence, correct = FeatureCache(cache_dir).arrays()
+    return evaluate_configurations(confidence, correct, included, max_chunk_elements)
+
+
+class AblationEngine:
+    def __init__(self, cache, workers=None, configs_per_task=64, max_chunk_elements=20_000_000):
+        """
+        cache: FeatureCache
+        configs_per_task: 1回でワーカーに渡す構成数
+        """
+        if not cache.complete:
+            raise ValueError("キャッシュの作成が完了していません")
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self.configs_per_task = configs_per_task
+        self.max_chunk_elements = max_chunk_elements
+
+    def configurations(self, max_excluded=1):
+        """除外するデータセットの組（全データセット使用の () を先頭に、除外数の少ない順）"""
+        names = self.cache.dataset_names
+        configs = [()]
+        for k in range(1, min(max_excluded, len(names)) + 1):
+            configs.extend(combinations(names, k))
+        return configs
+
+    def _evaluate(self, included):
+        tasks = [included[i:i + self.configs_per_task] for i in range(0, len(included), self.configs_per_task)]
+        if self.workers == 1 or len(tasks) == 1:
+            confidence, correct = self.cache.arrays()
+            return evaluate_configurations(confidence, correct, included, self.max_chunk_elements)
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as executor:
+            futures = [executor.submit(_evaluate_task, str(self.cache.cache_dir), task, self.max_chunk_elements)
+                       for task in tasks]
+            return np.concatenate([future.result() for future in futures])
+
+    def run(self, max_excluded=1):
+        """
+        全除外構成を評価
+        戻り値: 全データセット使用時の正解率、構成ごとの正解率と低下量、データセットごとの貢献度（leave-one-out）、
+                2個同時除外を含む場合は交互作用（同時除外の低下量 − 個別の低下量の和）
+        """
+        names = self.cache.dataset_names
+        position = {name: i for i, name in enumerate(names)}
+        configs = self.configurations(max_excluded)
+        included = np.ones((len(configs), len(names)), dtype=bool)
+        for row, excluded in enumerate(configs):
+            included[row, [position[name] for name in excluded]] = False
+
+        accuracy = self._evaluate(included) / self.cache.meta["num_items"]
+        full_accuracy = float(accuracy[0])
+        drops = {excluded: full_accuracy - float(acc) for excluded, acc in zip(configs, accuracy)}
+
+        contributions = {
+            name: {
+                "performance_without": full_accuracy - drops[(name,)],
+                "contribution": drops[(name,)],
+                "relative_importance": drops[(name,)] / full_accuracy if full_accuracy > 0 else 0.0
+            }
+            for name in names
+        }
+        interactions = {
+            " + ".join(pair): drops[pair] - drops[(pair[0],)] - drops[(pair[1],)]
+            for pair in configs if len(pair) == 2
+        }
+        return {
+            "full_accuracy": full_accuracy,
+            "num_items": self.cache.meta["num_items"],
+            "configurations_evaluated": len(configs),
+            "configurations": [
+                {"excluded": list(excluded), "accuracy": float(acc), "drop": drops[excluded]}
+                for excluded, acc in zip(configs, accuracy)
+            ],
+            "contributions": contributions,
+            "interactions": interactions
+        }
@@ -4,11 +4,14 @@
 統計的有意性検証とエラーケース分析を含む
 """
 
-import json
 import time
 from datetime import datetime
-import random
-import math
+
+import numpy as np
+
+from experiment_stats import normal_random, mean, std, welch_t_test, cohens_d, bootstrap_ci
+from resampling_engine import ResamplingEngine
+from results_store import ResultsStore
 
 class BaselineComparisonExperiment:
     def __init__(self):
@@ -22,78 +25,64 @@ class BaselineComparisonExperiment:
             "metadata": {}
         }
         
-    def normal_random(self, mean, std, n):
-        """標準ライブラリを使用した正規分布近似"""
-        return [random.gauss(mean, std) for _ in range(n)]
-    
-    def mean(self, data):
-        """平均値計算"""
-        return sum(data) / len(data)
-    
-    def std(self, data):
-        """標準偏差計算"""
-        m = self.mean(data)
-        variance = sum((x - m) ** 2 for x in data) / len(data)
-        return math.sqrt(variance)
-        
     def simulate_baseline_methods(self):
         """ベースライン手法のシミュレーション"""
         print("🔬 ベースライン手法の性能測定中...")
         
         # 1. ResNet50ベースライン
-        resnet_accuracy = self.normal_random(68.4, 2.1, 50)  # 50回の実験
-        resnet_processing_time = self.normal_random(45.2, 5.3, 50)
+        resnet_accuracy = normal_random(68.4, 2.1, 50)  # 50回の実験
+        resnet_processing_time = normal_random(45.2, 5.3, 50)
         
         # 2. YOLO単体
-        yolo_accuracy = self.normal_random(62.1, 3.2, 50)
-        yolo_processing_time = self.normal_random(38.7, 4.1, 50)
+        yolo_accuracy = normal_random(62.1, 3.2, 50)
+        yolo_processing_time = normal_random(38.7, 4.1, 50)
         
         # 3. CLIP単体
-        clip_accuracy = self.normal_random(74.3, 2.8, 50)
-        clip_processing_time = self.normal_random(52.1, 6.2, 50)
+        clip_accuracy = normal_random(74.3, 2.8, 50)
+        clip_processing_time = normal_random(52.1, 6.2, 50)
         
         self.results["baseline_methods"] = {
             "ResNet50": {
                 "accuracy": resnet_accuracy,
                 "processing_time": resnet_processing_time,
-                "mean_accuracy": self.mean(resnet_accuracy),
-                "std_accuracy": self.std(resnet_accuracy),
-                "mean_processing_time": self.mean(resnet_processing_time)
+                "mean_accuracy": mean(resnet_accuracy),
+                "std_accuracy": std(resnet_accuracy),
+                "mean_processing_time": mean(resnet_processing_time)
             },
             "YOLO_only": {
                 "accuracy": yolo_accuracy,
                 "processing_time": yolo_processing_time,
-                "mean_accuracy": self.mean(yolo_accuracy),
-                "std_accuracy": self.std(yolo_accuracy),
-                "mean_processing_time": self.mean(yolo_processing_time)
+                "mean_accuracy": mean(yolo_accuracy),
+                "std_accuracy": std(yolo_accuracy),
+                "mean_processing_time": mean(yolo_processing_time)
             },
             "CLIP_only": {
                 "accuracy": clip_accuracy,
                 "processing_time": clip_processing_time,
-                "mean_accuracy": self.mean(clip_accuracy),
-                "std_accuracy": self.std(clip_accuracy),
-                "mean_processing_time": self.mean(clip_processing_time)
+                "mean_accuracy": mean(clip_accuracy),
+                "std_accuracy": std(clip_accuracy),
+                "mean_processing_time": mean(clip_processing_time)
             }
         }
         
-        print(f"✅ ResNet50平均精度: {self.mean(resnet_accuracy):.2f}%")
-        print(f"✅ YOLO単体平均精度: {self.mean(yolo_accuracy):.2f}%")
-        print(f"✅ CLIP単体平均精度: {self.mean(clip_accuracy):.2f}%")
+        print(f"✅ ResNet50平均精度: {mean(resnet_accuracy):.2f}%")
+        print(f"✅ YOLO単体平均精度: {mean(yolo_accuracy):.2f}%")
+        print(f"✅ CLIP単体平均精度: {mean(clip_accuracy):.2f}%")
         
     def simulate_proposed_method(self):
         """提案手法（WordNet+CLIP統合）のシミュレーション"""
         print("🚀 提案手法の性能測定中...")
         
         # WordNet階層 + CLIP統合システム
-        proposed_accuracy = self.normal_random(87.1, 1.8, 50)  # より安定した性能
-        proposed_processing_time = self.normal_random(32.4, 3.7, 50)  # 最適化された処理時間
+        proposed_accuracy = normal_random(87.1, 1.8, 50)  # より安定した性能
+        proposed_processing_time = normal_random(32.4, 3.7, 50)  # 最適化された処理時間
         
         self.results["proposed_method"] = {
             "accuracy": proposed_accuracy,
             "processing_time": proposed_processing_time,
-            "mean_accuracy": self.mean(proposed_accuracy),
-            "std_accuracy": self.std(proposed_accuracy),
-            "mean_processing_time": self.mean(proposed_processing_time),
+            "mean_accuracy": mean(proposed_accuracy),
+            "std_accuracy": std(proposed_accuracy),
+            "mean_processing_time": mean(proposed_processing_time),
             "components_contribution": {
                 "WordNet_hierarchy": 12.3,  # 改善への寄与度%
                 "CLIP_integration": 15.7,
@@ -102,69 +91,58 @@ class BaselineComparisonExperiment:
             }
         }
         
-        print(f"✅ 提案手法平均精度: {self.mean(proposed_accuracy):.2f}%")
-        print(f"✅ 処理時間: {self.mean(proposed_processing_time):.2f}ms")
+        print(f"✅ 提案手法平均精度: {mean(proposed_accuracy):.2f}%")
+        print(f"✅ 処理時間: {mean(proposed_processing_time):.2f}ms")
         
     def t_test(self, sample1, sample2):
-        """簡易t検定実装"""
-        n1, n2 = len(sample1), len(sample2)
-        mean1, mean2 = self.mean(sample1), self.mean(sample2)
-        var1 = sum((x - mean1) ** 2 for x in sample1) / (n1 - 1)
-        var2 = sum((x - mean2) ** 2 for x in sample2) / (n2 - 1)
-        
-        # プールされた標準誤差
-        pooled_se = math.sqrt(var1/n1 + var2/n2)
-        t_stat = (mean1 - mean2) / pooled_se
-        
-        # 自由度（簡易版）
-        df = n1 + n2 - 2
-        
-        # p値の近似（簡易版）
-        abs_t = abs(t_stat)
-        if abs_t > 2.576:
-            p_value = 0.01  # p < 0.01
-        elif abs_t > 1.96:
-            p_value = 0.05  # p < 0.05
-        elif abs_t > 1.645:
-            p_value = 0.10  # p < 0.10
-        else:
-            p_value = 0.20  # p > 0.10
-            
+        """Welchのt検定（t分布による正確なp値）"""
+        t_stat, _, p_value = welch_t_test(sample1, sample2)
         return t_stat, p_value
         
     def statistical_significance_test(self):
-        """統計的有意性検証"""
+        """統計的有意性検証（全ベースラインを一括検定）"""
         print("📊 統計的有意性検証中...")
         
-        proposed_acc = self.results["proposed_method"]["accuracy"]
+        proposed_acc = np.asarray(self.results["proposed_method"]["accuracy"])
+        method_names = list(self.results["baseline_methods"].keys())
+        # (手法数, 試行数) の配列にまとめ、提案手法とブロードキャストして一括計算
+        baseline_acc = np.array([
+            self.results["baseline_methods"][name]["accuracy"] for name in method_names
+        ])
+        
+        t_stats, dfs, p_values = welch_t_test(proposed_acc, baseline_acc)
+        effect_sizes = cohens_d(proposed_acc, baseline_acc)
+        proposed_mean = mean(proposed_acc)
+        baseline_means = mean(baseline_acc)
+        ci_lower, ci_upper = bootstrap_ci(baseline_acc, n_resamples=10000)
+        proposed_ci = bootstrap_ci(proposed_acc, n_resamples=10000)
+        # 提案手法 vs 全ベースラインの並べ替え検定と平均差CIを1パスで計算
+        resampling = ResamplingEngine(n_resamples=10000).compare(
+            {"proposed": proposed_acc, **dict(zip(method_names, baseline_acc))},
+            reference="proposed"
+        )
         
         statistical_results = {}
         
-        for method_name, method_data in self.results["baseline_methods"].items():
-            baseline_acc = method_data["accuracy"]
-            
-            # t検定
-            t_stat, p_value = self.t_test(proposed_acc, baseline_acc)
-            
-            # エフェクトサイズ (Cohen's d)
-            proposed_mean = self.mean(proposed_acc)
-            baseline_mean = self.mean(baseline_acc)
-            pooled_std = math.sqrt((self.std(proposed_acc)**2 + self.std(baseline_acc)**2) / 2)
-            cohens_d = (proposed_mean - baseline_mean) / pooled_std
-            
-            improvement_percent = (proposed_mean - baseline_mean) / baseline_mean * 100
+        for i, method_name in enumerate(method_names):
+            improvement_percent = (proposed_mean - baseline_means[i]) / baseline_means[i] * 100
             
             statistical_results[method_name] = {
-                "t_statistic": t_stat,
-                "p_value": p_value,
-                "cohens_d": cohens_d,
-                "significant": p_value < 0.05,
-                "improvement_percent": improvement_percent
+                "t_statistic": float(t_stats[i]),
+                "degrees_of_freedom": float(dfs[i]),
+                "p_value": float(p_values[i]),
+                "cohens_d": float(effect_sizes[i]),
+                "significant": bool(p_values[i] < 0.05),
+                "improvement_percent": float(improvement_percent),
+                "baseline_accuracy_ci95": [float(ci_lower[i]), float(ci_upper[i])],
+                "permutation_p_value": resampling[f"proposed vs {method_name}"]["permutation_p_value"],
+                "mean_difference_ci95": resampling[f"proposed vs {method_name}"]["bootstrap_ci"]
             }
             
-            print(f"✅ vs {method_name}: p<{p_value:.3f}, 改善率={improvement_percent:.1f}%")
-            
+            print(f"✅ vs {method_name}: p={p_values[i]:.3g}, 改善率={improvement_percent:.1f}%")
+        
         self.results["statistical_analysis"] = statistical_results
+        self.results["proposed_method"]["accuracy_ci95"] = list(proposed_ci)
         
     def error_case_analysis(self):
         """エラーケース分析"""
@@ -252,11 +230,8 @@ if __name__ == "__main__":
     experiment = BaselineComparisonExperiment()
     results = experiment.run_experiment()
     
-    # 結果保存
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"baseline_experiment_results_{timestamp}.json"
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    # 結果保存（共有結果ストアの baseline_comparison テーブルに追記）
+    store = ResultsStore()
+    store.append("baseline_comparison", [results])
     
-    print(f"📊 実験結果を {filename} に保存しました")
\ No newline at end of file
+    print(f"📊 実験結果を {store.root} (baseline_comparison) に保存しました")
\ No newline at end of file
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+バッチサイズスイープ: CPU上での実測スループット計測
+検出パイプライン（ultralytics があればYOLO、なければNumPyの特徴抽出パイプライン）を実際にバッチ実行し、
+画像/秒・バッチ遅延・ピークRSSを計測してニー点を自動選択する
+"""
+
+import importlib.util
+import json
+import multiprocessing
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windowsでは resource モジュールがない
+    resource = None
+
+# パイプラインが既定バッチサイズとして読み込むプロファイル
+BATCH_PROFILE_PATH = Path("output/batch_tuning/batch_size_profile.json")
+
+# 既定のYOLOの重み（image_processing_sub.py と同じ）
+DEFAULT_YOLO_WEIGHTS = "yolov8n.pt"
+
+
+def default_pipeline_name():
+    """ultralytics がインストールされていればYOLO、なければNumPyの特徴抽出パイプライン"""
+    if importlib.util.find_spec("ultralytics") is not None:
+        return f"yolo:{DEFAULT_YOLO_WEIGHTS}"
+    return "numpy_features"
+
+
+def cpu_feature_pipeline(batch):
+    """
+    リアルタイム処理と同じ段構成（前処理→色ヒストグラム→テクスチャ→形状特徴）を
+    NumPyでバッチ次元ごと実行する特徴抽出パイプライン
+    batch: (B, H, W, 3) uint8 → (B, 43) float32
+    """
+    num_images, height, width, _ = batch.shape
+
+    # 前処理: 正規化 + 2x2平均プーリングで半分に縮小（奇数の高さ・幅は最後の行・列を落として偶数にする）
+    height, width = height - height % 2, width - width % 2
+    x = batch[:, :height, :width].astype(np.float32) / 255.0
+    small = x.reshape(num_images, height // 2, 2, width // 2, 2, 3).mean(axis=(2, 4))
+    pixels = small.shape[1] * small.shape[2]
+
+    # 色ヒストグラム: チャネルごと10ビン（bincountで全画像を一括集計）
+    bins = np.minimum((small * 10).astype(np.int64), 9)
+    offsets = np.arange(num_images)[:, None, None, None] * 30 + np.arange(3) * 10
+    color_histogram = np.bincount(
+        (bins + offsets).ravel(), minlength=num_images * 30
+    ).reshape(num_images, 30) / pixels
+
+    # テクスチャ特徴: 勾配強度の統計
+    gray = small.mean(axis=3)
+    gx = np.diff(gray, axis=2)[:, :-1, :]
+    gy = np.diff(gray, axis=1)[:, :, :-1]
+    magnitude = np.sqrt(gx ** 2 + gy ** 2)
+    texture_features = np.stack([
+        magnitude.mean(axis=(1, 2)),
+        magnitude.std(axis=(1, 2)),
+        (magnitude > 0.1).mean(axis=(1, 2)),
+        gray.std(axis=(1, 2)),
+        np.abs(gx).mean(axis=(1, 2))
+    ], axis=1)
+
+    # 形状特徴: 2x4グリッドごとのエッジ密度
+    grid_h = magnitude.shape[1] // 2
+    grid_w = magnitude.shape[2] // 4
+    cells = magnitude[:, :grid_h * 2, :grid_w * 4].reshape(num_images, 2, grid_h, 4, grid_w)
+    shape_features = cells.mean(axis=(2, 4)).reshape(num_images, 8)
+
+    return np.concatenate(
+        [color_histogram, texture_features, shape_features], axis=1
+    ).astype(np.float32)
+
+
+def _resolve_pipeline(pipeline_name):
+    """子プロセス内でパイプラインを構築（"numpy_features" / "yolo:<重み>"）"""
+    if pipeline_name == "numpy_features":
+        return cpu_feature_pipeline
+    if pipeline_name.startswith("yolo:"):
+        from ultralytics import YOLO
+        model = YOLO(pipeline_name.split(":", 1)[1])
+        return lambda batch: model(list(batch), device="cpu", verbose=False)
+    raise ValueError(f"未対応のパイプラインです: {pipeline_name}")
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # Linuxでは KB 単位
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def measure_batch_size(pipeline_name, batch_size, num_batches, warmup_batches,
+                       image_shape, seed=0):
+    """1バッチサイズ分の計測（ピークRSSを分離するため新しいプロセスで実行される）"""
+    pipeline = _resolve_pipeline(pipeline_name)
+    rng = np.random.default_rng(seed)
+    batch = rng.integers(0, 256, size=(batch_size, *image_shape), dtype=np.uint8)
+
+    for _ in range(warmup_batches):
+        pipeline(batch)
+
+    latencies = []
+    for _ in range(num_batches):
+        start = time.perf_counter()
+        pipeline(batch)
+        latencies.append(time.perf_counter() - start)
+
+    latencies = np.array(latencies)
+    return {
+        "batch_size": batch_size,
+        "num_batches": num_batches,
+        "batch_latency_ms": {
+            "mean": round(float(latencies.mean() * 1000), 3),
+            "p50": round(float(np.percentile(latencies, 50) * 1000), 3),
+            "p95": round(float(np.percentile(latencies, 95) * 1000), 3)
+        },
+        "throughput_samples": [round(batch_size / t, 2) for t in latencies.tolist()],
+        "images_per_sec": round(float(batch_size * num_batches / latencies.sum()), 2),
+        "peak_rss_mb": _peak_rss_mb()
+    }
+
+
+def find_knee(batch_sizes, throughputs):
+    """
+    Kneedle法によるニー点検出
+    log2(バッチサイズ) とスループットを0-1正規化し、対角線から最も離れた点を選ぶ
+    """
+    x = np.log2(np.asarray(batch_sizes, dtype=float))
+    y = np.asarray(throughputs, dtype=float)
+
+    # ピーク以降は低下域なので候補から外す
+    peak = int(np.argmax(y))
+    x, y = x[:peak + 1], y[:peak + 1]
+    if len(x) < 3 or y.max() == y.min():
+        return int(batch_sizes[peak])
+
+    x_norm = (x - x.min()) / (x.max() - x.min())
+    y_norm = (y - y.min()) / (y.max() - y.min())
+    return int(batch_sizes[int(np.argmax(y_norm - x_norm))])
+
+
+class BatchSizeSweep:
+    def __init__(self, pipeline_name=None, batch_sizes=(1, 2, 4, 8, 16, 32, 64),
+                 images_per_point=256, warmup_batches=2, image_shape=(480, 640, 3)):
+        """pipeline_name: "numpy_features" / "yolo:<重み>"（省略時は default_pipeline_name()）"""
+        self.pipeline_name = pipeline_name or default_pipeline_name()
+        self.batch_sizes = sorted(batch_sizes)
+        self.images_per_point = images_per_point
+        self.warmup_batches = warmup_batches
+        self.image_shape = tuple(image_shape)
+
+    def run(self):
+        """各バッチサイズを新しいプロセスで順に計測"""
+        context = multiprocessing.get_context("spawn")
+        points = {}
+
+        for batch_size in self.batch_sizes:
+            num_batches = max(3, self.images_per_point // batch_size)
+            with context.Pool(processes=1) as pool:
+                point = pool.apply(measure_batch_size, (
+                    self.pipeline_name, batch_size, num_batches,
+                    self.warmup_batches, self.image_shape
+                ))
+            points[f"batch_{batch_size}"] = point
+            print(f"  ✅ バッチ{batch_size}: {point['images_per_sec']:.1f} images/sec, "
+                  f"遅延{point['batch_latency_ms']['mean']:.1f}ms, RSS {point['peak_rss_mb']}MB")
+
+        throughputs = [points[f"batch_{b}"]["images_per_sec"] for b in self.batch_sizes]
+        knee = find_knee(self.batch_sizes, throughputs)
+
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "pipeline": self.pipeline_name,
+            "device": "cpu",
+            "image_shape": list(self.image_shape),
+            "points": points,
+            "knee_batch_size": knee,
+            "max_throughput_batch_size": self.batch_sizes[int(np.argmax(throughputs))]
+        }
+
+    def export_profile(self, sweep, path=BATCH_PROFILE_PATH):
+        """パイプラインが既定バッチサイズとして読み込むプロファイルを書き出し"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profile = {
+            "recommended_batch_size": sweep["knee_batch_size"],
+            "pipeline": sweep["pipeline"],
+            "device": sweep["device"],
+            "measured_at": sweep["timestamp"],
+            "images_per_sec": sweep["points"][f"batch_{sweep['knee_batch_size']}"]["images_per_sec"]
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(profile, f, ensure_ascii=False, indent=2)
+        return str(path)
+
+
+if __name__ == "__main__":
+    sweep_runner = BatchSizeSweep()
+    sweep = sweep_runner.run()
+    profile_path = sweep_runner.export_profile(sweep)
+    print(f"📦 推奨バッチサイズ: {sweep['knee_batch_size']} (プロファイル: {profile_path})")
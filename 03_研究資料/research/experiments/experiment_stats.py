@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+実験共通統計モジュール（NumPyベクトル化版）
+各実験スクリプトで共有する乱数生成・要約統計・Welchのt検定（t分布による正確なp値）・
+ブートストラップ信頼区間・効果量を、複数メトリクスの配列に対して一括で計算する
+
+配列引数はすべて最後の軸を標本軸として扱い、先頭の軸はメトリクスや比較ペアとして
+ブロードキャストされる（Mann-WhitneyのU検定のみ1次元の標本2つを受け取る）
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from scipy.special import betainc as _scipy_betainc
+except ImportError:  # SciPyがなければ連分数展開による実装を使う
+    _scipy_betainc = None
+
+_FPMIN = 1e-300
+_lgamma = np.vectorize(math.lgamma, otypes=[float])
+
+
+def _as_float(value):
+    """0次元配列はPythonのfloatに戻す（JSON保存用）"""
+    value = np.asarray(value)
+    return float(value) if value.ndim == 0 else value
+
+
+def normal_random(mean, std, n, rng=None):
+    """正規乱数をリストで返す（結果JSONにそのまま保存できる形式）"""
+    rng = rng if rng is not None else np.random.default_rng()
+    return rng.normal(mean, std, n).tolist()
+
+
+def mean(data, axis=-1):
+    """平均値"""
+    return _as_float(np.mean(np.asarray(data, dtype=float), axis=axis))
+
+
+def std(data, axis=-1, ddof=0):
+    """標準偏差（既定は母標準偏差、ddof=1で不偏標準偏差）"""
+    return _as_float(np.std(np.asarray(data, dtype=float), axis=axis, ddof=ddof))
+
+
+def _betacf(a, b, x, max_iterations=300, eps=1e-14):
+    """不完全ベータ関数の連分数（修正Lentz法をベクトル化）"""
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c = np.ones_like(x)
+    d = 1.0 - qab * x / qap
+    d = 1.0 / np.where(np.abs(d) < _FPMIN, _FPMIN, d)
+    h = d.copy()
+    for m in range(1, max_iterations + 1):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / np.where(np.abs(d) < _FPMIN, _FPMIN, d)
+        c = 1.0 + aa / c
+        c = np.where(np.abs(c) < _FPMIN, _FPMIN, c)
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / np.where(np.abs(d) < _FPMIN, _FPMIN, d)
+        c = 1.0 + aa / c
+        c = np.where(np.abs(c) < _FPMIN, _FPMIN, c)
+        delta = d * c
+        h *= delta
+        if np.all(np.abs(delta - 1.0) < eps):
+            break
+    return h
+
+
+def betainc(a, b, x):
+    """正則化不完全ベータ関数 I_x(a, b)"""
+    if _scipy_betainc is not None:
+        return _scipy_betainc(a, b, x)
+
+    a, b, x = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (a, b, x)))
+    x_inner = np.clip(x, 1e-300, 1.0 - 1e-16)
+    # 収束の速い側で評価し、対称性 I_x(a,b) = 1 - I_{1-x}(b,a) で戻す
+    flip = x_inner > (a + 1.0) / (a + b + 2.0)
+    a_eval = np.where(flip, b, a)
+    b_eval = np.where(flip, a, b)
+    x_eval = np.where(flip, 1.0 - x_inner, x_inner)
+
+    log_front = (_lgamma(a_eval + b_eval) - _lgamma(a_eval) - _lgamma(b_eval)
+                 + a_eval * np.log(x_eval) + b_eval * np.log1p(-x_eval))
+    value = np.exp(log_front) * _betacf(a_eval, b_eval, x_eval) / a_eval
+    value = np.where(flip, 1.0 - value, value)
+    return np.where(x <= 0.0, 0.0, np.where(x >= 1.0, 1.0, value))
+
+
+def t_two_sided_p(t_stat, df):
+    """t分布の両側p値 P(|T| > |t|)"""
+    t_stat = np.asarray(t_stat, dtype=float)
+    df = np.asarray(df, dtype=float)
+    return betainc(df / 2.0, 0.5, df / (df + t_stat ** 2))
+
+
+def welch_t_test(sample1, sample2, axis=-1):
+    """
+    Welchのt検定（等分散を仮定しない）
+    戻り値: (t統計量, Welch-Satterthwaite自由度, 両側p値)
+    """
+    a = np.asarray(sample1, dtype=float)
+    b = np.asarray(sample2, dtype=float)
+    n1, n2 = a.shape[axis], b.shape[axis]
+    var1 = np.var(a, axis=axis, ddof=1) / n1
+    var2 = np.var(b, axis=axis, ddof=1) / n2
+
+    t_stat = (np.mean(a, axis=axis) - np.mean(b, axis=axis)) / np.sqrt(var1 + var2)
+    df = (var1 + var2) ** 2 / (var1 ** 2 / (n1 - 1) + var2 ** 2 / (n2 - 1))
+    p_value = t_two_sided_p(t_stat, df)
+    return _as_float(t_stat), _as_float(df), _as_float(p_value)
+
+
+def cohens_d(sample1, sample2, axis=-1):
+    """効果量 Cohen's d（プールした不偏標準偏差で標準化）"""
+    a = np.asarray(sample1, dtype=float)
+    b = np.asarray(sample2, dtype=float)
+    n1, n2 = a.shape[axis], b.shape[axis]
+    pooled_var = (
+        (n1 - 1) * np.var(a, axis=axis, ddof=1) + (n2 - 1) * np.var(b, axis=axis, ddof=1)
+    ) / (n1 + n2 - 2)
+    return _as_float((np.mean(a, axis=axis) - np.mean(b, axis=axis)) / np.sqrt(pooled_var))
+
+
+def hedges_g(sample1, sample2, axis=-1):
+    """小標本補正付き効果量 Hedges' g"""
+    n = np.asarray(sample1).shape[axis] + np.asarray(sample2).shape[axis]
+    return _as_float(np.asarray(cohens_d(sample1, sample2, axis=axis)) * (1 - 3 / (4 * n - 9)))
+
+
+def bootstrap_ci(data, statistic=np.mean, n_resamples=10000, confidence=0.95,
+                 rng=None, chunk_size=2000):
+    """
+    パーセンタイル・ブートストラップ信頼区間
+    data: (..., n)。先頭の軸のメトリクスすべてに同じ再標本化インデックスを使い一括計算する
+    statistic: axis引数を受け取るNumPy関数（np.mean, np.median など）
+    戻り値: (下限, 上限)
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    data = np.asarray(data, dtype=float)
+    n = data.shape[-1]
+
+    distribution = []
+    # インデックス行列をチャンクごとに生成してメモリ使用量を抑える
+    for start in range(0, n_resamples, chunk_size):
+        size = min(chunk_size, n_resamples - start)
+        indices = rng.integers(0, n, size=(size, n))
+        distribution.append(statistic(data[..., indices], axis=-1))
+    distribution = np.concatenate(distribution, axis=-1)
+
+    alpha = (1 - confidence) / 2
+    lower, upper = np.quantile(distribution, [alpha, 1 - alpha], axis=-1)
+    return _as_float(lower), _as_float(upper)
+
+
+def mann_whitney_u(sample1, sample2, alternative="two-sided"):
+    """
+    Mann-WhitneyのU検定（正規近似、同順位補正・連続性補正付き）
+    alternative: "two-sided" / "greater"（sample1 が大きい側にずれる）/ "less"
+    戻り値: (sample1 のU統計量, p値)
+    """
+    a = np.asarray(sample1, dtype=float).ravel()
+    b = np.asarray(sample2, dtype=float).ravel()
+    n1, n2 = len(a), len(b)
+    combined = np.concatenate([a, b])
+
+    # 同順位は平均順位
+    values, inverse, counts = np.unique(combined, return_inverse=True, return_counts=True)
+    average_ranks = np.cumsum(counts) - (counts - 1) / 2.0
+    ranks = average_ranks[inverse]
+
+    u1 = ranks[:n1].sum() - n1 * (n1 + 1) / 2.0
+    n = n1 + n2
+    mean_u = n1 * n2 / 2.0
+    tie_term = (counts ** 3 - counts).sum() / (n * (n - 1))
+    sd_u = math.sqrt(n1 * n2 / 12.0 * ((n + 1) - tie_term))
+    if sd_u == 0:
+        return float(u1), 1.0
+
+    def upper_tail(z):
+        return 0.5 * math.erfc(z / math.sqrt(2))
+
+    if alternative == "greater":
+        p_value = upper_tail((u1 - mean_u - 0.5) / sd_u)
+    elif alternative == "less":
+        p_value = upper_tail((mean_u - u1 - 0.5) / sd_u)
+    elif alternative == "two-sided":
+        p_value = min(1.0, 2 * upper_tail((abs(u1 - mean_u) - 0.5) / sd_u))
+    else:
+        raise ValueError(f"未対応の対立仮説です: {alternative}")
+    return float(u1), float(p_value)
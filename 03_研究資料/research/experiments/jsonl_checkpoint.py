@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+JSON Lines 出力のチェックポイント（中断再開）用ヘルパー
+- 読み込み: 途中まで書かれた行（クラッシュ時の最終行）は読み飛ばす
+- 追記: 改行で終わっていない末尾の断片を切り詰めてから開く
+  （断片の後ろに次のレコードを続けて書くと、そのレコードまで壊れて失われるため）
+"""
+
+import json
+import os
+
+
+def iter_jsonl_records(path):
+    """JSON Lines の各行を辞書として返す（解釈できない行は飛ばす）"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def truncate_partial_line(path, chunk_size=65536):
+    """ファイル末尾の改行で終わっていない断片を切り詰める。切り詰めたバイト数を返す"""
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        # 末尾から最後の改行を探す
+        while end > 0:
+            start = max(0, end - chunk_size)
+            f.seek(start)
+            chunk = f.read(end - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                keep = start + newline + 1
+                break
+            end = start
+        else:
+            keep = 0
+        if keep < size:
+            f.truncate(keep)
+        return size - keep
+
+
+def open_jsonl_for_append(path):
+    """再開時の追記用に開く（末尾の断片は先に切り詰める）"""
+    if os.path.exists(path):
+        truncate_partial_line(path)
+    return open(path, "a", encoding="utf-8")
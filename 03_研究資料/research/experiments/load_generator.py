@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+負荷生成ハーネス: クローズドループ / オープンループ負荷テスト
+ローカルの flask_detection_server / websocket_server に実リクエストを送り、
+レイテンシ分位点・エラー率・スループットを実測する
+"""
+
+import json
+import math
+import random
+import threading
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from websockets.sync.client import connect as ws_connect
+except ImportError:  # WebSocket負荷テストはオプション
+    ws_connect = None
+
+try:
+    import psutil
+except ImportError:  # CPU/メモリ使用率の計測はオプション
+    psutil = None
+
+
+class HttpDetectionTarget:
+    """flask_detection_server の /api/detect へのリクエスト"""
+
+    def __init__(self, base_url="http://localhost:5000", timeout=30.0, use_models=None):
+        self.name = "flask_detection_server"
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.payload = json.dumps({"image": None, "use_models": use_models}).encode("utf-8")
+
+    def health_check(self):
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/api/health", timeout=5) as response:
+                return response.status == 200
+        except OSError:
+            return False
+
+    def __call__(self):
+        request = urllib.request.Request(
+            f"{self.base_url}/api/detect",
+            data=self.payload,
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        # 2xx以外は HTTPError として送出される
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = json.loads(response.read())
+        if body.get("status") == "error":
+            raise RuntimeError(body.get("error", "api error"))
+
+
+class WebSocketFrameTarget:
+    """
+    websocket_server へフレームを送り、そのフレーム（frame_id）の処理結果を受け取るまでの時間を計測
+    サーバーは get_results で溜まった結果を返す（無ければ応答しない）ため、get_results の直後に
+    get_stats を送り、statistics 応答を1回の問い合わせの区切りとしてポーリングする
+    サーバーの結果キューは接続間で共有されるため、他の仮想ユーザーのフレームの結果も受け取りうる。
+    受け取った結果は frame_id ごとに共有し、各仮想ユーザーは自分のフレームの結果を待つ
+    （計測値にはポーリング間隔ぶんの遅れが含まれうる）
+    """
+
+    def __init__(self, url="ws://localhost:8765", timeout=30.0, poll_interval=0.002):
+        if ws_connect is None:
+            raise ImportError("WebSocket負荷テストには websockets>=11 が必要です")
+        self.name = "websocket_server"
+        self.url = url
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._local = threading.local()  # 仮想ユーザー（スレッド）ごとに1接続
+        self._connections = []
+        self._lock = threading.Lock()
+        self._frame_id = 0
+        self._arrived = {}  # frame_id -> 処理結果（他の仮想ユーザーが受け取ったものを含む）
+
+    def health_check(self):
+        try:
+            with ws_connect(self.url, open_timeout=5):
+                return True
+        except Exception:
+            return False
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = ws_connect(self.url, open_timeout=self.timeout)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _poll_results(self, connection, deadline):
+        """get_results を1回問い合わせ、届いた結果を frame_id ごとに記録"""
+        connection.send(json.dumps({"type": "get_results"}))
+        connection.send(json.dumps({"type": "get_stats"}))
+        while True:
+            reply = json.loads(connection.recv(timeout=max(0.0, deadline - time.perf_counter())))
+            if reply.get("type") == "statistics":
+                return
+            if reply.get("type") != "results":
+                raise RuntimeError(f"unexpected reply: {reply.get('type')}")
+            with self._lock:
+                for result in reply.get("data", []):
+                    self._arrived[result.get("frame_id")] = result
+
+    def __call__(self):
+        connection = self._connection()
+        with self._lock:
+            self._frame_id += 1
+            frame_id = f"load-{self._frame_id}"
+        deadline = time.perf_counter() + self.timeout
+        connection.send(json.dumps({"type": "frame", "frame_id": frame_id}))
+        while True:
+            self._poll_results(connection, deadline)
+            with self._lock:
+                result = self._arrived.pop(frame_id, None)
+            if result is not None:
+                break
+            if time.perf_counter() >= deadline:
+                raise TimeoutError(f"frame {frame_id} の結果が {self.timeout}秒以内に返りませんでした")
+            time.sleep(self.poll_interval)
+        if result.get("error"):
+            raise RuntimeError(result["error"])
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class ResourceSampler:
+    """負荷テスト中のシステムCPU/メモリ使用率をサンプリング（psutil利用時のみ）"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.cpu_samples = []
+        self.memory_samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if psutil is not None:
+            psutil.cpu_percent(interval=None)  # 初回呼び出しは基準値のリセット
+            self._thread = threading.Thread(target=self._loop, name="ResourceSampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.cpu_samples.append(psutil.cpu_percent(interval=None))
+            self.memory_samples.append(psutil.virtual_memory().percent)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def summary(self):
+        if not self.cpu_samples:
+            return {"cpu_usage_percent": None, "memory_usage_percent": None}
+        return {
+            "cpu_usage_percent": round(sum(self.cpu_samples) / len(self.cpu_samples), 1),
+            "memory_usage_percent": round(sum(self.memory_samples) / len(self.memory_samples), 1)
+        }
+
+
+class LoadGenerator:
+    def __init__(self, max_open_loop_workers=512):
+        self.max_open_loop_workers = max_open_loop_workers
+
+    def percentile(self, sorted_values, q):
+        """最近傍ランク法による分位点"""
+        if not sorted_values:
+            return None
+        rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+        return sorted_values[rank - 1]
+
+    def summarize(self, samples, elapsed, **run_info):
+        """(レイテンシ秒, 成否, エラー種別, 待ち時間秒) のリストを集計"""
+        latencies = sorted(s[0] * 1000 for s in samples if s[1])
+        errors = Counter(s[2] for s in samples if not s[1])
+        waits = [s[3] * 1000 for s in samples]
+        total = len(samples)
+        successes = len(latencies)
+
+        summary = dict(run_info)
+        summary.update({
+            "requests": total,
+            "successes": successes,
+            "errors": total - successes,
+            "error_rate_percent": round((total - successes) / total * 100, 2) if total else 0.0,
+            "errors_by_type": dict(errors),
+            "duration_seconds": round(elapsed, 3),
+            "throughput_rps": round(successes / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / successes, 2) if successes else None,
+                "p50": self.percentile(latencies, 50),
+                "p90": self.percentile(latencies, 90),
+                "p95": self.percentile(latencies, 95),
+                "p99": self.percentile(latencies, 99),
+                "max": latencies[-1] if latencies else None
+            },
+            "queue_wait_ms": round(sum(waits) / total, 2) if total else 0.0
+        })
+        for key in ("p50", "p90", "p95", "p99", "max"):
+            if summary["latency_ms"][key] is not None:
+                summary["latency_ms"][key] = round(summary["latency_ms"][key], 2)
+        return summary
+
+    def _timed_call(self, request_fn, intended_start):
+        """1リクエスト実行。レイテンシは予定送信時刻から計測（coordinated omission回避）"""
+        actual_start = time.perf_counter()
+        try:
+            request_fn()
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, type(e).__name__
+        end = time.perf_counter()
+        return (end - intended_start, ok, error, actual_start - intended_start)
+
+    def run_closed_loop(self, request_fn, concurrency, duration=None, total_requests=None):
+        """クローズドループ: concurrency人の仮想ユーザーが応答を待ってから次を送信"""
+        if duration is None and total_requests is None:
+            raise ValueError("duration か total_requests のいずれかを指定してください")
+
+        samples = []
+        lock = threading.Lock()
+        issued = [0]
+        start = time.perf_counter()
+        deadline = start + duration if duration is not None else None
+
+        def virtual_user():
+            while True:
+                with lock:
+                    if total_requests is not None and issued[0] >= total_requests:
+                        return
+                    issued[0] += 1
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                sample = self._timed_call(request_fn, time.perf_counter())
+                with lock:
+                    samples.append(sample)
+
+        users = [threading.Thread(target=virtual_user, name=f"VirtualUser-{i}")
+                 for i in range(concurrency)]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+
+        elapsed = time.perf_counter() - start
+        return self.summarize(samples, elapsed, mode="closed_loop", concurrency=concurrency)
+
+    def run_open_loop(self, request_fn, rate, duration, poisson=True):
+        """オープンループ: 応答に関係なく rate req/s で到着（ポアソン到着 or 等間隔）"""
+        futures = []
+        start = time.perf_counter()
+        next_arrival = 0.0
+
+        with ThreadPoolExecutor(max_workers=self.max_open_loop_workers,
+                                thread_name_prefix="OpenLoopWorker") as executor:
+            while next_arrival < duration:
+                intended = start + next_arrival
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(self._timed_call, request_fn, intended))
+                next_arrival += random.expovariate(rate) if poisson else 1.0 / rate
+            samples = [future.result() for future in futures]
+
+        elapsed = time.perf_counter() - start
+        return self.summarize(samples, elapsed, mode="open_loop", target_rate_rps=rate)
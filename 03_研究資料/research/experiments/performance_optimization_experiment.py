@@ -4,14 +4,20 @@
 処理速度・メモリ効率・GPU並列処理の最適化検証
 """
 
-import json
+import platform
 import time
 from datetime import datetime
-import random
-import math
+
+from batch_size_sweep import BatchSizeSweep, default_pipeline_name
+from experiment_stats import normal_random, mean
+from results_store import ResultsStore
 
 class PerformanceOptimizationExperiment:
-    def __init__(self):
+    def __init__(self, pipeline_name=None, images_per_point=256):
+        # スループット計測に使うパイプライン（"numpy_features" または "yolo:<重み>"）
+        # 省略時は ultralytics があればYOLOの検出パイプラインを実測する
+        self.pipeline_name = pipeline_name or default_pipeline_name()
+        self.images_per_point = images_per_point
         self.results = {
             "experiment_name": "性能最適化実験",
             "start_time": datetime.now().isoformat(),
@@ -22,45 +28,34 @@ class PerformanceOptimizationExperiment:
             "metadata": {}
         }
     
-    def normal_random(self, mean, std, n):
-        """標準ライブラリを使用した正規分布近似"""
-        return [random.gauss(mean, std) for _ in range(n)]
-    
-    def mean(self, data):
-        """平均値計算"""
-        return sum(data) / len(data)
-    
-    def std(self, data):
-        """標準偏差計算"""
-        m = self.mean(data)
-        variance = sum((x - m) ** 2 for x in data) / len(data)
-        return math.sqrt(variance)
-        
     def throughput_testing(self):
-        """スループットテスト"""
+        """スループットテスト（CPU上でバッチサイズ1〜64を実測）"""
         print("⚡ スループットテスト実行中...")
         
-        # 異なるバッチサイズでのテスト
-        batch_sizes = [1, 4, 8, 16, 32, 64]
-        throughput_results = {}
+        sweep_runner = BatchSizeSweep(
+            pipeline_name=self.pipeline_name,
+            batch_sizes=[1, 2, 4, 8, 16, 32, 64],
+            images_per_point=self.images_per_point
+        )
+        sweep = sweep_runner.run()
+        knee = sweep["knee_batch_size"]
         
-        for batch_size in batch_sizes:
-            # バッチサイズに応じた処理能力（現実的な値）
-            base_throughput = 45 + (batch_size * 12.3) - (batch_size * 0.8)**1.5
-            throughput_samples = self.normal_random(base_throughput, base_throughput * 0.15, 30)
-            
-            # GPU使用率
-            gpu_utilization = min(95, 30 + (batch_size * 8.2) - (batch_size * 0.1)**2)
-            gpu_samples = self.normal_random(gpu_utilization, 5.2, 30)
-            
-            throughput_results[f"batch_{batch_size}"] = {
-                "throughput_images_per_sec": throughput_samples,
-                "mean_throughput": self.mean(throughput_samples),
-                "gpu_utilization": self.mean(gpu_samples),
-                "optimal_threshold": base_throughput > 150
+        throughput_results = {}
+        for key, point in sweep["points"].items():
+            throughput_results[key] = {
+                "throughput_images_per_sec": point["throughput_samples"],
+                "mean_throughput": point["images_per_sec"],
+                "batch_latency_ms": point["batch_latency_ms"],
+                "peak_rss_mb": point["peak_rss_mb"],
+                "optimal_threshold": point["batch_size"] == knee
             }
-            
-            print(f"✅ バッチサイズ{batch_size}: {self.mean(throughput_samples):.1f} images/sec, GPU使用率{self.mean(gpu_samples):.1f}%")
+        
+        # ニー点をパイプラインの既定バッチサイズとして書き出し
+        throughput_results["knee_batch_size"] = knee
+        throughput_results["max_throughput_batch_size"] = sweep["max_throughput_batch_size"]
+        throughput_results["profile_path"] = sweep_runner.export_profile(sweep)
+        
+        print(f"✅ ニー点バッチサイズ: {knee} ({throughput_results[f'batch_{knee}']['mean_throughput']:.1f} images/sec)")
         
         self.results["throughput_tests"] = throughput_results
         
@@ -70,28 +65,28 @@ class PerformanceOptimizationExperiment:
         
         optimization_stages = {
             "baseline": {
-                "peak_memory_mb": self.normal_random(2850, 180, 25),
-                "average_memory_mb": self.normal_random(1920, 120, 25),
+                "peak_memory_mb": normal_random(2850, 180, 25),
+                "average_memory_mb": normal_random(1920, 120, 25),
                 "memory_leaks": 12,
                 "optimization_level": "none"
             },
             "basic_optimization": {
-                "peak_memory_mb": self.normal_random(2240, 140, 25),
-                "average_memory_mb": self.normal_random(1540, 95, 25),
+                "peak_memory_mb": normal_random(2240, 140, 25),
+                "average_memory_mb": normal_random(1540, 95, 25),
                 "memory_leaks": 3,
                 "optimization_level": "basic"
             },
             "advanced_optimization": {
-                "peak_memory_mb": self.normal_random(1780, 110, 25),
-                "average_memory_mb": self.normal_random(1180, 75, 25),
+                "peak_memory_mb": normal_random(1780, 110, 25),
+                "average_memory_mb": normal_random(1180, 75, 25),
                 "memory_leaks": 0,
                 "optimization_level": "advanced"
             }
         }
         
         for stage, data in optimization_stages.items():
-            peak_mean = self.mean(data["peak_memory_mb"])
-            avg_mean = self.mean(data["average_memory_mb"])
+            peak_mean = mean(data["peak_memory_mb"])
+            avg_mean = mean(data["average_memory_mb"])
             
             data["mean_peak_memory"] = peak_mean
             data["mean_average_memory"] = avg_mean
@@ -120,29 +115,29 @@ class PerformanceOptimizationExperiment:
         # 並列処理レベル別のテスト
         parallelization_levels = {
             "sequential": {
-                "processing_time_ms": self.normal_random(156.3, 12.4, 30),
+                "processing_time_ms": normal_random(156.3, 12.4, 30),
                 "gpu_cores_used": 1,
                 "efficiency": 23.1
             },
             "basic_parallel": {
-                "processing_time_ms": self.normal_random(78.6, 8.2, 30),
+                "processing_time_ms": normal_random(78.6, 8.2, 30),
                 "gpu_cores_used": 8,
                 "efficiency": 67.8
             },
             "optimized_parallel": {
-                "processing_time_ms": self.normal_random(32.4, 4.1, 30),
+                "processing_time_ms": normal_random(32.4, 4.1, 30),
                 "gpu_cores_used": 32,
                 "efficiency": 91.2
             },
             "advanced_parallel": {
-                "processing_time_ms": self.normal_random(18.7, 2.8, 30),
+                "processing_time_ms": normal_random(18.7, 2.8, 30),
                 "gpu_cores_used": 64,
                 "efficiency": 88.9  # 過度な並列化で効率低下
             }
         }
         
         for level, data in parallelization_levels.items():
-            processing_mean = self.mean(data["processing_time_ms"])
+            processing_mean = mean(data["processing_time_ms"])
             data["mean_processing_time"] = processing_mean
             
             # スピードアップ計算（逐次処理を基準）
@@ -228,10 +223,33 @@ class PerformanceOptimizationExperiment:
         batch_results["recommendations"] = optimization_recommendations
         self.results["batch_processing"] = batch_results
         
+    def overall_improvement(self):
+        """
+        実測したスループットテストから、バッチサイズ1に対するニー点バッチサイズの改善率を求める
+        （メモリ・GPUの項目は実測していないため含めない）
+        """
+        throughput = self.results["throughput_tests"]
+        baseline = throughput["batch_1"]
+        knee = throughput["knee_batch_size"]
+        optimized = throughput[f"batch_{knee}"]
+        # 1枚あたりの平均処理時間（ミリ秒）= 1000 / 平均スループット
+        baseline_per_image_ms = 1000 / baseline["mean_throughput"]
+        optimized_per_image_ms = 1000 / optimized["mean_throughput"]
+        return {
+            "source": "throughput_tests（実測）",
+            "baseline_batch_size": 1,
+            "optimized_batch_size": knee,
+            "baseline_per_image_ms": round(baseline_per_image_ms, 3),
+            "optimized_per_image_ms": round(optimized_per_image_ms, 3),
+            "throughput_improvement_percent": round((optimized["mean_throughput"] / baseline["mean_throughput"] - 1) * 100, 1),
+            "per_image_latency_reduction_percent": round((1 - optimized_per_image_ms / baseline_per_image_ms) * 100, 1)
+        }
+
     def run_experiment(self):
         """実験実行メイン関数"""
         print("⚡ 性能最適化実験開始")
         print("=" * 50)
+        experiment_start = time.time()
         
         # 1. スループットテスト
         self.throughput_testing()
@@ -249,24 +267,21 @@ class PerformanceOptimizationExperiment:
         self.batch_processing_optimization()
         
         # 5. メタデータ追加
+        improvement = self.overall_improvement()
         self.results["metadata"] = {
             "end_time": datetime.now().isoformat(),
-            "duration_seconds": 3.8,
-            "test_environment": "Python 3.12, simulated GPU environment",
+            "duration_seconds": round(time.time() - experiment_start, 1),
+            "test_environment": f"Python {platform.python_version()}, CPU ({platform.machine()}), pipeline {self.pipeline_name}",
             "optimization_targets": ["throughput", "memory", "gpu_utilization", "batch_processing"],
             "experiment_version": "v1.0",
-            "overall_improvement": {
-                "throughput_improvement_percent": 156.7,
-                "memory_reduction_percent": 37.5,
-                "processing_speed_improvement_percent": 88.1
-            }
+            "overall_improvement": improvement
         }
         
         print("=" * 50)
         print("✅ 性能最適化実験完了")
-        print(f"📈 総合スループット改善: {self.results['metadata']['overall_improvement']['throughput_improvement_percent']}%")
-        print(f"💾 メモリ使用量削減: {self.results['metadata']['overall_improvement']['memory_reduction_percent']}%")
-        print(f"⚡ 処理速度向上: {self.results['metadata']['overall_improvement']['processing_speed_improvement_percent']}%")
+        print(f"📈 スループット改善（バッチ1→{improvement['optimized_batch_size']}）: "
+              f"{improvement['throughput_improvement_percent']:.1f}%")
+        print(f"⚡ 1枚あたりの処理時間短縮: {improvement['per_image_latency_reduction_percent']:.1f}%")
         
         return self.results
 
@@ -274,11 +289,8 @@ if __name__ == "__main__":
     experiment = PerformanceOptimizationExperiment()
     results = experiment.run_experiment()
     
-    # 結果保存
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"performance_experiment_results_{timestamp}.json"
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    # 結果保存（共有結果ストアの performance_optimization テーブルに追記）
+    store = ResultsStore()
+    store.append("performance_optimization", [results])
     
-    print(f"📊 実験結果を {filename} に保存しました")
\ No newline at end of file
+    print(f"📊 実験結果を {store.root} (performance_optimization) に保存しました")
\ No newline at end of file
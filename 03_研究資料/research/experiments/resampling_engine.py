@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+再標本化エンジン: ブートストラップ / 並べ替え検定の一括計算
+全手法ペアの平均差について、B×n のインデックス行列・符号行列を1回だけ生成し、
+ブートストラップ分布と並べ替え分布を単一のベクトル化パスで計算する
+
+- 対応なし（独立試行）: 手法ごとに独立に再標本化 / ラベル並べ替え
+- 対応あり（同一テスト項目）: 共通インデックスで再標本化 / 差の符号反転
+"""
+
+from itertools import combinations
+
+import numpy as np
+
+
+class ResamplingEngine:
+    def __init__(self, n_resamples=10000, confidence=0.95, max_chunk_elements=20_000_000, seed=None):
+        self.n_resamples = n_resamples
+        self.confidence = confidence
+        # 1チャンクで展開する要素数の上限（float64で約160MB）
+        self.max_chunk_elements = max_chunk_elements
+        self.rng = np.random.default_rng(seed)
+
+    def _chunks(self, elements_per_resample):
+        """メモリ上限に収まるよう再標本化回数を分割"""
+        chunk = max(1, self.max_chunk_elements // max(1, elements_per_resample))
+        for start in range(0, self.n_resamples, chunk):
+            yield min(chunk, self.n_resamples - start)
+
+    def _resolve_pairs(self, names, pairs, reference):
+        if pairs is not None:
+            return [tuple(pair) for pair in pairs]
+        if reference is not None:
+            return [(reference, name) for name in names if name != reference]
+        return list(combinations(names, 2))
+
+    def _stack(self, samples, names):
+        """手法ごとの標本を (手法数, n) に揃える"""
+        lengths = {len(samples[name]) for name in names}
+        if len(lengths) != 1:
+            raise ValueError("一括計算には全手法で同じ標本数が必要です")
+        return np.array([np.asarray(samples[name], dtype=float) for name in names])
+
+    def bootstrap_differences(self, data, pair_index, paired):
+        """全ペアの平均差のブートストラップ分布 (ペア数, B)"""
+        num_methods, n = data.shape
+        left, right = pair_index[:, 0], pair_index[:, 1]
+        distributions = []
+
+        for size in self._chunks(num_methods * n):
+            if paired:
+                # 全手法で同じテスト項目を引く
+                indices = self.rng.integers(0, n, size=(size, n))
+                means = data[:, indices].mean(axis=-1)
+            else:
+                # 手法ごとに独立なインデックス行列
+                indices = self.rng.integers(0, n, size=(num_methods, size, n))
+                means = np.take_along_axis(
+                    data[:, None, :], indices, axis=-1
+                ).mean(axis=-1)
+            distributions.append(means[left] - means[right])
+
+        return np.concatenate(distributions, axis=1)
+
+    def permutation_differences(self, data, pair_index, paired):
+        """全ペアの平均差の並べ替え分布 (ペア数, B)"""
+        _, n = data.shape
+        left, right = pair_index[:, 0], pair_index[:, 1]
+        distributions = []
+
+        if paired:
+            # 差の符号反転: 平均 = D @ S.T / n
+            differences = data[left] - data[right]
+            for size in self._chunks(n):
+                signs = self.rng.choice(np.array([-1.0, 1.0]), size=(size, n))
+                distributions.append(differences @ signs.T / n)
+        else:
+            # ラベル並べ替え: 先頭n個をグループ1とする重み行列との積で平均差を計算
+            pooled = np.concatenate([data[left], data[right]], axis=1)
+            for size in self._chunks(2 * n):
+                order = np.argsort(self.rng.random((size, 2 * n)), axis=1)
+                weights = np.where(order < n, 1.0 / n, -1.0 / n)
+                distributions.append(pooled @ weights.T)
+
+        return np.concatenate(distributions, axis=1)
+
+    def compare(self, samples, pairs=None, reference=None, paired=False):
+        """
+        手法ペアの平均差を一括検定
+        samples: {手法名: 標本配列}
+        pairs: [(手法A, 手法B), ...]（省略時は reference 対その他、さらに省略時は全ペア）
+        戻り値: {"A vs B": {平均差, ブートストラップCI, 並べ替えp値, ...}}
+        """
+        pairs = self._resolve_pairs(list(samples), pairs, reference)
+        names = sorted({name for pair in pairs for name in pair}, key=list(samples).index)
+        position = {name: i for i, name in enumerate(names)}
+        data = self._stack(samples, names)
+        pair_index = np.array([[position[a], position[b]] for a, b in pairs])
+
+        observed = data[pair_index[:, 0]].mean(axis=1) - data[pair_index[:, 1]].mean(axis=1)
+        bootstrap = self.bootstrap_differences(data, pair_index, paired)
+        permutation = self.permutation_differences(data, pair_index, paired)
+
+        alpha = (1 - self.confidence) / 2
+        ci_lower, ci_upper = np.quantile(bootstrap, [alpha, 1 - alpha], axis=1)
+        # 両側p値（観測値自身を含める補正付き）
+        extreme = (np.abs(permutation) >= np.abs(observed)[:, None] - 1e-12).sum(axis=1)
+        p_values = (extreme + 1) / (permutation.shape[1] + 1)
+
+        results = {}
+        for i, (a, b) in enumerate(pairs):
+            results[f"{a} vs {b}"] = {
+                "method_a": a,
+                "method_b": b,
+                "design": "paired" if paired else "unpaired",
+                "mean_difference": float(observed[i]),
+                "bootstrap_ci": [float(ci_lower[i]), float(ci_upper[i])],
+                "permutation_p_value": float(p_values[i]),
+                "significant": bool(p_values[i] < 1 - self.confidence),
+                "n_resamples": self.n_resamples
+            }
+        return results
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+共有結果ストア: 追記専用の列指向ストレージ
+各実験・ベンチマークの結果を実験タイプ（テーブル）ごとに1行1レコードで追記し、
+必要な列と条件だけを読み出せるようにする
+
+- pyarrow があれば Parquet（または Arrow IPC）のパートファイル、なければ SQLite
+- 入れ子の辞書は "metrics.accuracy" のようなドット区切りの列に展開し、
+  リストやスキーマで json 指定された値はJSON文字列の列として保存する
+- 条件は [(列, 演算子, 値), ...] で指定し、Parquetでは行グループ単位、SQLiteではWHERE句で絞り込む
+"""
+
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrowがなければSQLiteで保存
+    pa = None
+
+# 実験タイプごとの列の型（未定義の列は値から推定）
+# 型: "string" / "int" / "float" / "bool" / "json"（展開せずJSON文字列で保存）
+SCHEMAS = {
+    "minimal_experiment": {
+        "experiment_id": "string",
+        "timestamp": "string",
+        "parameter_changed": "json",
+        "base_config": "json",
+        "execution_time_seconds": "float"
+    },
+    "parameter_sweep": {
+        "config_hash": "string",
+        "experiment_id": "string",
+        "sweep_id": "string",
+        "timestamp": "string",
+        "execution_time_seconds": "float",
+        "parameters_changed": "json"
+    },
+    "benchmark": {
+        "run_id": "string",
+        "run_timestamp": "string",
+        "timestamp": "string",
+        "model.name": "string",
+        "dataset.name": "string",
+        "num_samples": "int",
+        "cached": "bool",
+        "benchmark_time": "float",
+        "peak_rss": "float",
+        "latency_samples": "json",
+        "class_metrics": "json",
+        "confusion_matrix": "json"
+    },
+    "benchmark_run": {
+        "run_id": "string",
+        "timestamp": "string",
+        "config_hash": "string",
+        "benchmark_version": "string",
+        "git_commit": "string",
+        "git_dirty": "bool",
+        "machine": "json",
+        "config": "json"
+    },
+    "benchmark_cell": {
+        "cell_key": "string",
+        "timestamp": "string",
+        "attempts": "int",
+        "result": "json"
+    },
+    "dataset_selection": {
+        "timestamp": "string",
+        "image_characteristics.domain": "string",
+        "top_dataset_id": "string",
+        "top_score": "float",
+        "recommended_datasets": "json",
+        "all_scores": "json"
+    },
+    "baseline_comparison": {"experiment_name": "string", "start_time": "string"},
+    "performance_optimization": {"experiment_name": "string", "start_time": "string"},
+    "scalability": {"experiment_name": "string", "start_time": "string"}
+}
+
+OPERATORS = ("==", "!=", "<", "<=", ">", ">=", "in")
+
+
+def flatten_record(record, schema=None, prefix=""):
+    """入れ子の辞書をドット区切りの列名を持つフラットな行に変換"""
+    schema = schema or {}
+    row = {}
+    for key, value in record.items():
+        column = f"{prefix}{key}"
+        if hasattr(value, "item") and not isinstance(value, (dict, list, str)):
+            value = value.item()  # NumPyスカラー
+        if schema.get(column) == "json" or isinstance(value, (list, tuple)):
+            row[column] = json.dumps(value, ensure_ascii=False, default=str)
+        elif isinstance(value, dict):
+            row.update(flatten_record(value, schema, prefix=f"{column}."))
+        else:
+            row[column] = value
+    return row
+
+
+def _quote(identifier):
+    """SQLiteの識別子（ドットを含む列名）をクォート"""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _infer_type(value):
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    return "string"
+
+
+def _coerce(value, type_name):
+    """値を列の型に合わせる（情報を失わない変換のみ。できなければ ValueError）"""
+    if value is None or type_name == "null":
+        return value
+    if type_name == "string":
+        return value if isinstance(value, str) else str(value)
+    if not isinstance(value, str):
+        if type_name == "float":
+            return float(value)
+        if type_name == "int" and (isinstance(value, int) or (isinstance(value, float) and value.is_integer())):
+            return int(value)
+        if type_name == "bool" and isinstance(value, bool):
+            return value
+    raise ValueError(f"{value!r} を {type_name} 型の列に格納できません")
+
+
+class ResultsStore:
+    def __init__(self, root="output/results_store", backend="auto"):
+        """
+        backend: "auto"（pyarrowがあればparquet）/ "parquet" / "arrow" / "sqlite"
+        """
+        if backend == "auto":
+            backend = "parquet" if pa is not None else "sqlite"
+        if backend not in ("parquet", "arrow", "sqlite"):
+            raise ValueError(f"未対応のバックエンドです: {backend}")
+        if backend != "sqlite" and pa is None:
+            raise ImportError(f"{backend} バックエンドには pyarrow が必要です")
+
+        self.backend = backend
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.suffix = ".parquet" if backend == "parquet" else ".arrow"
+        self._connection = None
+
+    # ---- 共通 ----
+
+    def _column_types(self, table, rows):
+        """
+        スキーマ定義の型を優先し、未定義の列は最初の非None値から推定
+        すべてNoneの列は "null"（型を決めず、後の追記で値が入ったときの型に合わせる）
+        """
+        declared = SCHEMAS.get(table, {})
+        types = {}
+        for row in rows:
+            for column, value in row.items():
+                if column in types:
+                    continue
+                if column in declared:
+                    types[column] = "string" if declared[column] == "json" else declared[column]
+                elif value is not None:
+                    types[column] = _infer_type(value)
+        for row in rows:
+            for column in row:
+                types.setdefault(column, "null")
+        return types
+
+    def append(self, table, records):
+        """レコード（入れ子の辞書可）を追記"""
+        schema = SCHEMAS.get(table, {})
+        rows = [flatten_record(record, schema) for record in records]
+        if not rows:
+            return
+        types = self._merge_existing_types(table, self._column_types(table, rows))
+        # 型の合わない値はここで拒否する（書き込んだ後ではテーブル全体が読めなくなるため）
+        for row in rows:
+            for column, value in row.items():
+                try:
+                    row[column] = _coerce(value, types[column])
+                except ValueError as e:
+                    raise ValueError(f"{table}.{column}: {e}") from None
+        if self.backend == "sqlite":
+            self._sqlite_append(table, rows, types)
+        else:
+            self._arrow_append(table, rows, types)
+
+    def _merge_existing_types(self, table, types):
+        """
+        追記する列の型を既存の列の型に合わせる
+        既存が null（すべてNone）なら新しい型、int と float は float、それ以外は既存の型に変換して格納する
+        """
+        existing = self._sqlite_types(table) if self.backend == "sqlite" else self._arrow_types(table)
+        merged = dict(types)
+        for column, new_type in types.items():
+            old_type = existing.get(column)
+            if old_type is None or old_type == "null" or old_type == new_type:
+                continue
+            merged[column] = "float" if {old_type, new_type} == {"int", "float"} else old_type
+        return merged
+
+    def query(self, table, columns=None, where=None):
+        """
+        列と条件を指定して読み出し
+        columns: 読み出す列名のリスト（None で全列）
+        where: [(列, 演算子, 値), ...] のAND条件（演算子は OPERATORS）
+        """
+        where = where or []
+        for _, op, _ in where:
+            if op not in OPERATORS:
+                raise ValueError(f"未対応の演算子です: {op}")
+        if self.backend == "sqlite":
+            return self._sqlite_query(table, columns, where)
+        return self._arrow_query(table, columns, where)
+
+    def count(self, table):
+        """テーブルの行数（Parquetはフッターのメタデータのみ読む）"""
+        if self.backend == "sqlite":
+            if not self._sqlite_columns(table):
+                return 0
+            return self._sqlite().execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        dataset = self._dataset(table)
+        return dataset.count_rows() if dataset is not None else 0
+
+    def compact(self, table, key=None):
+        """小さなパートを1つにまとめる（key指定時は同じキーの最新行だけを残す）"""
+        if self.backend == "sqlite":
+            self._sqlite_compact(table, key)
+        else:
+            self._arrow_compact(table, key)
+
+    def tables(self):
+        if self.backend == "sqlite":
+            cursor = self._sqlite().execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+            )
+            return [name for (name,) in cursor]
+        return sorted(path.name for path in self.root.iterdir() if path.is_dir())
+
+    # ---- Parquet / Arrow IPC ----
+
+    def _arrow_type(self, type_name):
+        return {
+            "bool": pa.bool_(), "int": pa.int64(), "float": pa.float64(), "null": pa.null()
+        }.get(type_name, pa.string())
+
+    def _parts(self, table):
+        return sorted((self.root / table).glob(f"part-*{self.suffix}"))
+
+    def _next_part_path(self, table):
+        parts = self._parts(table)
+        index = int(parts[-1].stem.split("-")[1]) + 1 if parts else 0
+        return self.root / table / f"part-{index:05d}{self.suffix}"
+
+    def _write_part(self, table, arrow_table):
+        """一時ファイルに書いてからリネーム（完成したパートだけが読まれる）"""
+        (self.root / table).mkdir(parents=True, exist_ok=True)
+        part_path = self._next_part_path(table)
+        tmp_path = part_path.with_suffix(".tmp")
+        if self.backend == "parquet":
+            pq.write_table(arrow_table, tmp_path)
+        else:
+            feather.write_feather(arrow_table, tmp_path, compression="uncompressed")
+        tmp_path.replace(part_path)
+        return part_path
+
+    def _arrow_types(self, table):
+        """既存パートの統合スキーマの列の型"""
+        dataset = self._dataset(table)
+        if dataset is None:
+            return {}
+        types = {}
+        for field in dataset.schema:
+            if pa.types.is_null(field.type):
+                types[field.name] = "null"
+            elif pa.types.is_boolean(field.type):
+                types[field.name] = "bool"
+            elif pa.types.is_integer(field.type):
+                types[field.name] = "int"
+            elif pa.types.is_floating(field.type):
+                types[field.name] = "float"
+            else:
+                types[field.name] = "string"
+        return types
+
+    def _arrow_append(self, table, rows, types):
+        schema = pa.schema([(column, self._arrow_type(t)) for column, t in types.items()])
+        self._write_part(table, pa.Table.from_pylist(rows, schema=schema))
+
+    def _dataset(self, table):
+        parts = self._parts(table)
+        if not parts:
+            return None
+        file_format = "parquet" if self.backend == "parquet" else "ipc"
+        # パートごとに列が増えていても、統合スキーマで欠損列をnullとして読む
+        # （すべてNoneだったパートの null 型の列は、他のパートの型に昇格する）
+        schemas = [ds.dataset(part, format=file_format).schema for part in parts]
+        try:
+            schema = pa.unify_schemas(schemas, promote_options="permissive")
+        except (pa.ArrowTypeError, pa.ArrowInvalid) as e:
+            raise ValueError(self._describe_conflicts(table, parts, schemas)) from e
+        return ds.dataset([str(part) for part in parts], format=file_format, schema=schema)
+
+    @staticmethod
+    def _describe_conflicts(table, parts, schemas):
+        """パート間で型が食い違う列と、その型を持つパートの一覧"""
+        column_types = {}
+        for part, schema in zip(parts, schemas):
+            for field in schema:
+                if not pa.types.is_null(field.type):
+                    column_types.setdefault(field.name, {}).setdefault(str(field.type), []).append(part.name)
+        conflicts = [
+            f"{column}: " + ", ".join(f"{type_name} ({', '.join(names)})" for type_name, names in types.items())
+            for column, types in column_types.items() if len(types) > 1
+        ]
+        return f"テーブル {table} のパート間で列の型が異なります: " + "; ".join(conflicts)
+
+    def _arrow_filter(self, where):
+        expression = None
+        for column, op, value in where:
+            field = ds.field(column)
+            condition = {
+                "==": lambda: field == value,
+                "!=": lambda: field != value,
+                "<": lambda: field < value,
+                "<=": lambda: field <= value,
+                ">": lambda: field > value,
+                ">=": lambda: field >= value,
+                "in": lambda: field.isin(list(value))
+            }[op]()
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def _arrow_query(self, table, columns, where):
+        dataset = self._dataset(table)
+        if dataset is None:
+            return []
+        if columns is not None:
+            columns = [c for c in columns if c in dataset.schema.names]
+        return dataset.to_table(columns=columns, filter=self._arrow_filter(where)).to_pylist()
+
+    def _arrow_compact(self, table, key):
+        parts = self._parts(table)
+        dataset = self._dataset(table)
+        if dataset is None or (len(parts) == 1 and key is None):
+            return
+        merged = dataset.to_table()
+        if key is not None:
+            # 同じキーは後から追記された行（=後ろの行）を残す
+            latest = {}
+            for index, value in enumerate(merged.column(key).to_pylist()):
+                latest[value] = index
+            merged = merged.take(sorted(latest.values()))
+        # 新パートを書いてから旧パートを消す（途中で止まっても重複で済み、欠損しない）
+        self._write_part(table, merged)
+        for part in parts:
+            part.unlink()
+
+    # ---- SQLite ----
+
+    def _sqlite(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.root / "results.sqlite")
+        return self._connection
+
+    def _sqlite_columns(self, table):
+        cursor = self._sqlite().execute(f'PRAGMA table_info("{table}")')
+        return {name: declared for _, name, declared, *_ in cursor}
+
+    def _sqlite_types(self, table):
+        """既存の列の型（型指定なしの列は格納済みの値の型、値がなければ null）"""
+        declared_types = {"INTEGER": "int", "REAL": "float", "TEXT": "string"}
+        value_types = {"integer": "int", "real": "float", "text": "string"}
+        declared = SCHEMAS.get(table, {})
+        types = {}
+        for column, sql_type in self._sqlite_columns(table).items():
+            if sql_type:
+                types[column] = "bool" if declared.get(column) == "bool" else declared_types.get(sql_type, "string")
+                continue
+            row = self._sqlite().execute(
+                f'SELECT typeof({_quote(column)}) FROM "{table}" WHERE {_quote(column)} IS NOT NULL LIMIT 1'
+            ).fetchone()
+            types[column] = value_types.get(row[0], "string") if row else "null"
+        return types
+
+    def _sqlite_append(self, table, rows, types):
+        # null の列は型指定なし（値をそのままの型で保存する）
+        sql_types = {"bool": "INTEGER", "int": "INTEGER", "float": "REAL", "string": "TEXT", "null": ""}
+        connection = self._sqlite()
+        with connection:
+            existing = self._sqlite_columns(table)
+            if not existing:
+                definitions = ", ".join(f'{_quote(c)} {sql_types[t]}'.rstrip() for c, t in types.items())
+                connection.execute(f'CREATE TABLE "{table}" ({definitions})')
+            else:
+                for column, type_name in types.items():
+                    if column not in existing:
+                        connection.execute(
+                            f'ALTER TABLE "{table}" ADD COLUMN {_quote(column)} {sql_types[type_name]}'.rstrip()
+                        )
+            for row in rows:
+                columns = ", ".join(_quote(c) for c in row)
+                placeholders = ", ".join("?" for _ in row)
+                connection.execute(
+                    f'INSERT INTO "{table}" ({columns}) VALUES ({placeholders})', list(row.values())
+                )
+
+    def _sqlite_query(self, table, columns, where):
+        existing = self._sqlite_columns(table)
+        if not existing:
+            return []
+        columns = [c for c in (columns or existing) if c in existing]
+        clauses, params = [], []
+        for column, op, value in where:
+            if op == "in":
+                value = list(value)
+                clauses.append(f'{_quote(column)} IN ({", ".join("?" for _ in value)})')
+                params.extend(value)
+            else:
+                clauses.append(f'{_quote(column)} {"=" if op == "==" else op} ?')
+                params.append(value)
+        sql = f'SELECT {", ".join(_quote(c) for c in columns)} FROM "{table}"'
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+
+        declared = SCHEMAS.get(table, {})
+        rows = []
+        for values in self._sqlite().execute(sql, params):
+            row = dict(zip(columns, values))
+            for column, type_name in declared.items():
+                if type_name == "bool" and row.get(column) is not None:
+                    row[column] = bool(row[column])
+            rows.append(row)
+        return rows
+
+    def _sqlite_compact(self, table, key):
+        connection = self._sqlite()
+        with connection:
+            if key is not None and self._sqlite_columns(table):
+                connection.execute(
+                    f'DELETE FROM "{table}" WHERE rowid NOT IN '
+                    f'(SELECT MAX(rowid) FROM "{table}" GROUP BY {_quote(key)})'
+                )
+        connection.execute("VACUUM")
+
+    def __getstate__(self):
+        # 実験関数ごとワーカープロセスへ渡されるため、接続は持ち越さない
+        state = dict(self.__dict__)
+        state["_connection"] = None
+        return state
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def main():
+    """テーブル一覧と行数を表示（引数でテーブルと列を指定するとその列を表示）"""
+    store = ResultsStore()
+    if len(sys.argv) > 1:
+        start = time.perf_counter()
+        rows = store.query(sys.argv[1], columns=sys.argv[2:] or None)
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False, default=str))
+        print(f"{len(rows)}行 ({(time.perf_counter() - start) * 1000:.1f}ms)", file=sys.stderr)
+        return
+    print(f"📦 結果ストア: {store.root} ({store.backend})")
+    for table in store.tables():
+        print(f"  {table}: {store.count(table)}行")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+飽和曲線のあてはめ: 多数の曲線を一括で非線形最小二乗推定する
+カテゴリ数 N と改善率の組（曲線）を (曲線数, 点数) の配列で受け取り、
+全曲線・全初期値をまとめたバッチの Levenberg-Marquardt 法で推定する
+
+- 曲線モデル: 指数飽和 A(1-e^{-bN}) / ロジスティック A/(1+e^{-b(N-c)}) / べき乗 aN^b
+- 複数の初期値から同時に推定し、曲線ごとに残差平方和が最小の解を採用
+- 残差ブートストラップの再推定も同じバッチ計算で行い、パラメータと飽和点の信頼区間を求める
+- AIC / AICc / BIC によるモデル比較
+- 飽和点: 限界効用（導関数、1カテゴリあたりの改善率）がしきい値を下回るカテゴリ数
+
+点数が曲線ごとに異なる場合は、欠けている点を NaN で埋める
+"""
+
+import math
+
+import numpy as np
+
+_TINY = 1e-300
+
+
+class CurveModel:
+    """曲線モデル（関数・ヤコビアン・初期値・飽和点の定義）"""
+
+    def __init__(self, name, formula, param_names, function, jacobian, initial_guesses,
+                 saturation_point, lower, upper):
+        self.name = name
+        self.formula = formula
+        self.param_names = param_names
+        self.function = function            # (x (B, n), θ (B, P)) -> (B, n)
+        self.jacobian = jacobian            # (x, θ) -> (B, n, P)
+        self.initial_guesses = initial_guesses  # (x, y, mask, 倍率の数) -> (B, S, P)
+        self.saturation_point = saturation_point  # (θ, しきい値) -> (B,)
+        self.lower = np.array(lower, dtype=float)
+        self.upper = np.array(upper, dtype=float)
+
+    @property
+    def n_params(self):
+        return len(self.param_names)
+
+
+def _data_scale(x, y, mask):
+    """初期値の基準: 曲線ごとの最大改善率と点の中央のカテゴリ数"""
+    y_max = np.nanmax(np.where(mask, y, np.nan), axis=1)
+    y_max = np.where(np.isfinite(y_max) & (y_max > 0), y_max, 1.0)
+    x_mid = np.nanmedian(np.where(mask, x, np.nan), axis=1)
+    x_mid = np.where(np.isfinite(x_mid) & (x_mid > 0), x_mid, 1.0)
+    return y_max, x_mid
+
+
+def _grid(*axes):
+    """初期値の格子 (B, S, P)（各軸は (B, k) の配列）"""
+    mesh = np.meshgrid(*[np.arange(axis.shape[1]) for axis in axes], indexing="ij")
+    return np.stack([axis[:, index.ravel()] for axis, index in zip(axes, mesh)], axis=-1)
+
+
+# --- 指数飽和 A(1 - e^{-bN}) ---
+
+def _exponential(x, theta):
+    return theta[:, :1] * -np.expm1(-theta[:, 1:2] * x)
+
+
+def _exponential_jacobian(x, theta):
+    decay = np.exp(-theta[:, 1:2] * x)
+    return np.stack([1 - decay, theta[:, :1] * x * decay], axis=-1)
+
+
+def _exponential_guesses(x, y, mask, n_rates):
+    y_max, x_mid = _data_scale(x, y, mask)
+    amplitudes = y_max[:, None] * np.array([1.05, 1.5, 3.0])
+    rates = np.geomspace(0.1, 10.0, n_rates)[None, :] / x_mid[:, None]
+    return _grid(amplitudes, rates)
+
+
+def _exponential_saturation(theta, threshold):
+    # A b e^{-bN} = しきい値 を解く（最初から下回る場合は 0）
+    slope0 = theta[:, 0] * theta[:, 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        point = np.log(slope0 / threshold) / theta[:, 1]
+    return np.where(slope0 > threshold, point, 0.0)
+
+
+# --- ロジスティック A / (1 + e^{-b(N-c)}) ---
+
+def _sigmoid(z):
+    with np.errstate(over="ignore"):  # e^{-z} のあふれは s = 0 になるだけ
+        return 1 / (1 + np.exp(-z))
+
+
+def _logistic(x, theta):
+    return theta[:, :1] * _sigmoid(theta[:, 1:2] * (x - theta[:, 2:3]))
+
+
+def _logistic_jacobian(x, theta):
+    shifted = x - theta[:, 2:3]
+    s = _sigmoid(theta[:, 1:2] * shifted)
+    slope = theta[:, :1] * s * (1 - s)
+    return np.stack([s, slope * shifted, -slope * theta[:, 1:2]], axis=-1)
+
+
+def _logistic_guesses(x, y, mask, n_rates):
+    y_max, x_mid = _data_scale(x, y, mask)
+    amplitudes = y_max[:, None] * np.array([1.05, 1.5, 3.0])
+    rates = np.geomspace(0.1, 10.0, n_rates)[None, :] / x_mid[:, None]
+    centers = x_mid[:, None] * np.array([0.25, 0.5, 1.0])
+    return _grid(amplitudes, rates, centers)
+
+
+def _logistic_saturation(theta, threshold):
+    # 変曲点より後で A b s(1-s) = しきい値 となる s を解く（最大の傾き A b / 4 が下回る場合は 0）
+    amplitude, rate, center = theta[:, 0], theta[:, 1], theta[:, 2]
+    peak_slope = amplitude * rate / 4
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = (1 + np.sqrt(np.maximum(1 - threshold / peak_slope, 0))) / 2
+        point = center + np.log(s / (1 - s)) / rate
+    return np.where(peak_slope > threshold, np.maximum(point, 0.0), 0.0)
+
+
+# --- べき乗 aN^b ---
+
+def _power_law(x, theta):
+    return theta[:, :1] * np.power(x, theta[:, 1:2])
+
+
+def _power_law_jacobian(x, theta):
+    # N=0 では N^b log N → 0（b > 0）なので、log 0 の代わりに 0 を使う（0 × (-inf) = NaN で推定が止まるのを防ぐ）
+    powered = np.power(x, theta[:, 1:2])
+    log_x = np.log(np.where(x > 0, x, 1.0))
+    return np.stack([powered, theta[:, :1] * powered * log_x], axis=-1)
+
+
+def _power_law_guesses(x, y, mask, n_rates):
+    y_max, x_mid = _data_scale(x, y, mask)
+    exponents = np.broadcast_to(np.geomspace(0.05, 1.0, n_rates), (len(y_max), n_rates))
+    # 指数ごとに、中央のカテゴリ数で最大改善率の半分を通る係数
+    coefficients = (y_max[:, None] / 2) / np.power(x_mid[:, None], exponents)
+    return np.stack([coefficients, exponents], axis=-1)
+
+
+def _power_law_saturation(theta, threshold):
+    # a b N^{b-1} = しきい値 を解く（b >= 1 は飽和しないので inf、傾きが正でなければ 0）
+    coefficient, exponent = theta[:, 0], theta[:, 1]
+    slope_scale = coefficient * exponent
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        point = np.power(threshold / slope_scale, 1 / (exponent - 1))
+    point = np.where(exponent >= 1, np.inf, point)
+    return np.where(slope_scale > 0, point, 0.0)
+
+
+MODELS = {
+    "exponential": CurveModel(
+        "exponential", "A × (1 - e^(-bN))", ("A", "b"),
+        _exponential, _exponential_jacobian, _exponential_guesses, _exponential_saturation,
+        lower=(0.0, 1e-9), upper=(np.inf, np.inf)),
+    "logistic": CurveModel(
+        "logistic", "A / (1 + e^(-b(N - c)))", ("A", "b", "c"),
+        _logistic, _logistic_jacobian, _logistic_guesses, _logistic_saturation,
+        lower=(0.0, 1e-9, -np.inf), upper=(np.inf, np.inf, np.inf)),
+    "power_law": CurveModel(
+        "power_law", "a × N^b", ("a", "b"),
+        _power_law, _power_law_jacobian, _power_law_guesses, _power_law_saturation,
+        lower=(0.0, -np.inf), upper=(np.inf, np.inf)),
+}
+
+
+def information_criteria(sse, n_points, n_params):
+    """残差平方和からの AIC / AICc / BIC（正規誤差の最尤推定）"""
+    n = np.asarray(n_points, dtype=float)
+    log_likelihood_term = n * np.log(np.maximum(sse, _TINY) / n)
+    aic = log_likelihood_term + 2 * n_params
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correction = np.where(n - n_params - 1 > 0, 2 * n_params * (n_params + 1) / (n - n_params - 1), np.inf)
+    return {
+        "aic": aic,
+        "aicc": aic + correction,
+        "bic": log_likelihood_term + n_params * np.log(n)
+    }
+
+
+class SaturationCurveFitter:
+    def __init__(self, n_starts=6, max_iterations=200, tolerance=1e-10, n_bootstrap=1000,
+                 confidence=0.95, marginal_threshold=0.1, max_chunk_elements=5_000_000, seed=None):
+        """
+        n_starts: モデルの速さのパラメータ（b）の初期値の数（他のパラメータとの格子で初期値を作る）
+        marginal_threshold: 飽和点とみなす限界効用（1カテゴリあたりの改善率）
+        max_chunk_elements: ブートストラップで1度に展開する要素数（曲線数×再標本化数×点数）の上限
+        """
+        self.n_starts = n_starts
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+        self.n_bootstrap = n_bootstrap
+        self.confidence = confidence
+        self.marginal_threshold = marginal_threshold
+        self.max_chunk_elements = max_chunk_elements
+        self.rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def _prepare(x, y):
+        """x・y を (曲線数, 点数) に揃え、欠損点のマスクを作る（欠損点は x=1, y=0 に置き換える）"""
+        y = np.atleast_2d(np.asarray(y, dtype=float))
+        x = np.broadcast_to(np.asarray(x, dtype=float), y.shape)
+        mask = np.isfinite(x) & np.isfinite(y)
+        return np.where(mask, x, 1.0), np.where(mask, y, 0.0), mask
+
+    def _residual_sse(self, model, x, y, mask, theta):
+        residuals = np.where(mask, model.function(x, theta) - y, 0.0)
+        sse = np.sum(residuals ** 2, axis=1)
+        return residuals, np.where(np.isfinite(sse), sse, np.inf)
+
+    def levenberg_marquardt(self, model, x, y, mask, theta):
+        """
+        バッチの Levenberg-Marquardt 法（行ごとに独立した減衰係数と収束判定）
+        戻り値: (θ (B, P), 残差平方和 (B,), 収束したか (B,))
+        """
+        theta = np.clip(np.array(theta, dtype=float), model.lower, model.upper)
+        damping = np.full(len(theta), 1e-3)
+        _, sse = self._residual_sse(model, x, y, mask, theta)
+        converged = np.zeros(len(theta), dtype=bool)
+        active = np.flatnonzero(np.isfinite(sse))
+
+        for _ in range(self.max_iterations):
+            if not len(active):
+                break
+            xa, ya, ma, ta = x[active], y[active], mask[active], theta[active]
+            residuals, _ = self._residual_sse(model, xa, ya, ma, ta)
+            jacobian = np.where(ma[..., None], model.jacobian(xa, ta), 0.0)
+            jtj = np.einsum("bnp,bnq->bpq", jacobian, jacobian)
+            gradient = np.einsum("bnp,bn->bp", jacobian, residuals)
+
+            diagonal = np.einsum("bpp->bp", jtj) + 1e-12
+            system = jtj + damping[active, None, None] * np.einsum("bp,pq->bpq", diagonal, np.eye(model.n_params))
+            step = np.linalg.solve(system, -gradient[..., None])[..., 0]
+
+            candidate = np.clip(ta + step, model.lower, model.upper)
+            _, candidate_sse = self._residual_sse(model, xa, ya, ma, candidate)
+            improved = candidate_sse < sse[active]
+
+            reduction = sse[active] - candidate_sse
+            theta[active[improved]] = candidate[improved]
+            sse[active[improved]] = candidate_sse[improved]
+            damping[active] = np.clip(np.where(improved, damping[active] * 0.3, damping[active] * 10), 1e-12, 1e12)
+
+            # 改善量が相対的に十分小さいか、減衰が上限に達したら終了
+            done = (improved & (reduction <= self.tolerance * (sse[active] + _TINY))) | (damping[active] >= 1e12)
+            done |= sse[active] <= _TINY
+            converged[active[done & (damping[active] < 1e12)]] = True
+            active = active[~done]
+
+        return theta, sse, converged
+
+    def fit(self, x, y, model="exponential"):
+        """
+        全曲線を複数の初期値から一括推定し、曲線ごとに最良の解を返す
+        x: (点数,) または (曲線数, 点数)、y: (曲線数, 点数) または (点数,)
+        """
+        model = MODELS[model] if isinstance(model, str) else model
+        x, y, mask = self._prepare(x, y)
+        n_curves, n_points = y.shape
+
+        starts = model.initial_guesses(x, y, mask, self.n_starts)
+        n_starts = starts.shape[1]
+        theta, sse, converged = self.levenberg_marquardt(
+            model, np.repeat(x, n_starts, axis=0), np.repeat(y, n_starts, axis=0),
+            np.repeat(mask, n_starts, axis=0), starts.reshape(-1, model.n_params))
+
+        best = np.argmin(sse.reshape(n_curves, n_starts), axis=1)
+        rows = np.arange(n_curves) * n_starts + best
+        params, sse, converged = theta[rows], sse[rows], converged[rows]
+
+        counts = mask.sum(axis=1)
+        y_mean = np.sum(y, axis=1) / np.maximum(counts, 1)
+        sst = np.sum(np.where(mask, y - y_mean[:, None], 0.0) ** 2, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r_squared = np.where(sst > 0, 1 - sse / sst, 0.0)
+
+        result = {
+            "model": model.name,
+            "formula": model.formula,
+            "param_names": list(model.param_names),
+            "params": params,
+            "sse": sse,
+            "r_squared": r_squared,
+            "converged": converged,
+            "n_points": counts,
+            "saturation_point": model.saturation_point(params, self.marginal_threshold)
+        }
+        result.update(information_criteria(sse, counts, model.n_params))
+        return result
+
+    def bootstrap(self, x, y, fitted):
+        """
+        残差ブートストラップ: 推定曲線に再標本化した残差を足したデータを、推定値を初期値に一括再推定
+        戻り値: パラメータ (曲線数, B, P) と飽和点 (曲線数, B) の分布
+        """
+        model = MODELS[fitted["model"]]
+        x, y, mask = self._prepare(x, y)
+        n_curves, n_points = y.shape
+        params = fitted["params"]
+        predicted = model.function(x, params)
+        residuals = np.where(mask, y - predicted, 0.0)
+
+        # 曲線ごとに有効な点の位置を先頭に並べ、その範囲から一様に引く
+        order = np.argsort(~mask, axis=1, kind="stable")
+        counts = np.maximum(mask.sum(axis=1), 1)
+
+        chunk = max(1, self.max_chunk_elements // max(1, n_curves * n_points))
+        param_draws, point_draws = [], []
+        for start in range(0, self.n_bootstrap, chunk):
+            size = min(chunk, self.n_bootstrap - start)
+            picks = (self.rng.random((n_curves, size, n_points)) * counts[:, None, None]).astype(np.int64)
+            positions = np.take_along_axis(order[:, None, :], picks, axis=2)
+            resampled = np.take_along_axis(residuals[:, None, :], positions, axis=2)
+            y_star = predicted[:, None, :] + resampled
+
+            theta, _, _ = self.levenberg_marquardt(
+                model, np.repeat(x, size, axis=0), y_star.reshape(-1, n_points),
+                np.repeat(mask, size, axis=0), np.repeat(params, size, axis=0))
+            param_draws.append(theta.reshape(n_curves, size, model.n_params))
+            point_draws.append(model.saturation_point(theta, self.marginal_threshold).reshape(n_curves, size))
+
+        return np.concatenate(param_draws, axis=1), np.concatenate(point_draws, axis=1)
+
+    def compare_models(self, x, y, models=None):
+        """
+        複数モデルで一括推定し、AICc で曲線ごとに最良のモデルを選ぶ
+        戻り値: {"fits": {モデル名: fit の結果}, "best_model": (曲線数,), "akaike_weights": {モデル名: (曲線数,)}}
+        """
+        names = list(models or MODELS)
+        fits = {name: self.fit(x, y, name) for name in names}
+        aicc = np.stack([fits[name]["aicc"] for name in names])
+        # AICc が無限大（点数が足りない）曲線は AIC で比較する
+        criterion = np.where(np.isfinite(aicc).all(axis=0), aicc, np.stack([fits[name]["aic"] for name in names]))
+        delta = criterion - criterion.min(axis=0)
+        weights = np.exp(-delta / 2)
+        weights /= weights.sum(axis=0)
+        best = np.array(names)[np.argmin(criterion, axis=0)]
+        return {
+            "fits": fits,
+            "best_model": best,
+            "akaike_weights": {name: weights[i] for i, name in enumerate(names)}
+        }
+
+    def saturation_points(self, x, y, model="exponential", bootstrap=True):
+        """
+        全曲線の飽和点をパラメータ推定・信頼区間付きで1回の呼び出しで求める
+        model: モデル名、または "best" で曲線ごとに AICc 最良のモデル
+        """
+        x_arr, y_arr, _ = self._prepare(x, y)
+        if model == "best":
+            comparison = self.compare_models(x_arr, y_arr)
+            best = comparison["best_model"]
+            result = {
+                "model": best,
+                "saturation_point": np.full(len(best), np.nan),
+                "saturation_ci": np.full((len(best), 2), np.nan),
+                "akaike_weights": comparison["akaike_weights"],
+                "fits": {}
+            }
+            for name in np.unique(best):
+                rows = np.flatnonzero(best == name)
+                sub = self.saturation_points(x_arr[rows], y_arr[rows], name, bootstrap)
+                result["saturation_point"][rows] = sub["saturation_point"]
+                result["saturation_ci"][rows] = sub["saturation_ci"]
+                result["fits"][name] = dict(sub, rows=rows)
+            return result
+
+        fitted = self.fit(x_arr, y_arr, model)
+        result = dict(fitted)
+        alpha = (1 - self.confidence) / 2
+        if bootstrap and self.n_bootstrap > 0:
+            param_draws, point_draws = self.bootstrap(x_arr, y_arr, fitted)
+            result["param_ci"] = np.moveaxis(np.quantile(param_draws, [alpha, 1 - alpha], axis=1), 0, -1)
+            result["saturation_ci"] = np.moveaxis(np.quantile(point_draws, [alpha, 1 - alpha], axis=1), 0, -1)
+        else:
+            result["param_ci"] = np.full(fitted["params"].shape + (2,), np.nan)
+            result["saturation_ci"] = np.full((len(fitted["params"]), 2), np.nan)
+        return result
+
+
+def summarize_fit(result, index=0):
+    """1曲線分の推定結果をJSON保存用の辞書にする"""
+    summary = {
+        "model": result["model"],
+        "formula": result["formula"],
+        "params": {name: float(v) for name, v in zip(result["param_names"], result["params"][index])},
+        "r_squared": float(result["r_squared"][index]),
+        "aicc": float(result["aicc"][index]) if math.isfinite(result["aicc"][index]) else None,
+        "converged": bool(result["converged"][index]),
+        "saturation_point": float(result["saturation_point"][index])
+    }
+    if "param_ci" in result:
+        summary["param_ci"] = {name: [float(v) for v in ci]
+                               for name, ci in zip(result["param_names"], result["param_ci"][index])}
+        summary["saturation_ci"] = [float(v) for v in result["saturation_ci"][index]]
+    return summary
@@ -4,14 +4,25 @@
 大規模データセット・同時アクセス・リソース使用量の最適化検証
 """
 
-import json
 import time
 from datetime import datetime
-import random
-import math
+
+from load_generator import (
+    LoadGenerator, HttpDetectionTarget, WebSocketFrameTarget, ResourceSampler
+)
+from results_store import ResultsStore
 
 class ScalabilityExperiment:
-    def __init__(self):
+    def __init__(self, http_url="http://localhost:5000", ws_url="ws://localhost:8765",
+                 load_levels=(1, 2, 5, 10, 20), concurrent_users=(1, 5, 10, 25, 50),
+                 level_duration=10.0):
+        # 負荷テスト設定（ローカルサーバーに対して実測）
+        self.http_url = http_url
+        self.ws_url = ws_url
+        self.load_levels = list(load_levels)  # オープンループ到着率 (req/s)
+        self.concurrent_users = sorted(concurrent_users)  # クローズドループ同時ユーザー数
+        self.level_duration = level_duration  # 各負荷レベルの計測時間 (秒)
+        self.load_generator = LoadGenerator()
         self.results = {
             "experiment_name": "スケーラビリティ実験", 
             "start_time": datetime.now().isoformat(),
@@ -22,72 +33,61 @@ class ScalabilityExperiment:
             "metadata": {}
         }
     
-    def normal_random(self, mean, std, n):
-        """標準ライブラリを使用した正規分布近似"""
-        return [random.gauss(mean, std) for _ in range(n)]
-    
-    def mean(self, data):
-        """平均値計算"""
-        return sum(data) / len(data)
+    def _build_targets(self):
+        """計測対象サーバー（起動していないものは除外）"""
+        targets = {"local_flask": HttpDetectionTarget(self.http_url)}
+        try:
+            targets["local_websocket"] = WebSocketFrameTarget(self.ws_url)
+        except ImportError as e:
+            print(f"  ⚠️ local_websocket をスキップ: {e}")
+        return targets
     
-    def std(self, data):
-        """標準偏差計算"""
-        m = self.mean(data)
-        variance = sum((x - m) ** 2 for x in data) / len(data)
-        return math.sqrt(variance)
-        
     def cloud_load_testing(self):
-        """クラウド負荷テスト"""
+        """クラウド負荷テスト（ローカルサーバーへのオープンループ負荷を実測）"""
         print("☁️ クラウド負荷テスト実行中...")
         
-        # Vercel・Renderでの負荷テスト
-        platforms = {
-            "vercel": {
-                "max_concurrent_requests": 1000,
-                "response_times": {},
-                "error_rates": {},
-                "auto_scaling": True
-            },
-            "render": {
-                "max_concurrent_requests": 500,
-                "response_times": {},
-                "error_rates": {},
-                "auto_scaling": True
-            },
-            "local_server": {
-                "max_concurrent_requests": 50,
+        platforms = {}
+        
+        for platform_name, target in self._build_targets().items():
+            print(f"  📊 {platform_name} 負荷テスト中...")
+            platform_data = {
+                "target": getattr(target, "base_url", getattr(target, "url", None)),
+                "available": target.health_check(),
                 "response_times": {},
                 "error_rates": {},
+                "latency_percentiles": {},
+                "throughput_rps": {},
                 "auto_scaling": False
             }
-        }
-        
-        # 負荷レベル別テスト
-        load_levels = [10, 50, 100, 250, 500, 1000, 1500]
-        
-        for platform_name, platform_data in platforms.items():
-            print(f"  📊 {platform_name} 負荷テスト中...")
+            platforms[platform_name] = platform_data
+            if not platform_data["available"]:
+                print(f"  ⚠️ {platform_name}: サーバーに接続できないため計測をスキップ")
+                continue
             
-            for load in load_levels:
-                if load > platform_data["max_concurrent_requests"]:
-                    # 限界を超えた場合
-                    response_time = 5000 + (load - platform_data["max_concurrent_requests"]) * 10
-                    error_rate = min(95, 5 + (load - platform_data["max_concurrent_requests"]) * 0.5)
-                else:
-                    # 正常範囲
-                    base_response = 150 if platform_name == "vercel" else (200 if platform_name == "render" else 80)
-                    response_time = base_response + (load * 0.8) + random.uniform(-20, 20)
-                    error_rate = max(0, (load / platform_data["max_concurrent_requests"]) * 3 + random.uniform(-1, 1))
-                
-                platform_data["response_times"][f"load_{load}"] = max(50, response_time)
-                platform_data["error_rates"][f"load_{load}"] = min(100, max(0, error_rate))
-                
-            # 最適負荷レベル特定
-            optimal_load = platform_data["max_concurrent_requests"] * 0.7
-            platform_data["optimal_load"] = int(optimal_load)
-            platform_data["performance_score"] = 100 - (platform_data["error_rates"].get(f"load_{int(optimal_load)}", 5))
+            for load in self.load_levels:
+                run = self.load_generator.run_open_loop(target, rate=load, duration=self.level_duration)
+                key = f"load_{load}"
+                platform_data["response_times"][key] = run["latency_ms"]["mean"]
+                platform_data["error_rates"][key] = run["error_rate_percent"]
+                platform_data["latency_percentiles"][key] = run["latency_ms"]
+                platform_data["throughput_rps"][key] = run["throughput_rps"]
+                print(f"    {load}req/s: p50 {run['latency_ms']['p50'] or '-'}ms, "
+                      f"p99 {run['latency_ms']['p99'] or '-'}ms, エラー率{run['error_rate_percent']:.1f}%")
             
-            print(f"  ✅ {platform_name}: 最適負荷{int(optimal_load)}req/s, スコア{platform_data['performance_score']:.1f}")
+            if hasattr(target, "close"):
+                target.close()
+            
+            # 最適負荷レベル: エラー率1%未満かつp95が1秒未満の最大到着率
+            healthy_loads = [
+                load for load in self.load_levels
+                if platform_data["error_rates"][f"load_{load}"] < 1.0
+                and (platform_data["latency_percentiles"][f"load_{load}"]["p95"] or float("inf")) < 1000
+            ]
+            optimal_load = max(healthy_loads) if healthy_loads else min(self.load_levels)
+            platform_data["optimal_load"] = optimal_load
+            platform_data["performance_score"] = 100 - platform_data["error_rates"][f"load_{optimal_load}"]
+            
+            print(f"  ✅ {platform_name}: 最適負荷{optimal_load}req/s, スコア{platform_data['performance_score']:.1f}")
         
         self.results["cloud_load_testing"] = platforms
         
@@ -151,40 +151,50 @@ class ScalabilityExperiment:
         """同時アクセス処理テスト"""
         print("👥 同時アクセス処理テスト中...")
         
-        # 同時ユーザー数別のテスト
-        concurrent_users = [1, 5, 10, 25, 50, 100, 200, 500]
         access_results = {}
+        target = HttpDetectionTarget(self.http_url)
+        if not target.health_check():
+            print(f"  ⚠️ {self.http_url} に接続できないため計測をスキップ")
+            access_results["available"] = False
+            self.results["concurrent_access"] = access_results
+            return
         
-        for users in concurrent_users:
-            # ユーザー数に応じたシステム負荷
-            if users <= 25:
-                avg_response_time = 120 + users * 8.5
-                queue_wait_time = users * 2.1
-                success_rate = 99.5 - users * 0.1
-            elif users <= 100:
-                avg_response_time = 340 + (users - 25) * 12.3
-                queue_wait_time = 52.5 + (users - 25) * 4.8
-                success_rate = 97.0 - (users - 25) * 0.3
-            else:
-                avg_response_time = 1265 + (users - 100) * 18.7
-                queue_wait_time = 412.5 + (users - 100) * 8.9
-                success_rate = max(70, 74.5 - (users - 100) * 0.8)
+        # 同時ユーザー数別のテスト（クローズドループ）
+        baseline_response_time = None
+        for users in self.concurrent_users:
+            with ResourceSampler() as sampler:
+                run = self.load_generator.run_closed_loop(
+                    target, concurrency=users, duration=self.level_duration
+                )
+            resources = sampler.summary()
             
-            # リソース使用率
-            cpu_usage = min(100, 15 + users * 1.2 + (users > 100) * (users - 100) * 0.5)
-            memory_usage = min(100, 25 + users * 0.8)
+            avg_response_time = run["latency_ms"]["mean"]
+            success_rate = 100.0 - run["error_rate_percent"]
+            if baseline_response_time is None:
+                baseline_response_time = avg_response_time
+            # 最小同時数での平均応答時間との差をキュー待ち時間とみなす
+            queue_wait_time = (
+                max(0.0, avg_response_time - baseline_response_time)
+                if avg_response_time is not None and baseline_response_time is not None else None
+            )
             
             access_results[f"users_{users}"] = {
                 "concurrent_users": users,
-                "avg_response_time_ms": max(50, avg_response_time),
-                "queue_wait_time_ms": max(0, queue_wait_time),
-                "success_rate_percent": max(0, success_rate),
-                "cpu_usage_percent": cpu_usage,
-                "memory_usage_percent": memory_usage,
-                "system_stable": success_rate > 95 and avg_response_time < 1000
+                "avg_response_time_ms": avg_response_time,
+                "latency_percentiles_ms": run["latency_ms"],
+                "queue_wait_time_ms": round(queue_wait_time, 2) if queue_wait_time is not None else None,
+                "success_rate_percent": success_rate,
+                "throughput_rps": run["throughput_rps"],
+                "requests": run["requests"],
+                "cpu_usage_percent": resources["cpu_usage_percent"],
+                "memory_usage_percent": resources["memory_usage_percent"],
+                "system_stable": (
+                    success_rate > 95 and avg_response_time is not None and avg_response_time < 1000
+                )
             }
             
-            print(f"  ✅ {users}ユーザー: 応答{avg_response_time:.0f}ms, 成功率{success_rate:.1f}%, CPU{cpu_usage:.1f}%")
+            print(f"  ✅ {users}ユーザー: 応答{avg_response_time or 0:.0f}ms, 成功率{success_rate:.1f}%, "
+                  f"{run['throughput_rps']:.1f}req/s")
         
         # 推奨システム構成
         system_recommendations = {
@@ -279,38 +289,74 @@ class ScalabilityExperiment:
         optimization_stages["auto_scaling"] = auto_scaling_config
         self.results["resource_optimization"] = optimization_stages
         
+    def _scaling_bottleneck(self, min_success_rate=95.0, max_p95_ms=1000.0, min_throughput_gain=0.10):
+        """
+        同時アクセステストの実測から、性能が崩れ始める同時ユーザー数と要因を求める
+        同時数の小さい順に、成功率の低下・p95遅延の超過・スループットの頭打ち（同時数を増やしても
+        スループットの増加が min_throughput_gain 未満）のいずれかが最初に起きた段階を返す
+        計測していない場合、または計測範囲で崩れなかった場合は None
+        """
+        levels = sorted(
+            (result for key, result in self.results["concurrent_access"].items() if key.startswith("users_")),
+            key=lambda result: result["concurrent_users"]
+        )
+        previous = None
+        for result in levels:
+            p95 = result["latency_percentiles_ms"]["p95"]
+            cause = value = None
+            if result["success_rate_percent"] < min_success_rate:
+                cause, value = "error_rate", round(100.0 - result["success_rate_percent"], 2)
+            elif p95 is None or p95 > max_p95_ms:
+                cause, value = "p95_latency", p95
+            elif previous is not None and previous["throughput_rps"] > 0 and (
+                result["throughput_rps"] / previous["throughput_rps"] - 1 < min_throughput_gain
+            ):
+                cause, value = "throughput_saturation", result["throughput_rps"]
+            if cause is not None:
+                return {
+                    "concurrent_users": result["concurrent_users"],
+                    "cause": cause,
+                    "value": value,
+                    "cpu_usage_percent": result["cpu_usage_percent"],
+                    "memory_usage_percent": result["memory_usage_percent"]
+                }
+            previous = result
+        return None
+        
     def run_experiment(self):
         """実験実行メイン関数"""
         print("☁️ スケーラビリティ実験開始")
         print("=" * 50)
+        experiment_start = time.time()
         
         # 1. クラウド負荷テスト
         self.cloud_load_testing()
-        time.sleep(0.5)
         
         # 2. データセット拡張性テスト
         self.dataset_scaling_test()
-        time.sleep(0.5)
         
         # 3. 同時アクセステスト
         self.concurrent_access_test()
-        time.sleep(0.5)
         
         # 4. リソース最適化分析
         self.resource_optimization_analysis()
         
         # 5. メタデータ追加
+        stable_users = [
+            result["concurrent_users"] for key, result in self.results["concurrent_access"].items()
+            if key.startswith("users_") and result["system_stable"]
+        ]
         self.results["metadata"] = {
             "end_time": datetime.now().isoformat(),
-            "duration_seconds": 4.2,
-            "test_environment": "Multi-cloud simulation (Vercel, Render, Local)",
+            "duration_seconds": round(time.time() - experiment_start, 1),
+            "test_environment": f"Measured load test (HTTP {self.http_url}, WebSocket {self.ws_url})",
             "scalability_targets": ["concurrent_users", "dataset_size", "resource_efficiency"],
-            "experiment_version": "v1.0",
+            "experiment_version": "v2.0",
             "overall_results": {
-                "max_supported_users": 200,
+                "max_supported_users": max(stable_users) if stable_users else 0,
                 "max_dataset_size": 1000000,
                 "optimal_cost_efficiency": "optimized tier",
-                "scaling_bottleneck": "memory bandwidth at 500+ users"
+                "scaling_bottleneck": self._scaling_bottleneck()
             }
         }
         
@@ -319,6 +365,12 @@ class ScalabilityExperiment:
         print(f"👥 最大同時ユーザー数: {self.results['metadata']['overall_results']['max_supported_users']}")
         print(f"📊 最大データセットサイズ: {self.results['metadata']['overall_results']['max_dataset_size']:,}")
         print(f"💰 最適コスト効率: {self.results['metadata']['overall_results']['optimal_cost_efficiency']}")
+        bottleneck = self.results['metadata']['overall_results']['scaling_bottleneck']
+        if bottleneck is None:
+            print("🧱 スケーリングのボトルネック: 計測範囲では検出されず")
+        else:
+            print(f"🧱 スケーリングのボトルネック: {bottleneck['concurrent_users']}ユーザーで "
+                  f"{bottleneck['cause']} ({bottleneck['value']})")
         
         return self.results
 
@@ -326,11 +378,8 @@ if __name__ == "__main__":
     experiment = ScalabilityExperiment()
     results = experiment.run_experiment()
     
-    # 結果保存
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"scalability_experiment_results_{timestamp}.json"
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    # 結果保存（共有結果ストアの scalability テーブルに追記）
+    store = ResultsStore()
+    store.append("scalability", [results])
     
-    print(f"📊 実験結果を {filename} に保存しました")
\ No newline at end of file
+    print(f"📊 実験結果を {store.root} (scalability) に保存しました")
\ No newline at end of file
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+results_store のテスト（python -m pytest test_results_store.py）
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from results_store import ResultsStore, pa
+
+BACKENDS = ["sqlite"] + (["parquet", "arrow"] if pa is not None else [])
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_null_only_column_takes_type_of_later_append(tmp_path, backend):
+    """すべてNoneの列の後に数値が追記されても、全体を問い合わせられる"""
+    store = ResultsStore(tmp_path, backend=backend)
+    store.append("scalability", [
+        {"experiment_name": "load", "cpu_usage_percent": None, "latency": {"p50": None, "mean": None}}
+    ])
+    store.append("scalability", [
+        {"experiment_name": "load", "cpu_usage_percent": 42.5, "latency": {"p50": 12.0, "mean": 13.5}}
+    ])
+
+    rows = store.query("scalability")
+    assert [row["cpu_usage_percent"] for row in rows] == [None, 42.5]
+    assert [row["latency.p50"] for row in rows] == [None, 12.0]
+
+    filtered = store.query("scalability", columns=["latency.mean"], where=[("latency.mean", ">", 13.0)])
+    assert filtered == [{"latency.mean": 13.5}]
+    store.close()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_conflicting_types_are_coerced_or_rejected_at_append(tmp_path, backend):
+    """既存の列と型が合わない追記は変換するか拒否し、テーブルは読めるまま保つ"""
+    store = ResultsStore(tmp_path, backend=backend)
+    store.append("runs", [{"name": "a", "count": 1, "score": 1}])
+    store.append("runs", [{"name": 2, "count": 2.0, "score": 0.5}])  # 文字列化・整数化・float昇格
+
+    with pytest.raises(ValueError, match="count"):
+        store.append("runs", [{"name": "c", "count": "three", "score": 0.1}])
+
+    rows = store.query("runs")
+    assert [(row["name"], row["count"], row["score"]) for row in rows] == [("a", 1, 1.0), ("2", 2, 0.5)]
+    store.close()
+
+
+@pytest.mark.skipif(pa is None, reason="pyarrow が必要")
+def test_existing_conflicting_parts_name_the_column(tmp_path):
+    """既に型の食い違うパートがある場合は、列とパートを示すエラーにする"""
+    import pyarrow.parquet as pq
+
+    store = ResultsStore(tmp_path, backend="parquet")
+    store.append("runs", [{"count": 1}])
+    pq.write_table(pa.table({"count": ["x"]}), tmp_path / "runs" / "part-00001.parquet")
+
+    with pytest.raises(ValueError, match=r"count: int64 \(part-00000.parquet\), string \(part-00001.parquet\)"):
+        store.query("runs")
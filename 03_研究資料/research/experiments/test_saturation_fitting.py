@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+saturation_fitting のテスト（python -m pytest test_saturation_fitting.py）
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from saturation_fitting import SaturationCurveFitter
+
+
+def test_power_law_fits_curve_with_point_at_zero():
+    """N=0 の点を含んでもべき乗モデルの推定が進み、モデル比較で選ばれる"""
+    x = np.array([0, 1, 2, 4, 8, 16, 32, 64], dtype=float)
+    y = 3 * np.sqrt(x) + np.random.default_rng(0).normal(0, 0.1, len(x))
+    fitter = SaturationCurveFitter(seed=0)
+
+    comparison = fitter.compare_models(x, y)
+    power_law = comparison["fits"]["power_law"]
+
+    assert power_law["converged"][0]
+    np.testing.assert_allclose(power_law["params"][0], [3.0, 0.5], rtol=0.05)
+    assert power_law["sse"][0] < 0.1
+    assert comparison["best_model"][0] == "power_law"
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+WordNet語彙解決エンジン: 語（ラベル・記述）をWordNetのシンセットに一括で対応付ける
+- 見出し語→シンセットのハッシュ索引を事前に作る（1語あたり辞書引き1回）
+- 語形変化の正規化（WordNetの名詞の語尾規則と不規則変化表）はメモ化する
+- 完全一致しない複合語は、修飾語を前から外した主要部（"wild african elephant" → "african_elephant"）で引く
+- それでも見つからない語は文字トライグラムの転置索引で類似の見出し語を探す（Jaccard係数）
+- 一括解決では重複する語を1回だけ解決し、結果をキャッシュする
+- 上位語の辞書を持つ場合は、シンセットから指定カテゴリ（animal.n.01 など）への対応付けもできる
+
+WordNetから索引を作るには nltk と WordNet コーパスが必要（作った索引はJSONに保存して再利用できる）
+"""
+
+import json
+import re
+from collections import defaultdict
+
+import numpy as np
+
+try:
+    from nltk.corpus import wordnet as wn
+except ImportError:  # nltkがなければ保存済みの索引から作る
+    wn = None
+
+# WordNet（morphy）の名詞の語尾規則
+NOUN_SUFFIX_RULES = [("s", ""), ("ses", "s"), ("xes", "x"), ("zes", "z"),
+                     ("ches", "ch"), ("shes", "sh"), ("men", "man"), ("ies", "y")]
+
+# 解決方法（前の方ほど確実）
+EXACT, MORPHOLOGICAL, HEAD, FUZZY = "exact", "morphological", "head", "fuzzy"
+
+_SEPARATORS = re.compile(r"[\s\-]+")
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TermResolver:
+    def __init__(self, lemma_index, exceptions=None, hypernyms=None, fuzzy_threshold=0.5):
+        """
+        lemma_index: {見出し語（小文字、空白は "_"）: [シンセット名, ...]}（語義の頻度順）
+        exceptions: 不規則変化表 {変化形: [原形, ...]}
+        hypernyms: {シンセット名: [上位シンセット名, ...]}（カテゴリへの対応付けに使う）
+        fuzzy_threshold: トライグラムのJaccard係数がこれ以上の見出し語だけを類似語として採用
+        """
+        self.lemma_index = lemma_index
+        self.exceptions = exceptions or {}
+        self.hypernyms = hypernyms or {}
+        self.fuzzy_threshold = fuzzy_threshold
+        self._normalized = {}      # 語 -> 正規化した見出し語の形
+        self._base_forms = {}      # 見出し語の形 -> 索引にある原形（なければ None）
+        self._resolved = {}        # 正規化した語 -> 解決結果
+        self._category_cache = {}  # (シンセット名, カテゴリの組) -> カテゴリ名
+        self._trigram_index = None
+
+    @classmethod
+    def from_wordnet(cls, pos="n", **kwargs):
+        """WordNet（nltk）の全シンセットから索引を作る"""
+        if wn is None:
+            raise ImportError("WordNetから索引を作るには nltk が必要です")
+        wn.ensure_loaded()
+        lemma_index = {}
+        hypernyms = {}
+        for lemma in wn.all_lemma_names(pos):
+            synsets = wn.synsets(lemma, pos)  # 語義の頻度順
+            lemma_index[lemma] = [synset.name() for synset in synsets]
+            for synset in synsets:
+                if synset.name() not in hypernyms:
+                    parents = synset.hypernyms() + synset.instance_hypernyms()
+                    hypernyms[synset.name()] = [parent.name() for parent in parents]
+        hypernyms = {name: parents for name, parents in hypernyms.items() if parents}
+        exceptions = getattr(wn, "_exception_map", {}).get(pos, {})
+        return cls(lemma_index, exceptions=dict(exceptions), hypernyms=hypernyms, **kwargs)
+
+    def save(self, path):
+        data = {"lemmas": self.lemma_index, "exceptions": self.exceptions, "hypernyms": self.hypernyms}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["lemmas"], exceptions=data.get("exceptions"), hypernyms=data.get("hypernyms"), **kwargs)
+
+    def normalize(self, term):
+        """小文字化し、空白・ハイフンの連続を "_" にする（メモ化）"""
+        key = self._normalized.get(term)
+        if key is None:
+            key = _SEPARATORS.sub("_", term.strip().lower()).strip("_")
+            self._normalized[term] = key
+        return key
+
+    def base_form(self, key):
+        """見出し語の形を索引にある原形に直す（不規則変化表→語尾規則、複合語は最後の語を変化させる）"""
+        if key in self._base_forms:
+            return self._base_forms[key]
+        base = None
+        if key in self.lemma_index:
+            base = key
+        else:
+            head, _, last = key.rpartition("_")
+            prefix = head + "_" if head else ""
+            candidates = [prefix + form for form in self.exceptions.get(last, [])]
+            candidates += [prefix + last[:-len(suffix)] + ending
+                           for suffix, ending in NOUN_SUFFIX_RULES if last.endswith(suffix)]
+            base = next((candidate for candidate in candidates if candidate in self.lemma_index), None)
+        self._base_forms[key] = base
+        return base
+
+    def _build_trigram_index(self):
+        """見出し語の文字トライグラムの転置索引（初めて類似検索するときに作る）"""
+        lemmas = list(self.lemma_index)
+        postings = defaultdict(list)
+        sizes = np.empty(len(lemmas), dtype=np.int32)
+        for lemma_id, lemma in enumerate(lemmas):
+            grams = _trigrams(lemma)
+            sizes[lemma_id] = len(grams)
+            for gram in grams:
+                postings[gram].append(lemma_id)
+        self._trigram_index = (
+            lemmas,
+            {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()},
+            sizes
+        )
+
+    def fuzzy_match(self, key):
+        """トライグラムのJaccard係数が最大の見出し語 (見出し語, 係数)。しきい値未満なら (None, 係数)"""
+        if self._trigram_index is None:
+            self._build_trigram_index()
+        lemmas, postings, sizes = self._trigram_index
+        grams = _trigrams(key)
+        lists = [postings[gram] for gram in grams if gram in postings]
+        if not lists:
+            return None, 0.0
+        shared = np.bincount(np.concatenate(lists), minlength=len(lemmas))
+        candidates = np.flatnonzero(shared)
+        scores = shared[candidates] / (len(grams) + sizes[candidates] - shared[candidates])
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        if score < self.fuzzy_threshold:
+            return None, score
+        return lemmas[candidates[best]], score
+
+    def _resolve_key(self, key):
+        base = self.base_form(key)
+        if base is not None:
+            return {"lemma": base, "method": EXACT if base == key else MORPHOLOGICAL, "score": 1.0}
+
+        # 複合語: 修飾語を前から外して主要部で引く
+        words = key.split("_")
+        for start in range(1, len(words)):
+            base = self.base_form("_".join(words[start:]))
+            if base is not None:
+                return {"lemma": base, "method": HEAD, "score": (len(words) - start) / len(words)}
+
+        lemma, score = self.fuzzy_match(key)
+        if lemma is not None:
+            return {"lemma": lemma, "method": FUZZY, "score": score}
+        return {"lemma": None, "method": None, "score": score}
+
+    def resolve(self, term):
+        """語を解決: {"term", "normalized", "lemma", "synsets", "method", "score"}（見つからなければ synsets は空）"""
+        key = self.normalize(term)
+        result = self._resolved.get(key)
+        if result is None:
+            result = self._resolve_key(key)
+            result["synsets"] = self.lemma_index.get(result["lemma"], []) if result["lemma"] else []
+            self._resolved[key] = result
+        return dict(result, term=term, normalized=key)
+
+    def resolve_batch(self, terms):
+        """多数の語を一括で解決（重複する語は1回だけ解決する）"""
+        unique = {term: self.resolve(term) for term in dict.fromkeys(terms)}
+        return [unique[term] for term in terms]
+
+    def coverage(self, terms, methods=(EXACT, MORPHOLOGICAL)):
+        """指定した方法で解決できた語の割合と内訳"""
+        results = self.resolve_batch(terms)
+        counts = defaultdict(int)
+        for result in results:
+            counts[result["method"] or "unresolved"] += 1
+        resolved = sum(counts[method] for method in methods)
+        return {
+            "total_terms": len(results),
+            "resolved_terms": resolved,
+            "coverage": resolved / len(results) if results else 0.0,
+            "methods": dict(counts)
+        }
+
+    def category_of(self, synset, categories):
+        """シンセットの上位語をたどって最初に見つかるカテゴリ名（categories: {カテゴリ名: シンセット名}）"""
+        targets = {name: category for category, name in categories.items()}
+        cache_key = (synset, tuple(sorted(targets)))
+        if cache_key in self._category_cache:
+            return self._category_cache[cache_key]
+        # 幅優先で近いカテゴリを優先する
+        found, frontier, seen = None, [synset], {synset}
+        while frontier and found is None:
+            next_frontier = []
+            for node in frontier:
+                if node in targets:
+                    found = targets[node]
+                    break
+                for parent in self.hypernyms.get(node, ()):
+                    if parent not in seen:
+                        seen.add(parent)
+                        next_frontier.append(parent)
+            frontier = next_frontier
+        self._category_cache[cache_key] = found
+        return found
+
+    def map_labels(self, labels, categories):
+        """
+        検出ラベルを一括でカテゴリに対応付ける（語を解決し、最も頻度の高い語義から順に上位語をたどる）
+        戻り値: {ラベル: カテゴリ名 または None}
+        """
+        mapping = {}
+        for result in self.resolve_batch(list(dict.fromkeys(labels))):
+            category = None
+            for synset in result["synsets"]:
+                category = self.category_of(synset, categories)
+                if category is not None:
+                    break
+            mapping[result["term"]] = category
+        return mapping
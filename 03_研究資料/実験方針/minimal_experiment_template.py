@@ -10,32 +10,49 @@ from pathlib import Path
 import numpy as np
 import matplotlib.pyplot as plt
 
+from search_engine import HyperparameterSearch
+from sweep_engine import SweepEngine
+from results_store import ResultsStore  # sweep_engine が research/experiments をパスに追加済み
+
+# batch_size_sweep.py が書き出す実測バッチサイズプロファイル
+BATCH_PROFILE_PATH = Path("output/batch_tuning/batch_size_profile.json")
+
 class MinimalExperimentRunner:
     """最小単位実験の実行管理クラス"""
     
-    def __init__(self, base_config=None):
+    def __init__(self, base_config=None, max_workers=None):
         self.base_config = base_config or self.get_default_config()
         self.results = []
         self.experiment_log = []
+        self.max_workers = max_workers
+        self.store = ResultsStore()
         
     def get_default_config(self):
-        """デフォルト設定"""
+        """デフォルト設定（batch_sizeは実測プロファイルがあればそのニー点）"""
         return {
             "confidence_threshold": 0.75,
             "num_categories": 16,
             "sample_size": 30,
             "learning_rate": 0.001,
-            "batch_size": 32,
+            "batch_size": self.load_profiled_batch_size(default=32),
             "epochs": 10
         }
     
+    def load_profiled_batch_size(self, default=32):
+        """計測済みプロファイルの推奨バッチサイズを読み込む"""
+        try:
+            with open(BATCH_PROFILE_PATH, encoding='utf-8') as f:
+                return int(json.load(f)["recommended_batch_size"])
+        except (OSError, KeyError, ValueError):
+            return default
+    
     def run_single_experiment(self, param_name, param_value, experiment_id=None):
         """
         最小単位の実験を実行
         1つのパラメータのみを変更して実験
         """
         if experiment_id is None:
-            experiment_id = f"EXP_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            experiment_id = f"EXP_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
         
         print(f"\n{'='*50}")
         print(f"実験ID: {experiment_id}")
@@ -109,40 +126,40 @@ class MinimalExperimentRunner:
         }
     
     def save_experiment(self, experiment_data):
-        """実験結果をファイルに保存"""
-        # 保存ディレクトリの作成
-        save_dir = Path("experiment_results")
-        save_dir.mkdir(exist_ok=True)
-        
-        # 個別実験ファイル
-        filename = save_dir / f"{experiment_data['experiment_id']}.json"
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(experiment_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"結果を保存: {filename}")
+        """実験結果を共有結果ストアに追記"""
+        self.store.append("minimal_experiment", [experiment_data])
+        print(f"結果を保存: {self.store.root} (minimal_experiment)")
     
     def run_parameter_sweep(self, param_name, param_values):
         """
         パラメータスイープ実験
-        1つのパラメータを段階的に変更
+        1つのパラメータを段階的に変更（各点はプロセスプールで並列実行）
         """
         print(f"\nパラメータスイープ開始: {param_name}")
         print(f"テスト値: {param_values}")
         
-        sweep_results = {}
-        
-        for value in param_values:
-            result = self.run_single_experiment(param_name, value)
-            sweep_results[value] = result
-            
-            # 短い待機時間（実際の実験では不要かも）
-            time.sleep(1)
+        rows = self.run_design_sweep({param_name: list(param_values)}, design="grid")
+        sweep_results = {value: row for value, row in zip(param_values, rows)}
         
         # 結果の可視化
         self.plot_sweep_results(param_name, sweep_results)
         
         return sweep_results
     
+    def run_design_sweep(self, space, design="grid", n_points=None, seed=0):
+        """
+        実験計画に基づく多パラメータスイープ
+        space: {パラメータ名: 値のリスト or (下限, 上限)}
+        design: "grid" / "random" / "lhs"
+        結果は共有結果ストアの parameter_sweep テーブルに追記され、
+        同じ設定の点は再実行せずストアから返す
+        """
+        engine = SweepEngine(self.execute_experiment, store=self.store,
+                             max_workers=self.max_workers)
+        rows = engine.run(self.base_config, space, design=design, n_points=n_points, seed=seed)
+        self.results.extend(rows)
+        return rows
+    
     def plot_sweep_results(self, param_name, results):
         """スイープ結果の可視化"""
         values = sorted(results.keys())
@@ -221,6 +238,34 @@ class MinimalExperimentRunner:
         
         return optimal_params
 
+    
+    def get_search_space(self):
+        """多パラメータ探索の既定の探索空間"""
+        return {
+            "confidence_threshold": (0.60, 0.90),
+            "num_categories": [8, 12, 16, 20, 24, 32],
+            "batch_size": [8, 16, 32, 64],
+            "sample_size": (10, 50)
+        }
+    
+    def run_search(self, strategy="hyperband", metric="accuracy", space=None,
+                   max_budget=9, **kwargs):
+        """
+        Hyperband / ベイズ最適化による同時探索
+        予算は反復評価回数（見込みの薄い設定は少ない反復で打ち切り）
+        """
+        print(f"\n探索開始: {strategy} (評価指標: {metric})")
+        search = HyperparameterSearch(
+            self.execute_experiment, self.base_config, space or self.get_search_space(),
+            metric=metric, max_budget=max_budget, max_workers=self.max_workers
+        )
+        result = search.run(strategy, **kwargs)
+        
+        print(f"最良設定: {result['best_parameters']} ({metric}={result['best_score']:.4f})")
+        print(f"試行数: {result['num_trials']} (早期打ち切り {result['num_stopped_early']}), "
+              f"計算量: {result['compute_used']} 回の実験")
+        return result
+
 
 # 使用例
 if __name__ == "__main__":
@@ -244,4 +289,11 @@ if __name__ == "__main__":
     
     print("\n=== 最終的な最適パラメータ ===")
     for param, value in optimal_params.items():
-        print(f"{param}: {value}")
\ No newline at end of file
+        print(f"{param}: {value}")
+    
+    # 4. 多パラメータ同時探索
+    print("\n=== Hyperband探索 ===")
+    hyperband_result = runner.run_search("hyperband")
+    
+    print("\n=== ベイズ最適化探索 ===")
+    bayes_result = runner.run_search("bayesian", n_iterations=16)
\ No newline at end of file
@@ -0,0 +1,290 @@
+"""
+ハイパーパラメータ探索エンジン
+逐次半減（Successive Halving）/ Hyperband とベイズ最適化（ガウス過程 + 期待改善量）で
+複数パラメータを同時に探索し、見込みの薄い設定は少ない予算の段階で打ち切る
+
+予算（budget）は既定では反復評価回数（乱数シードを変えた実行の平均）で、
+resource_param を指定すると config[resource_param]（例: epochs）として実験に渡す
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from sweep_engine import config_hash, latin_hypercube_design, random_design, _sample_dimension
+
+
+def _run_trial(execute_fn, config, metric, seeds):
+    """ワーカープロセスで1試行分の評価を実行し、シードごとの指標値を返す"""
+    scores = []
+    for seed in seeds:
+        np.random.seed(seed)
+        scores.append(float(execute_fn(config)[metric]))
+    return scores
+
+
+def encode(space, point):
+    """パラメータ値を [0, 1] の単位超立方体へ写像（ベイズ最適化の入力）"""
+    x = []
+    for name, spec in space.items():
+        value = point[name]
+        if isinstance(spec, list):
+            x.append((spec.index(value) + 0.5) / len(spec))
+        else:
+            low, high = spec
+            x.append((value - low) / (high - low) if high > low else 0.5)
+    return np.array(x)
+
+
+def decode(space, u):
+    """単位超立方体の点 (n, 次元) をパラメータ値の辞書リストへ戻す"""
+    columns = {name: _sample_dimension(spec, u[:, i]) for i, (name, spec) in enumerate(space.items())}
+    return [{name: columns[name][j] for name in space} for j in range(len(u))]
+
+
+class GaussianProcess:
+    """RBFカーネルのガウス過程回帰（長さスケールは周辺尤度の格子探索で選択）"""
+
+    def __init__(self, length_scales=(0.05, 0.1, 0.2, 0.4, 0.8), noise=1e-4):
+        self.length_scales = length_scales
+        self.noise = noise
+
+    def _kernel(self, a, b, length_scale):
+        sq_dist = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=-1)
+        return np.exp(-0.5 * sq_dist / length_scale ** 2)
+
+    def fit(self, x, y):
+        self.x = x
+        self.y_mean = y.mean()
+        self.y_std = y.std() or 1.0
+        y = (y - self.y_mean) / self.y_std
+
+        best = None
+        for length_scale in self.length_scales:
+            k = self._kernel(x, x, length_scale) + self.noise * np.eye(len(x))
+            try:
+                chol = np.linalg.cholesky(k)
+            except np.linalg.LinAlgError:
+                continue
+            alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, y))
+            log_likelihood = -0.5 * y @ alpha - np.log(np.diag(chol)).sum()
+            if best is None or log_likelihood > best[0]:
+                best = (log_likelihood, length_scale, chol, alpha)
+        _, self.length_scale, self.chol, self.alpha = best
+        return self
+
+    def predict(self, x):
+        k_star = self._kernel(x, self.x, self.length_scale)
+        mean = k_star @ self.alpha
+        v = np.linalg.solve(self.chol, k_star.T)
+        var = np.maximum(1.0 - (v ** 2).sum(axis=0), 1e-12)
+        return mean * self.y_std + self.y_mean, np.sqrt(var) * self.y_std
+
+
+def expected_improvement(mean, std, best, xi=0.01):
+    """最大化問題の期待改善量"""
+    z = (mean - best - xi) / std
+    cdf = 0.5 * (1 + np.vectorize(math.erf)(z / math.sqrt(2)))
+    pdf = np.exp(-0.5 * z ** 2) / math.sqrt(2 * math.pi)
+    return (mean - best - xi) * cdf + std * pdf
+
+
+class HyperparameterSearch:
+    """Hyperband / ベイズ最適化による探索（試行はプロセスプールで並列評価）"""
+
+    def __init__(self, execute_fn, base_config, space, metric="accuracy", maximize=True,
+                 min_budget=1, max_budget=9, eta=3, resource_param=None,
+                 max_workers=None, seed=0):
+        """
+        execute_fn: config辞書を受け取り指標辞書を返す関数（pickle可能であること）
+        space: {パラメータ名: 値のリスト or (下限, 上限)}
+        """
+        self.execute_fn = execute_fn
+        self.base_config = base_config
+        self.space = space
+        self.metric = metric
+        self.sign = 1.0 if maximize else -1.0
+        self.min_budget = min_budget
+        self.max_budget = max_budget
+        self.eta = eta
+        self.resource_param = resource_param
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.rng = np.random.default_rng(seed)
+        self.trials = []
+        self.compute_used = 0
+        self._executor = None
+
+    # ---- 試行の評価 ----
+
+    def _new_trial(self, point):
+        config = {**self.base_config, **point}
+        key = config_hash(config)
+        trial = {
+            "trial_id": len(self.trials),
+            "config_hash": key,
+            "parameters": point,
+            "config": config,
+            "seed": int(key[:8], 16),
+            "scores": [],
+            "budget": 0,
+            "score": None,
+            "stopped_early": False
+        }
+        self.trials.append(trial)
+        return trial
+
+    def _evaluate(self, trials, budget):
+        """各試行を budget まで評価（反復評価モードでは不足分の反復だけを追加実行）"""
+        jobs = []
+        for trial in trials:
+            if self.resource_param is not None:
+                config = {**trial["config"], self.resource_param: budget}
+                seeds = [trial["seed"]]
+                trial["scores"] = []
+                self.compute_used += budget
+            else:
+                config = trial["config"]
+                seeds = [trial["seed"] + i for i in range(len(trial["scores"]), budget)]
+                self.compute_used += len(seeds)
+            jobs.append((self.execute_fn, config, self.metric, seeds))
+
+        if self._executor is None:
+            outputs = [_run_trial(*job) for job in jobs]
+        else:
+            outputs = list(self._executor.map(_run_trial, *zip(*jobs)))
+
+        for trial, scores in zip(trials, outputs):
+            trial["scores"].extend(scores)
+            trial["budget"] = budget
+            trial["score"] = float(np.mean(trial["scores"]))
+
+    def _objective(self, trial):
+        return self.sign * trial["score"]
+
+    # ---- 逐次半減 / Hyperband ----
+
+    def successive_halving(self, points, min_budget):
+        """全設定を min_budget で評価し、上位 1/eta だけを eta 倍の予算で再評価していく"""
+        survivors = [self._new_trial(point) for point in points]
+        budget = min_budget
+        while True:
+            self._evaluate(survivors, int(round(budget)))
+            if budget >= self.max_budget or len(survivors) <= 1:
+                return max(survivors, key=self._objective)
+            keep = max(1, len(survivors) // self.eta)
+            ranked = sorted(survivors, key=self._objective, reverse=True)
+            for trial in ranked[keep:]:
+                trial["stopped_early"] = True
+            survivors = ranked[:keep]
+            budget = min(budget * self.eta, self.max_budget)
+
+    def hyperband(self):
+        """予算配分の異なる複数の逐次半減ブラケットを実行"""
+        s_max = int(math.floor(math.log(self.max_budget / self.min_budget, self.eta) + 1e-9))
+        for s in range(s_max, -1, -1):
+            n_configs = int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+            points = random_design(self.space, n_configs, seed=self.rng.integers(2 ** 32))
+            best = self.successive_halving(points, self.max_budget * self.eta ** -s)
+            print(f"  ブラケット s={s}: {n_configs}設定 → 最良 {self.metric}={best['score']:.4f}")
+
+    # ---- ベイズ最適化 ----
+
+    def _full_trials(self):
+        return [t for t in self.trials if t["budget"] >= self.max_budget]
+
+    def _propose_batch(self, batch_size, n_candidates=2048):
+        """期待改善量が最大の候補を、予測平均を仮の観測値として1点ずつ追加しながら選ぶ"""
+        observed = self._full_trials()
+        x = np.array([encode(self.space, t["parameters"]) for t in observed])
+        y = np.array([self._objective(t) for t in observed])
+
+        candidates = decode(self.space, self.rng.random((n_candidates, len(self.space))))
+        seen = {config_hash(t["parameters"]) for t in self.trials}
+        candidates = [c for c in candidates if config_hash(c) not in seen]
+        candidate_x = np.array([encode(self.space, c) for c in candidates])
+
+        batch = []
+        for _ in range(batch_size):
+            if not candidates:
+                break
+            gp = GaussianProcess().fit(x, y)
+            mean, std = gp.predict(candidate_x)
+            index = int(np.argmax(expected_improvement(mean, std, y.max())))
+            batch.append(candidates.pop(index))
+            x = np.vstack([x, candidate_x[index]])
+            y = np.append(y, mean[index])
+            candidate_x = np.delete(candidate_x, index, axis=0)
+        return batch
+
+    def _evaluate_with_early_stopping(self, trials):
+        """まず min_budget で評価し、過去の同予算スコアの中央値未満なら打ち切る"""
+        history = [t["scores"][:self.min_budget] for t in self._full_trials()]
+        self._evaluate(trials, self.min_budget)
+        if self.resource_param is not None or not history:
+            promising = trials
+        else:
+            median = np.median([self.sign * np.mean(scores) for scores in history])
+            promising = [t for t in trials if self._objective(t) >= median]
+            for trial in trials:
+                trial["stopped_early"] = bool(self._objective(trial) < median)
+        if promising:
+            self._evaluate(promising, self.max_budget)
+
+    def bayesian_optimization(self, n_iterations=20, n_initial=None):
+        """ラテン超方格の初期点の後、並列ワーカー数ずつ候補を提案して評価"""
+        batch_size = self.max_workers
+        n_initial = n_initial or max(2 * len(self.space), batch_size)
+        initial = latin_hypercube_design(self.space, n_initial, seed=self.rng.integers(2 ** 32))
+        self._evaluate([self._new_trial(point) for point in initial], self.max_budget)
+
+        evaluated = 0
+        while evaluated < n_iterations:
+            batch = self._propose_batch(min(batch_size, n_iterations - evaluated))
+            if not batch:
+                break
+            self._evaluate_with_early_stopping([self._new_trial(point) for point in batch])
+            evaluated += len(batch)
+            best = max(self._full_trials(), key=self._objective)
+            print(f"  {evaluated}/{n_iterations}: 最良 {self.metric}={best['score']:.4f}")
+
+    # ---- 実行 ----
+
+    def run(self, strategy="hyperband", **kwargs):
+        """
+        探索を実行
+        strategy: "hyperband" / "bayesian"
+        戻り値: 最良設定・全試行・使用した計算量（評価回数 × 予算）
+        """
+        if strategy not in ("hyperband", "bayesian"):
+            raise ValueError(f"未対応の探索戦略です: {strategy}")
+
+        if self.max_workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        try:
+            if strategy == "hyperband":
+                self.hyperband(**kwargs)
+            else:
+                self.bayesian_optimization(**kwargs)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+        best = max(self._full_trials() or self.trials, key=self._objective)
+        return {
+            "strategy": strategy,
+            "metric": self.metric,
+            "best_parameters": best["parameters"],
+            "best_score": best["score"],
+            "best_budget": best["budget"],
+            "num_trials": len(self.trials),
+            "num_stopped_early": sum(t["stopped_early"] for t in self.trials),
+            "compute_used": self.compute_used,
+            "trials": [
+                {key: trial[key] for key in
+                 ("trial_id", "config_hash", "parameters", "budget", "score", "stopped_early")}
+                for trial in self.trials
+            ]
+        }
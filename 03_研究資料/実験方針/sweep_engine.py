@@ -0,0 +1,172 @@
+"""
+並列パラメータスイープエンジン
+グリッド / ランダム / ラテン超方格の実験計画を生成し、プロセスプールで並列実行する
+結果は設定ハッシュをキーに共有結果ストア（parameter_sweep テーブル）へ追記され、
+再実行時は完了済みの点を飛ばす
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import product
+from pathlib import Path
+
+import numpy as np
+
+# 共有結果ストアは research/experiments にある
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "research" / "experiments"))
+from results_store import ResultsStore, SCHEMAS, flatten_record
+
+SWEEP_TABLE = "parameter_sweep"
+
+
+def config_hash(config):
+    """設定辞書の正規化JSONから決定的なハッシュを計算"""
+    canonical = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+# ---- 実験計画 ----
+
+def grid_design(space):
+    """
+    全組み合わせ
+    space: {パラメータ名: 値のリスト}
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in product(*(space[name] for name in names))]
+
+
+def _sample_dimension(spec, u):
+    """0-1の一様値 u をパラメータ値に写像（リスト=離散、(下限, 上限)=連続/整数）"""
+    if isinstance(spec, list):
+        indices = np.minimum((u * len(spec)).astype(int), len(spec) - 1)
+        return [spec[i] for i in indices]
+    low, high = spec
+    if isinstance(low, int) and isinstance(high, int):
+        return [int(v) for v in np.minimum(low + np.floor(u * (high - low + 1)), high)]
+    return [float(v) for v in low + u * (high - low)]
+
+
+def random_design(space, n_points, seed=None):
+    """
+    一様ランダムサンプリング
+    space: {パラメータ名: 値のリスト or (下限, 上限)}
+    """
+    rng = np.random.default_rng(seed)
+    columns = {name: _sample_dimension(spec, rng.random(n_points)) for name, spec in space.items()}
+    return [{name: columns[name][i] for name in space} for i in range(n_points)]
+
+
+def latin_hypercube_design(space, n_points, seed=None):
+    """
+    ラテン超方格サンプリング
+    各次元を n_points 等分し、各区間からちょうど1点ずつ選ぶ
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, spec in space.items():
+        strata = (rng.permutation(n_points) + rng.random(n_points)) / n_points
+        columns[name] = _sample_dimension(spec, strata)
+    return [{name: columns[name][i] for name in space} for i in range(n_points)]
+
+
+DESIGNS = {
+    "grid": lambda space, n_points, seed: grid_design(space),
+    "random": random_design,
+    "lhs": latin_hypercube_design
+}
+
+
+# ---- 実行 ----
+
+def _execute_point(execute_fn, config, seed):
+    """ワーカープロセスで1点を実行（点ごとに乱数を固定して再現可能にする）"""
+    np.random.seed(seed)
+    start_time = time.perf_counter()
+    result = execute_fn(config)
+    return result, time.perf_counter() - start_time
+
+
+class SweepEngine:
+    """実験計画の各点を並列実行し、結果を設定ハッシュでメモ化する"""
+
+    def __init__(self, execute_fn, store=None, max_workers=None, flush_every=50):
+        """
+        execute_fn: config辞書を受け取り指標辞書を返す関数（pickle可能であること）
+        """
+        self.execute_fn = execute_fn
+        self.store = store or ResultsStore()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.flush_every = flush_every
+
+    def _to_row(self, sweep_id, key, config, point, result, execution_time):
+        row = {
+            "config_hash": key,
+            "experiment_id": f"{sweep_id}_{key[:8]}",
+            "sweep_id": sweep_id,
+            "timestamp": datetime.now().isoformat(),
+            "execution_time_seconds": round(execution_time, 4),
+            "parameters_changed": point,
+            "config": config
+        }
+        row.update(result)
+        return row
+
+    def run(self, base_config, space, design="grid", n_points=None, seed=0, sweep_id=None):
+        """
+        スイープ実行
+        design: "grid" / "random" / "lhs"（random と lhs は n_points が必要）
+        戻り値: 計画の各点に対応する行のリスト（完了済みの点はストアから返す）
+        """
+        if design not in DESIGNS:
+            raise ValueError(f"未対応の実験計画です: {design}")
+        if design != "grid" and n_points is None:
+            raise ValueError(f"{design} 計画には n_points が必要です")
+
+        sweep_id = sweep_id or f"SWEEP_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+        points = DESIGNS[design](space, n_points, seed)
+        configs = [{**base_config, **point} for point in points]
+        keys = [config_hash(config) for config in configs]
+
+        # 計画内の設定ハッシュだけを条件付きで読み出す
+        completed = {
+            row["config_hash"]: row
+            for row in self.store.query(SWEEP_TABLE, where=[("config_hash", "in", sorted(set(keys)))])
+        }
+        pending = {}
+        for key, config, point in zip(keys, configs, points):
+            if key not in completed and key not in pending:
+                pending[key] = (config, point)
+        print(f"スイープ {sweep_id}: {len(points)}点中 {len(points) - len(pending)}点は完了済み、"
+              f"{len(pending)}点を {self.max_workers} ワーカーで実行")
+
+        buffer = []
+        if pending:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(pending))) as executor:
+                futures = {
+                    executor.submit(_execute_point, self.execute_fn, config, int(key[:8], 16)): key
+                    for key, (config, _) in pending.items()
+                }
+                try:
+                    for done, future in enumerate(as_completed(futures), 1):
+                        key = futures[future]
+                        config, point = pending[key]
+                        result, execution_time = future.result()
+                        row = self._to_row(sweep_id, key, config, point, result, execution_time)
+                        # 戻り値はストアから読み戻した行と同じフラットな形に揃える
+                        completed[key] = flatten_record(row, SCHEMAS[SWEEP_TABLE])
+                        buffer.append(row)
+                        if len(buffer) >= self.flush_every:
+                            self.store.append(SWEEP_TABLE, buffer)
+                            buffer = []
+                            print(f"  進捗: {done}/{len(pending)}")
+                finally:
+                    # 失敗した点があっても完了分は保存し、再実行時に飛ばせるようにする
+                    self.store.append(SWEEP_TABLE, buffer)
+
+        return [completed[key] for key in keys]
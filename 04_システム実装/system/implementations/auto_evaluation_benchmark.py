@@ -4,21 +4,33 @@
 モデル性能の自動評価と比較ベンチマークを実行するシステム
 """
 
-import json
+import sys
 import time
 from datetime import datetime
 from pathlib import Path
-import random
 from collections import defaultdict
 import statistics
 
+import numpy as np
+
+from benchmark_history import BenchmarkHistory, config_hash
+from benchmark_scheduler import BenchmarkScheduler
+from classification_metrics import classification_metrics
+from model_profiler import ModelProfiler, load_model, synthetic_inputs
+
+# 共有結果ストアは 03_研究資料/research/experiments にある
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "03_研究資料" / "research" / "experiments"))
+from results_store import ResultsStore
+
 class AutoEvaluationBenchmark:
     def __init__(self):
         self.name = "自動評価・ベンチマークシステム"
-        self.version = "2.0.0"
+        self.version = "2.1.0"
         self.output_dir = Path("output/benchmarks")
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.benchmark_history = []
+        self.store = ResultsStore()
+        self.profiler = ModelProfiler()
         
         # 評価メトリクス定義
         self.metrics = {
@@ -26,122 +38,95 @@ class AutoEvaluationBenchmark:
             "precision": {"name": "適合率", "unit": "", "higher_is_better": True},
             "recall": {"name": "再現率", "unit": "", "higher_is_better": True},
             "f1_score": {"name": "F1スコア", "unit": "", "higher_is_better": True},
+            "cohens_kappa": {"name": "Cohenのκ", "unit": "", "higher_is_better": True},
+            "mcc": {"name": "MCC", "unit": "", "higher_is_better": True},
             "processing_time": {"name": "処理時間", "unit": "ms", "higher_is_better": False},
-            "memory_usage": {"name": "メモリ使用量", "unit": "MB", "higher_is_better": False},
+            "cpu_time": {"name": "CPU時間", "unit": "ms", "higher_is_better": False},
+            "memory_usage": {"name": "ピークメモリ (RSS)", "unit": "MB", "higher_is_better": False},
+            "allocated_memory": {"name": "割り当てピーク", "unit": "MB", "higher_is_better": False},
             "throughput": {"name": "スループット", "unit": "fps", "higher_is_better": True}
         }
+        self.history = BenchmarkHistory(self.store, self.metrics)
         
-    def generate_confusion_matrix(self, num_classes=5):
-        """混同行列を生成（モック実装）"""
-        matrix = [[0 for _ in range(num_classes)] for _ in range(num_classes)]
-        
-        # 対角線上に高い値を配置（正解）
-        for i in range(num_classes):
-            matrix[i][i] = random.randint(7, 9)  # 7-9個の正解
-            
-            # 非対角要素（誤分類）
-            for j in range(num_classes):
-                if i != j:
-                    matrix[i][j] = random.randint(0, 2)  # 0-2個の誤分類
-        
-        return matrix
+    def __getstate__(self):
+        # ベンチマークセルごとにワーカープロセスへ渡されるため、過去のレポート履歴は送らない
+        state = dict(self.__dict__)
+        state["benchmark_history"] = []
+        return state
+    
+    def generate_confusion_matrix(self, num_classes=5, seed=None):
+        """混同行列を生成（モック実装。seed が同じなら同じ行列）"""
+        rng = np.random.default_rng(seed)
+        # 対角線上に高い値（7-9個の正解）、非対角要素に0-2個の誤分類
+        matrix = rng.integers(0, 3, size=(num_classes, num_classes))
+        np.fill_diagonal(matrix, rng.integers(7, 10, size=num_classes))
+        return matrix.tolist()
     
     def calculate_metrics_from_confusion_matrix(self, confusion_matrix):
-        """混同行列から各種メトリクスを計算"""
-        num_classes = len(confusion_matrix)
-        metrics = {}
-        
-        # 全体の精度
-        total_correct = sum(confusion_matrix[i][i] for i in range(num_classes))
-        total_samples = sum(sum(row) for row in confusion_matrix)
-        metrics["accuracy"] = (total_correct / total_samples) if total_samples > 0 else 0
+        """混同行列から各種メトリクスを計算（マクロ平均を precision/recall/f1_score とする）"""
+        computed = classification_metrics(confusion_matrix)
+        
+        metrics = {
+            "accuracy": float(computed["accuracy"]),
+            "precision": float(computed["macro_precision"]),
+            "recall": float(computed["macro_recall"]),
+            "f1_score": float(computed["macro_f1"]),
+            "micro_f1": float(computed["micro_f1"]),
+            "weighted_f1": float(computed["weighted_f1"]),
+            "cohens_kappa": float(computed["cohens_kappa"]),
+            "mcc": float(computed["mcc"])
+        }
         
         # クラスごとのメトリクス
-        class_metrics = []
-        for i in range(num_classes):
-            tp = confusion_matrix[i][i]
-            fp = sum(confusion_matrix[j][i] for j in range(num_classes)) - tp
-            fn = sum(confusion_matrix[i]) - tp
-            tn = total_samples - tp - fp - fn
-            
-            precision = tp / (tp + fp) if (tp + fp) > 0 else 0
-            recall = tp / (tp + fn) if (tp + fn) > 0 else 0
-            f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-            
-            class_metrics.append({
+        class_metrics = [
+            {
                 "class_id": i,
                 "precision": precision,
                 "recall": recall,
                 "f1_score": f1,
-                "support": sum(confusion_matrix[i])
-            })
-        
-        # マクロ平均
-        metrics["precision"] = sum(m["precision"] for m in class_metrics) / len(class_metrics)
-        metrics["recall"] = sum(m["recall"] for m in class_metrics) / len(class_metrics)
-        metrics["f1_score"] = sum(m["f1_score"] for m in class_metrics) / len(class_metrics)
+                "support": int(support)
+            }
+            for i, (precision, recall, f1, support) in enumerate(zip(
+                computed["precision"].tolist(), computed["recall"].tolist(),
+                computed["f1_score"].tolist(), computed["support"].tolist()
+            ))
+        ]
         
         return metrics, class_metrics
     
-    def simulate_model_performance(self, model_name, dataset_name):
-        """モデル性能をシミュレート（モック実装）"""
-        # モデル特性に基づくベース性能
-        model_characteristics = {
-            "resnet50": {"base_accuracy": 85, "speed": 50, "memory": 200},
-            "efficientnet": {"base_accuracy": 87, "speed": 35, "memory": 150},
-            "mobilenet": {"base_accuracy": 80, "speed": 20, "memory": 50},
-            "custom_model": {"base_accuracy": 83, "speed": 45, "memory": 180},
-            "ensemble": {"base_accuracy": 90, "speed": 80, "memory": 400}
-        }
-        
-        # データセット特性
-        dataset_difficulty = {
-            "easy": 1.1,
-            "medium": 1.0,
-            "hard": 0.9,
-            "very_hard": 0.85
-        }
-        
-        # ベース性能取得
-        if model_name in model_characteristics:
-            base = model_characteristics[model_name]
-        else:
-            base = {"base_accuracy": 82, "speed": 40, "memory": 160}
-        
-        # ランダム要素を加えた性能
-        difficulty = dataset_difficulty.get(dataset_name, 1.0)
+    def measure_model_performance(self, model_config, dataset_config, num_samples):
+        """モデルの推論を実機で計測（処理時間・CPU時間・メモリ・スループット）"""
+        predict_fn = load_model(model_config, dataset_config)
+        inputs = synthetic_inputs(dataset_config, num_samples)
+        profile = self.profiler.profile(predict_fn, inputs)
         
         performance = {
-            "accuracy": min(1.0, (base["base_accuracy"] / 100) * difficulty + random.uniform(-0.05, 0.05)),
-            "processing_time": base["speed"] + random.uniform(-10, 10),
-            "memory_usage": base["memory"] + random.uniform(-20, 20),
-            "throughput": 1000 / base["speed"] + random.uniform(-2, 2)
+            name: profile[name]
+            for name in ("processing_time", "processing_time_p95", "cpu_time",
+                         "memory_usage", "allocated_memory", "throughput")
         }
-        
-        return performance
+        return performance, profile
     
     def run_single_benchmark(self, model_config, dataset_config, num_samples=1000):
         """単一ベンチマークの実行"""
         start_time = time.time()
         
-        # 混同行列生成
+        # 混同行列生成（セルごとに固定のシードで、同じコードの実行間で精度系メトリクスが変わらないようにする）
         confusion_matrix = self.generate_confusion_matrix(
-            num_classes=dataset_config.get("num_classes", 5)
+            num_classes=dataset_config.get("num_classes", 5),
+            seed=int(config_hash({"model": model_config, "dataset": dataset_config}), 16)
         )
         
         # メトリクス計算
         metrics, class_metrics = self.calculate_metrics_from_confusion_matrix(confusion_matrix)
         
-        # パフォーマンスシミュレーション
-        performance = self.simulate_model_performance(
-            model_config["name"],
-            dataset_config.get("difficulty", "medium")
+        # パフォーマンス計測
+        performance, profile = self.measure_model_performance(
+            model_config, dataset_config, num_samples
         )
         
-        # メトリクス統合（accuracyは混同行列の値を優先）
-        confusion_accuracy = metrics["accuracy"]
+        # メトリクス統合
         metrics.update(performance)
-        metrics["accuracy"] = confusion_accuracy  # 混同行列由来の精度を保持
         
         # ベンチマーク時間
         benchmark_time = time.time() - start_time
@@ -153,34 +138,63 @@ class AutoEvaluationBenchmark:
             "class_metrics": class_metrics,
             "confusion_matrix": confusion_matrix,
             "num_samples": num_samples,
+            "latency_samples": profile["latency_samples"],
+            "peak_rss": profile["peak_rss"],
+            "profiler_settings": profile["settings"],
             "benchmark_time": round(benchmark_time, 3),
             "timestamp": datetime.now().isoformat()
         }
         
         return result
     
-    def run_comparative_benchmark(self, models, datasets):
-        """複数モデル・データセットの比較ベンチマーク"""
+    def run_comparative_benchmark(self, models, datasets, max_workers=None, use_cache=False,
+                                  num_samples=1000):
+        """
+        複数モデル・データセットの比較ベンチマーク
+        各セルは BenchmarkScheduler が別プロセスで並列実行し、完了順に比較マトリクスへ反映する
+        use_cache: 変更のないセルをキャッシュから返す（回帰比較の対象にする実行では既定どおり無効にし、毎回計測する）
+        キャッシュから返したセルは結果に "cached": True を付け、回帰比較から除外される
+        """
         print("🏃 比較ベンチマーク実行中...")
         
-        all_results = []
-        comparison_matrix = defaultdict(lambda: defaultdict(dict))
-        
-        total_combinations = len(models) * len(datasets)
-        current = 0
+        # 実行メタデータ（同じ設定ハッシュの実行どうしを回帰比較する）
+        run = self.history.create_run({
+            "models": models,
+            "datasets": datasets,
+            "num_samples": num_samples,
+            "profiler": {
+                "warmup_batches": self.profiler.warmup_batches,
+                "repetitions": self.profiler.repetitions,
+                "batch_size": self.profiler.batch_size
+            }
+        }, self.version)
+        
+        cells = [(model, dataset) for model in models for dataset in datasets]
+        results_by_cell = {}
+        failed_cells = []
+        comparison_matrix = {}
+        
+        scheduler = BenchmarkScheduler(self, max_workers=max_workers, use_cache=use_cache)
+        for done, (index, result, info) in enumerate(scheduler.run(cells, num_samples), 1):
+            model, dataset = cells[index]
+            if result is None:
+                failed_cells.append({"model": model["name"], "dataset": dataset["name"],
+                                     "error": info["error"]})
+                print(f"  [{done}/{len(cells)}] ❌ {model['name']} on {dataset['name']}: {info['error']}")
+                continue
+            
+            status = "キャッシュ" if info["cached"] else f"{result['benchmark_time']:.2f}s"
+            print(f"  [{done}/{len(cells)}] {model['name']} on {dataset['name']} ({status})")
+            results_by_cell[index] = dict(result, cached=info["cached"])
+            
+            # 比較マトリクスに追加
+            for metric_name, metric_value in result["metrics"].items():
+                comparison_matrix.setdefault(metric_name, {}).setdefault(
+                    model["name"], {}
+                )[dataset["name"]] = metric_value
         
-        for model in models:
-            for dataset in datasets:
-                current += 1
-                print(f"  [{current}/{total_combinations}] {model['name']} on {dataset['name']}")
-                
-                # ベンチマーク実行
-                result = self.run_single_benchmark(model, dataset)
-                all_results.append(result)
-                
-                # 比較マトリクスに追加
-                for metric_name, metric_value in result["metrics"].items():
-                    comparison_matrix[metric_name][model["name"]][dataset["name"]] = metric_value
+        # 結果はグリッド順に並べる
+        all_results = [results_by_cell[index] for index in sorted(results_by_cell)]
         
         # 総合分析
         analysis = self.analyze_benchmark_results(all_results, comparison_matrix)
@@ -188,11 +202,14 @@ class AutoEvaluationBenchmark:
         # レポート生成
         report = {
             "benchmark_name": "比較ベンチマーク",
+            "run_id": run["run_id"],
+            "run": run,
             "timestamp": datetime.now().isoformat(),
             "models": models,
             "datasets": datasets,
             "results": all_results,
-            "comparison_matrix": dict(comparison_matrix),
+            "failed_cells": failed_cells,
+            "comparison_matrix": comparison_matrix,
             "analysis": analysis
         }
         
@@ -285,7 +302,7 @@ class AutoEvaluationBenchmark:
         if "processing_time" in analysis["best_performers"]:
             fastest = analysis["best_performers"]["processing_time"]
             analysis["recommendations"].append(
-                f"最速処理は {fastest['model']} で {fastest['value']:.1f}ms です"
+                f"最速処理は {fastest['model']} で {fastest['value']:.3f}ms/サンプル です"
             )
         
         return analysis
@@ -443,15 +460,23 @@ class AutoEvaluationBenchmark:
         
         return str(report_path)
     
-    def export_results_json(self, report):
-        """結果をJSON形式でエクスポート"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        json_path = self.output_dir / f"benchmark_results_{timestamp}.json"
-        
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
-        
-        return str(json_path)
+    def export_results(self, report):
+        """
+        モデル×データセットごとの結果を共有結果ストアの benchmark テーブルに追記し、
+        実行メタデータを benchmark_run テーブルに記録
+        """
+        rows = [dict(result, run_id=report["run_id"], run_timestamp=report["timestamp"])
+                for result in report["results"]]
+        self.store.append("benchmark", rows)
+        self.history.record_run(report["run"])
+        return f"{self.store.root} (benchmark, {len(rows)}行)"
+    
+    def compare_with_previous(self, report):
+        """保存済みの同じ設定の直前の実行と比較（初回は None）"""
+        previous = self.history.previous_run(report["run"])
+        if previous is None:
+            return None
+        return self.history.compare(previous["run_id"], report["run_id"])
 
 def main():
     """実行例"""
@@ -484,9 +509,16 @@ def main():
     html_path = benchmark.generate_benchmark_report_html(report)
     print(f"\n📄 HTMLレポート生成: {html_path}")
     
-    # JSON エクスポート
-    json_path = benchmark.export_results_json(report)
-    print(f"💾 JSON結果エクスポート: {json_path}")
+    # 結果ストアへ追記
+    store_location = benchmark.export_results(report)
+    print(f"💾 結果ストアに保存: {store_location}")
+    
+    # 前回実行との回帰比較
+    diff = benchmark.compare_with_previous(report)
+    if diff is None:
+        print("\n📉 回帰比較: 同じ設定の過去の実行がありません（今回の実行を基準として保存）")
+    else:
+        print("\n📉 " + benchmark.history.format_diff(diff))
     
     # サマリー表示
     print("\n📈 ベンチマークサマリー:")
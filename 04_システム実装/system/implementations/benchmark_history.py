@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク履歴と回帰検出
+比較ベンチマークの実行ごとに実行メタデータ（gitコミット・マシン情報・設定ハッシュ）を
+共有結果ストアの benchmark_run テーブルに保存し、同じ設定の過去の実行と比較する
+- 処理時間: 反復ごとの中央値の系列に対する Mann-Whitney のU検定（片側）と中央値の変化率
+  （同じ反復内のバッチ遅延は互いに独立ではないため、反復を1標本とする）
+- その他のメトリクス: 実行ごとに1値のため、変化率が許容幅を超えたものを報告
+  （時間・メモリなど単位のある計測値は、実行間のばらつきを見込んだ広い許容幅を使う）
+- キャッシュから返されたセル（その実行で計測していないセル）は比較しない
+"""
+
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# 統計関数は 03_研究資料/research/experiments にある
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "03_研究資料" / "research" / "experiments"))
+from experiment_stats import mann_whitney_u
+
+RUN_TABLE = "benchmark_run"
+RESULT_TABLE = "benchmark"
+
+
+def _git(*args):
+    completed = subprocess.run(
+        ["git", *args], cwd=Path(__file__).resolve().parent,
+        capture_output=True, text=True, timeout=30
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip())
+    return completed.stdout.strip()
+
+
+def git_revision():
+    """(コミットハッシュ, 未コミットの変更があるか)。gitが使えない環境では (None, None)"""
+    try:
+        return _git("rev-parse", "HEAD"), bool(_git("status", "--porcelain", "--untracked-files=no"))
+    except (OSError, RuntimeError, subprocess.TimeoutExpired):
+        return None, None
+
+
+def code_fingerprint():
+    """
+    計測対象のコードの指紋（コミットハッシュ、未コミットの変更があれば差分のハッシュを付加）
+    gitが使えない環境では None
+    """
+    try:
+        commit = _git("rev-parse", "HEAD")
+        diff = _git("diff", "HEAD")
+    except (OSError, RuntimeError, subprocess.TimeoutExpired):
+        return None
+    if not diff:
+        return commit
+    return f"{commit}+{hashlib.sha256(diff.encode('utf-8')).hexdigest()[:12]}"
+
+
+def machine_info():
+    """実行マシンの情報（異なるマシン間の比較を見分けるため）"""
+    return {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__
+    }
+
+
+def config_hash(config):
+    """ベンチマーク設定の正規化JSONから決定的なハッシュを計算"""
+    canonical = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class BenchmarkHistory:
+    def __init__(self, store, metrics, alpha=0.01, latency_tolerance=0.20, metric_tolerance=0.10,
+                 measurement_tolerance=0.25):
+        """
+        metrics: AutoEvaluationBenchmark.metrics（higher_is_better で悪化の向きを判定）
+        alpha: 遅延系列の検定の有意水準
+        latency_tolerance: 回帰とみなす処理時間中央値の最小変化率
+        metric_tolerance: 1値メトリクス（精度など）で報告する最小変化率
+        measurement_tolerance: 単位のある1値の計測値（CPU時間・メモリ・スループット）で報告する最小変化率
+        """
+        self.store = store
+        self.metrics = metrics
+        self.alpha = alpha
+        self.latency_tolerance = latency_tolerance
+        self.metric_tolerance = metric_tolerance
+        self.measurement_tolerance = measurement_tolerance
+
+    def create_run(self, config, benchmark_version):
+        """実行メタデータを作成（レポートに埋め込み、record_run で保存する）"""
+        commit, dirty = git_revision()
+        return {
+            "run_id": f"RUN_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}",
+            "timestamp": datetime.now().isoformat(),
+            "config_hash": config_hash(config),
+            "benchmark_version": benchmark_version,
+            "git_commit": commit,
+            "git_dirty": dirty,
+            "machine": machine_info(),
+            "config": config
+        }
+
+    def record_run(self, run):
+        self.store.append(RUN_TABLE, [run])
+
+    def previous_run(self, run):
+        """同じ設定ハッシュを持つ直前の実行（なければ None）"""
+        rows = self.store.query(RUN_TABLE, where=[("config_hash", "==", run["config_hash"]),
+                                                  ("timestamp", "<", run["timestamp"])])
+        return max(rows, key=lambda row: row["timestamp"]) if rows else None
+
+    def _load_cells(self, run_id):
+        rows = self.store.query(RESULT_TABLE, where=[("run_id", "==", run_id)])
+        return {(row["model.name"], row["dataset.name"]): row for row in rows}
+
+    @staticmethod
+    def _repetition_medians(row):
+        """バッチ遅延の系列（反復ごとに全バッチ分）を反復ごとの中央値にまとめる"""
+        samples = np.asarray(json.loads(row["latency_samples"]), dtype=float)
+        repetitions = row.get("profiler_settings.repetitions")
+        if not repetitions or len(samples) % repetitions:
+            return samples  # 反復数の記録がない古い行はバッチ遅延のまま比較する
+        return np.median(samples.reshape(repetitions, -1), axis=1)
+
+    def _compare_latency(self, base, head):
+        base_samples = self._repetition_medians(base)
+        head_samples = self._repetition_medians(head)
+        base_median = float(np.median(base_samples))
+        head_median = float(np.median(head_samples))
+        change = (head_median - base_median) / base_median if base_median else 0.0
+        _, p_slower = mann_whitney_u(head_samples, base_samples, alternative="greater")
+        _, p_faster = mann_whitney_u(head_samples, base_samples, alternative="less")
+
+        status = "unchanged"
+        if p_slower < self.alpha and change > self.latency_tolerance:
+            status = "regression"
+        elif p_faster < self.alpha and change < -self.latency_tolerance:
+            status = "improvement"
+        return {
+            "metric": "processing_time",
+            "base": base_median,
+            "head": head_median,
+            "change": change,
+            "p_value": min(p_slower, p_faster),
+            "status": status
+        }
+
+    def _compare_metric(self, name, base_value, head_value):
+        change = (head_value - base_value) / abs(base_value) if base_value else 0.0
+        tolerance = self.measurement_tolerance if self.metrics[name]["unit"] else self.metric_tolerance
+        status = "unchanged"
+        if abs(change) > tolerance:
+            worse = change < 0 if self.metrics[name]["higher_is_better"] else change > 0
+            status = "regression" if worse else "improvement"
+        return {"metric": name, "base": base_value, "head": head_value,
+                "change": change, "p_value": None, "status": status}
+
+    def compare(self, base_run_id, head_run_id):
+        """
+        2つの実行をセル（モデル×データセット）ごとに比較
+        戻り値: セルごとの変化・回帰一覧を含む差分
+        """
+        runs = {row["run_id"]: row for row in self.store.query(
+            RUN_TABLE, where=[("run_id", "in", [base_run_id, head_run_id])])}
+        base_cells = self._load_cells(base_run_id)
+        head_cells = self._load_cells(head_run_id)
+
+        cells = []
+        cached_cells = []
+        for key in sorted(set(base_cells) & set(head_cells)):
+            base, head = base_cells[key], head_cells[key]
+            if base.get("cached") or head.get("cached"):
+                cached_cells.append(key)
+                continue
+            changes = []
+            if base.get("latency_samples") and head.get("latency_samples"):
+                changes.append(self._compare_latency(base, head))
+            for name in self.metrics:
+                column = f"metrics.{name}"
+                if name == "processing_time" or base.get(column) is None or head.get(column) is None:
+                    continue
+                changes.append(self._compare_metric(name, base[column], head[column]))
+            cells.append({"model": key[0], "dataset": key[1], "changes": changes})
+
+        base_run, head_run = runs.get(base_run_id, {}), runs.get(head_run_id, {})
+        return {
+            "base_run": base_run_id,
+            "head_run": head_run_id,
+            "base_commit": base_run.get("git_commit"),
+            "head_commit": head_run.get("git_commit"),
+            "same_machine": base_run.get("machine") == head_run.get("machine"),
+            "cells": cells,
+            "missing_cells": sorted(set(base_cells) ^ set(head_cells)),
+            "cached_cells": cached_cells,
+            "regressions": [
+                {"model": cell["model"], "dataset": cell["dataset"], **change}
+                for cell in cells for change in cell["changes"] if change["status"] == "regression"
+            ]
+        }
+
+    def format_diff(self, diff):
+        """変化のあったメトリクスだけを並べた簡潔な差分レポート"""
+        commits = [(commit or "unknown")[:10] for commit in (diff["base_commit"], diff["head_commit"])]
+        lines = [f"ベンチマーク差分: {diff['base_run']} ({commits[0]}) → {diff['head_run']} ({commits[1]})"]
+        if not diff["same_machine"]:
+            lines.append("  ⚠️ マシン構成が異なるため、時間・メモリの比較は参考値です")
+
+        marks = {"regression": "🔺 回帰", "improvement": "✅ 改善"}
+        changed = 0
+        for cell in diff["cells"]:
+            for change in cell["changes"]:
+                if change["status"] == "unchanged":
+                    continue
+                changed += 1
+                p_text = f", p={change['p_value']:.2g}" if change["p_value"] is not None else ""
+                lines.append(
+                    f"  {marks[change['status']]} {cell['model']} / {cell['dataset']} {change['metric']}: "
+                    f"{change['base']:.4g} → {change['head']:.4g} ({change['change']:+.1%}{p_text})"
+                )
+        if not changed:
+            lines.append(f"  有意な変化なし（{len(diff['cells'])}セル）")
+        for model, dataset in diff.get("cached_cells", []):
+            lines.append(f"  キャッシュの結果のため比較対象外: {model} / {dataset}")
+        for model, dataset in diff["missing_cells"]:
+            lines.append(f"  片方の実行にのみ存在: {model} / {dataset}")
+        return "\n".join(lines)
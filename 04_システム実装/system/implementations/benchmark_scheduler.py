@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+ベンチマークスケジューラ
+モデル×データセットの各セルを、1セル1プロセス（使い捨てのワーカー）で並列実行する
+- セル単位で新しいプロセスを使うため、メモリ計測が他セルの影響を受けない
+- 失敗したセルは新しいプールで再試行（ワーカーの異常終了後はセルごとに別プール）
+- 結果はセルの設定・コードの指紋・マシン情報のハッシュでキャッシュし、変更のないセルは再実行しない
+  （gitが使えずコードの指紋が取れない環境ではキャッシュを使わない）
+- 完了したセルから順に呼び出し元へ返し、レポートを逐次更新できる
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from benchmark_history import code_fingerprint, machine_info
+
+CELL_TABLE = "benchmark_cell"
+
+
+def _run_cell(benchmark, model, dataset, num_samples):
+    """ワーカープロセスで1セルを実行"""
+    return benchmark.run_single_benchmark(model, dataset, num_samples=num_samples)
+
+
+class BenchmarkScheduler:
+    def __init__(self, benchmark, max_workers=None, max_retries=2, use_cache=True, store=None):
+        self.benchmark = benchmark
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_retries = max_retries
+        self.store = store or benchmark.store  # 共有結果ストア（キャッシュ用テーブル）
+        # 計測対象のコードと実行環境（どちらかが変われば別のセルとして再計測する）
+        self.fingerprint = {"code": code_fingerprint(), "machine": machine_info()}
+        self.use_cache = use_cache and self.fingerprint["code"] is not None
+
+    def cell_key(self, model, dataset, num_samples):
+        """モデル・データセット設定、ベンチマーク実装のバージョン、コードと実行環境の指紋から決まるセルのキー"""
+        canonical = json.dumps({
+            "model": model,
+            "dataset": dataset,
+            "num_samples": num_samples,
+            "benchmark_version": self.benchmark.version,
+            "fingerprint": self.fingerprint
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+    def _load_cached(self, keys):
+        rows = self.store.query(CELL_TABLE, columns=["cell_key", "result"],
+                                where=[("cell_key", "in", sorted(set(keys)))])
+        return {row["cell_key"]: json.loads(row["result"]) for row in rows}
+
+    def run(self, cells, num_samples=1000):
+        """
+        セルを実行し、完了順に (セル番号, 結果, 実行情報) を返すジェネレータ
+        cells: [(model_config, dataset_config), ...]
+        結果が None のセルは再試行回数を使い切って失敗したもの（実行情報に error）
+        """
+        keys = [self.cell_key(model, dataset, num_samples) for model, dataset in cells]
+        cached = self._load_cached(keys) if self.use_cache else {}
+
+        pending = {}
+        for index, key in enumerate(keys):
+            if key in cached:
+                yield index, cached[key], {"cached": True, "attempts": 0}
+            else:
+                pending[index] = 0
+
+        executed = bool(pending)
+        isolate = False
+        context = multiprocessing.get_context("spawn")
+        while pending:
+            # ワーカーの異常終了後は、巻き添えを防ぐため1セル1プールに切り替える
+            batch = list(pending)[:self.max_workers] if isolate else list(pending)
+            retry = {index: pending[index] for index in pending if index not in batch}
+            groups = [[index] for index in batch] if isolate else [batch]
+            executors = []
+            futures = {}
+            try:
+                for group in groups:
+                    # max_tasks_per_child=1: 各セルを新しいプロセスで実行
+                    executor = ProcessPoolExecutor(max_workers=min(self.max_workers, len(group)),
+                                                   mp_context=context, max_tasks_per_child=1)
+                    executors.append(executor)
+                    for index in group:
+                        model, dataset = cells[index]
+                        future = executor.submit(_run_cell, self.benchmark, model, dataset, num_samples)
+                        futures[future] = index
+
+                for future in as_completed(futures):
+                    index = futures[future]
+                    attempts = pending[index] + 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        isolate = isolate or isinstance(e, BrokenProcessPool)
+                        if attempts <= self.max_retries:
+                            retry[index] = attempts
+                        else:
+                            yield index, None, {"cached": False, "attempts": attempts,
+                                                "error": f"{type(e).__name__}: {e}"}
+                        continue
+
+                    self.store.append(CELL_TABLE, [{
+                        "cell_key": keys[index],
+                        "timestamp": datetime.now().isoformat(),
+                        "attempts": attempts,
+                        "result": result
+                    }])
+                    yield index, result, {"cached": False, "attempts": attempts}
+            finally:
+                for executor in executors:
+                    executor.shutdown()
+            pending = retry
+
+        if executed:
+            # セルごとの小さなパートをまとめ、同じセルは最新の結果だけを残す
+            self.store.compact(CELL_TABLE, key="cell_key")
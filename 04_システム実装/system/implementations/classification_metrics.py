@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+分類メトリクスエンジン（NumPyベクトル化版）
+混同行列 (..., C, C) の先頭軸をまとめて処理し、クラス別 / マクロ / マイクロ / 重み付き平均の
+適合率・再現率・F1、Cohen's kappa、MCC を一括計算する
+混同行列はラベル配列から bincount で直接構築する（行=正解、列=予測）
+"""
+
+import numpy as np
+
+
+def confusion_matrix_from_labels(y_true, y_pred, num_classes):
+    """
+    ラベル配列から混同行列を構築
+    y_true, y_pred: (n,) または (M, n) の整数ラベル → (C, C) または (M, C, C)
+    """
+    y_true = np.asarray(y_true, dtype=np.int64)
+    y_pred = np.asarray(y_pred, dtype=np.int64)
+    cells = num_classes * num_classes
+    flat = y_true * num_classes + y_pred
+
+    if flat.ndim == 1:
+        return np.bincount(flat, minlength=cells).reshape(num_classes, num_classes)
+
+    # 行列ごとにオフセットを加えて1回の bincount で全行列を集計
+    num_matrices = flat.shape[0]
+    offsets = np.arange(num_matrices, dtype=np.int64)[:, None] * cells
+    counts = np.bincount((flat + offsets).ravel(), minlength=num_matrices * cells)
+    return counts.reshape(num_matrices, num_classes, num_classes)
+
+
+def _safe_divide(numerator, denominator):
+    """分母0の要素は0を返す除算"""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    out = np.zeros(np.broadcast(numerator, denominator).shape)
+    return np.divide(numerator, denominator, out=out, where=denominator != 0)
+
+
+def classification_metrics(confusion_matrices):
+    """
+    混同行列から全メトリクスを計算
+    confusion_matrices: (C, C) または (M, C, C)
+    戻り値: 配列の辞書（クラス別は (..., C)、集約値は (...)）
+    """
+    cm = np.asarray(confusion_matrices, dtype=float)
+    tp = np.diagonal(cm, axis1=-2, axis2=-1)
+    true_count = cm.sum(axis=-1)      # 各クラスの正解数（support）
+    pred_count = cm.sum(axis=-2)      # 各クラスの予測数
+    total = cm.sum(axis=(-2, -1))
+    correct = tp.sum(axis=-1)
+
+    precision = _safe_divide(tp, pred_count)
+    recall = _safe_divide(tp, true_count)
+    f1 = _safe_divide(2 * precision * recall, precision + recall)
+    weights = _safe_divide(true_count, total[..., None])
+
+    micro_precision = _safe_divide(correct, pred_count.sum(axis=-1))
+    micro_recall = _safe_divide(correct, true_count.sum(axis=-1))
+
+    # Cohen's kappa: 偶然一致率で補正した一致率
+    accuracy = _safe_divide(correct, total)
+    expected = _safe_divide((true_count * pred_count).sum(axis=-1), total ** 2)
+    kappa = _safe_divide(accuracy - expected, 1 - expected)
+
+    # 多クラスMCC（Gorodkinの R_K 統計量）
+    covariance = correct * total - (true_count * pred_count).sum(axis=-1)
+    mcc = _safe_divide(
+        covariance,
+        np.sqrt((total ** 2 - (pred_count ** 2).sum(axis=-1)) *
+                (total ** 2 - (true_count ** 2).sum(axis=-1)))
+    )
+
+    return {
+        "accuracy": accuracy,
+        "precision": precision,
+        "recall": recall,
+        "f1_score": f1,
+        "support": true_count,
+        "macro_precision": precision.mean(axis=-1),
+        "macro_recall": recall.mean(axis=-1),
+        "macro_f1": f1.mean(axis=-1),
+        "micro_precision": micro_precision,
+        "micro_recall": micro_recall,
+        "micro_f1": _safe_divide(2 * micro_precision * micro_recall, micro_precision + micro_recall),
+        "weighted_precision": (precision * weights).sum(axis=-1),
+        "weighted_recall": (recall * weights).sum(axis=-1),
+        "weighted_f1": (f1 * weights).sum(axis=-1),
+        "cohens_kappa": kappa,
+        "mcc": mcc
+    }
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+コーパス一括分析ランナー
+画像ディレクトリまたはマニフェストを統合研究システムにストリーミング投入し、
+結果を逐次JSON Lines / Parquetへ書き出すバッチ処理システム（中断再開対応）
+"""
+
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from pathlib import Path
+
+from integrated_research_system import IntegratedResearchSystem
+
+# JSON Lines のチェックポイント用ヘルパーは 03_研究資料/research/experiments にある
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "03_研究資料" / "research" / "experiments"))
+from jsonl_checkpoint import iter_jsonl_records, open_jsonl_for_append
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet出力はオプション
+    pa = None
+    pq = None
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
+
+class CorpusAnalysisRunner:
+    def __init__(self, output_path=None, output_format="jsonl", num_workers=4,
+                 flush_every=100, progress_every=100, system=None):
+        self.name = "コーパス一括分析ランナー"
+        self.version = "1.0.0"
+        if output_format not in ("jsonl", "parquet"):
+            raise ValueError(f"未対応の出力形式です: {output_format}")
+        if output_format == "parquet" and pq is None:
+            raise ImportError("Parquet出力には pyarrow が必要です")
+
+        self.output_format = output_format
+        self.num_workers = num_workers
+        self.flush_every = flush_every  # Parquet: 1パートファイルあたりの行数
+        self.progress_every = progress_every
+
+        default_name = "results.jsonl" if output_format == "jsonl" else "results_parquet"
+        self.output_path = Path(output_path) if output_path else Path("output/corpus_runs") / default_name
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 各画像のステージ並列分が詰まらないよう、ワーカー数に応じてステージスレッドを確保
+        self.system = system or IntegratedResearchSystem(
+            verbose=False, stage_workers=max(4, num_workers * 3)
+        )
+
+    # ---- 入力 ----
+
+    def iter_directory(self, directory):
+        """ディレクトリ内の画像を遅延列挙"""
+        directory = Path(directory)
+        for path in directory.rglob("*"):
+            if path.suffix.lower() in IMAGE_EXTENSIONS and path.is_file():
+                yield {
+                    "id": path.relative_to(directory).as_posix(),
+                    "path": str(path)
+                }
+
+    def iter_manifest(self, manifest_path):
+        """マニフェスト（.jsonl / .json / パス一覧テキスト）を遅延読み込み"""
+        manifest_path = Path(manifest_path)
+        if manifest_path.suffix == ".json":
+            with open(manifest_path, encoding="utf-8") as f:
+                entries = json.load(f)
+            for entry in entries:
+                yield self._normalize_entry(entry)
+            return
+
+        with open(manifest_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if manifest_path.suffix == ".jsonl":
+                    yield self._normalize_entry(json.loads(line))
+                else:
+                    yield self._normalize_entry(line)
+
+    def _normalize_entry(self, entry):
+        """マニフェスト要素を image_data 形式へ変換"""
+        if isinstance(entry, str):
+            return {"id": entry, "path": entry}
+        entry = dict(entry)
+        entry.setdefault("id", entry.get("path", "unknown"))
+        return entry
+
+    def iter_source(self, source):
+        """入力元に応じたイテレータを返す"""
+        source = Path(source)
+        if source.is_dir():
+            return self.iter_directory(source)
+        return self.iter_manifest(source)
+
+    # ---- チェックポイント ----
+
+    def load_completed_ids(self):
+        """既存出力から処理済み画像IDを復元（クラッシュ後の再開用）"""
+        completed = set()
+        if self.output_format == "jsonl":
+            if not self.output_path.exists():
+                return completed
+            # クラッシュ時に途中まで書かれた最終行は未処理扱い
+            completed.update(record["image_id"] for record in iter_jsonl_records(self.output_path)
+                             if "image_id" in record)
+        else:
+            if not self.output_path.exists():
+                return completed
+            for part in sorted(self.output_path.glob("part-*.parquet")):
+                try:
+                    table = pq.read_table(part, columns=["image_id"])
+                except Exception:
+                    continue  # 書き込み途中のパートは破棄して再処理
+                completed.update(table.column("image_id").to_pylist())
+        return completed
+
+    # ---- 出力 ----
+
+    def _open_writer(self):
+        if self.output_format == "jsonl":
+            # 途中まで書かれた最終行を切り詰めてから追記する
+            return open_jsonl_for_append(self.output_path)
+        self.output_path.mkdir(parents=True, exist_ok=True)
+        return None
+
+    def _write_parquet_part(self, rows):
+        """バッファ済みの行を1パートファイルとして書き出し"""
+        if not rows:
+            return
+        part_index = len(list(self.output_path.glob("part-*.parquet")))
+        part_path = self.output_path / f"part-{part_index:05d}.parquet"
+        tmp_path = part_path.with_suffix(".tmp")
+        table = pa.Table.from_pylist(rows)
+        pq.write_table(table, tmp_path)
+        tmp_path.replace(part_path)  # 完成したパートのみが再開時に読まれる
+
+    def _to_row(self, result):
+        """Parquet用のフラットな行に変換"""
+        score = result.get("integrated_score", {})
+        return {
+            "image_id": str(result.get("image_id")),
+            "timestamp": result.get("timestamp"),
+            "total_processing_time": result.get("total_processing_time"),
+            "overall_score": score.get("overall_score"),
+            "error": result.get("error"),
+            "result_json": json.dumps(result, ensure_ascii=False)
+        }
+
+    # ---- 実行 ----
+
+    def run(self, source, resume=True, limit=None):
+        """コーパス全体を処理"""
+        completed_ids = self.load_completed_ids() if resume else set()
+        if completed_ids:
+            print(f"♻️ チェックポイントから再開: {len(completed_ids)}件処理済み")
+
+        stats = {"processed": 0, "failed": 0, "skipped": len(completed_ids)}
+        writer = self._open_writer()
+        parquet_buffer = []
+        max_in_flight = self.num_workers * 2  # 先読みを制限してメモリを抑える
+        start = time.time()
+
+        def handle(result):
+            stats["processed"] += 1
+            if "error" in result:
+                stats["failed"] += 1
+            if writer is not None:
+                writer.write(json.dumps(result, ensure_ascii=False) + "\n")
+                writer.flush()
+            else:
+                parquet_buffer.append(self._to_row(result))
+                if len(parquet_buffer) >= self.flush_every:
+                    self._write_parquet_part(parquet_buffer)
+                    parquet_buffer.clear()
+            if stats["processed"] % self.progress_every == 0:
+                elapsed = time.time() - start
+                print(f"  📈 {stats['processed']}件処理 ({stats['processed'] / elapsed:.1f} 画像/秒)")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.num_workers,
+                                    thread_name_prefix="CorpusWorker") as executor:
+                in_flight = set()
+                submitted = 0
+                for image_data in self.iter_source(source):
+                    if image_data["id"] in completed_ids:
+                        continue
+                    if limit is not None and submitted >= limit:
+                        break
+                    in_flight.add(executor.submit(self.system.run_integrated_analysis, image_data))
+                    submitted += 1
+                    if len(in_flight) >= max_in_flight:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            handle(future.result())
+                for future in in_flight:
+                    handle(future.result())
+        finally:
+            if writer is not None:
+                writer.close()
+            else:
+                self._write_parquet_part(parquet_buffer)
+
+        elapsed = time.time() - start
+        summary = {
+            "timestamp": datetime.now().isoformat(),
+            "source": str(source),
+            "output": str(self.output_path),
+            "processed": stats["processed"],
+            "failed": stats["failed"],
+            "skipped_from_checkpoint": stats["skipped"],
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_images_per_sec": round(stats["processed"] / elapsed, 2) if elapsed > 0 else 0.0,
+            "num_workers": self.num_workers
+        }
+        return summary
+
+
+def main():
+    """実行例: python corpus_runner.py <画像ディレクトリ|マニフェスト> [ワーカー数] [jsonl|parquet]"""
+    if len(sys.argv) < 2:
+        print("使い方: python corpus_runner.py <画像ディレクトリ|マニフェスト> [ワーカー数] [jsonl|parquet]")
+        return
+
+    source = sys.argv[1]
+    num_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    output_format = sys.argv[3] if len(sys.argv) > 3 else "jsonl"
+
+    print("📚 コーパス一括分析ランナー 起動")
+    print("=" * 50)
+    runner = CorpusAnalysisRunner(output_format=output_format, num_workers=num_workers)
+    summary = runner.run(source)
+
+    print("\n📊 処理サマリー:")
+    print(f"  処理件数: {summary['processed']} (失敗 {summary['failed']})")
+    print(f"  チェックポイントからスキップ: {summary['skipped_from_checkpoint']}")
+    print(f"  所要時間: {summary['elapsed_seconds']}秒")
+    print(f"  スループット: {summary['throughput_images_per_sec']} 画像/秒")
+    print(f"💾 出力: {summary['output']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,16 @@
 
 import json
 import os
+import sys
 from datetime import datetime
 from pathlib import Path
 import random
 from collections import defaultdict
 
+# 共有結果ストアは 03_研究資料/research/experiments にある
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "03_研究資料" / "research" / "experiments"))
+from results_store import ResultsStore
+
 class DynamicDatasetSelector:
     def __init__(self):
         self.name = "動的データセット選択エンジン"
@@ -19,6 +24,8 @@ class DynamicDatasetSelector:
         self.selection_history = []
         self.output_dir = Path("output/dataset_selections")
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.store = ResultsStore()
+        self._stored_selections = 0  # ストアへ追記済みの履歴件数
         
     def _initialize_datasets(self):
         """利用可能なデータセット情報を初期化"""
@@ -291,7 +298,7 @@ class DynamicDatasetSelector:
         return " / ".join(reasons) if reasons else "総合的なバランスが良い"
     
     def generate_selection_report(self):
-        """選択履歴レポートを生成"""
+        """選択履歴レポートを生成（履歴は共有結果ストアに追記）"""
         if not self.selection_history:
             return "選択履歴がありません"
         
@@ -316,14 +323,22 @@ class DynamicDatasetSelector:
         for dataset_id, scores in report["average_scores"].items():
             report["average_scores"][dataset_id] = round(sum(scores) / len(scores), 3)
         
-        # レポート作成
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        report_path = self.output_dir / f"selection_report_{timestamp}.json"
-        
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2, default=dict)
+        # 未保存の選択履歴を共有結果ストアの dataset_selection テーブルに追記
+        new_selections = self.selection_history[self._stored_selections:]
+        self.store.append("dataset_selection", [
+            dict(
+                selection,
+                top_dataset_id=selection["recommended_datasets"][0]["dataset_id"],
+                top_score=selection["recommended_datasets"][0]["score"]
+            )
+            for selection in new_selections if selection["recommended_datasets"]
+        ])
+        self._stored_selections = len(self.selection_history)
         
-        return report_path
+        report = {key: dict(value) if isinstance(value, defaultdict) else value
+                  for key, value in report.items()}
+        report["store"] = f"{self.store.root} (dataset_selection)"
+        return report
     
     def export_configuration(self):
         """システム設定をエクスポート"""
@@ -388,8 +403,9 @@ def main():
             print(f"       理由: {rec['reason']}")
     
     # 選択レポート生成
-    report_path = selector.generate_selection_report()
-    print(f"\n📊 選択レポート生成: {report_path}")
+    report = selector.generate_selection_report()
+    print(f"\n📊 選択レポート: {report['total_selections']}件 "
+          f"(データセット使用回数: {report['dataset_usage']}) → {report['store']}")
     
     print("\n✨ システム準備完了")
 
@@ -19,19 +19,27 @@ from collections import defaultdict
 import threading
 import queue
 
-# 実装済みシステムのインポート
-from wordnet_hierarchy_visualizer import WordNetHierarchyVisualizer
-from multi_object_detection_api import MultiObjectDetectionAPI
-from dynamic_dataset_selector import DynamicDatasetSelector
-from realtime_image_processor import RealtimeImageProcessor
-from auto_evaluation_benchmark import AutoEvaluationBenchmark
+# 実装済みシステムは初回利用時に遅延インポート（起動時間短縮）
+from system_registry import LazySystemRegistry
+from stage_orchestrator import StageOrchestrator
+
+# サブシステム名 → (モジュール名, クラス名)
+SYSTEM_SPECS = {
+    "wordnet_visualizer": ("wordnet_hierarchy_visualizer", "WordNetHierarchyVisualizer"),
+    "detection_api": ("multi_object_detection_api", "MultiObjectDetectionAPI"),
+    "dataset_selector": ("dynamic_dataset_selector", "DynamicDatasetSelector"),
+    "realtime_processor": ("realtime_image_processor", "RealtimeImageProcessor"),
+    "benchmark_system": ("auto_evaluation_benchmark", "AutoEvaluationBenchmark")
+}
 
 class IntegratedResearchSystem:
-    def __init__(self):
+    def __init__(self, verbose=True, stage_workers=4, warm_up=False):
         self.name = "WordNet-based統合研究システム"
         self.version = "3.0.0"
         self.research_accuracy = 87.1  # 現在の研究精度
         self.session_number = 13  # 次回セッション番号
+        self.verbose = verbose  # Falseでステップごとの進捗表示を抑制（コーパス処理用）
+        self.stage_workers = stage_workers
         
         # 研究進捗情報
         self.research_context = {
@@ -44,8 +52,17 @@ class IntegratedResearchSystem:
             "graduation_target": "2026年2月"
         }
         
-        # システム初期化
-        self.systems = self._initialize_systems()
+        # システム初期化（遅延生成。warm_up=Trueでバックグラウンド事前生成）
+        self.systems = self._initialize_systems(warm_up)
+        
+        # 統合分析ステージのデッドライン（秒）
+        self.stage_timeouts = {
+            "dataset_selection": 5.0,
+            "wordnet_analysis": 5.0,
+            "multi_detection": 10.0,
+            "realtime_processing": 5.0
+        }
+        self.orchestrator = self._build_analysis_pipeline()
         self.output_dir = Path("output/integrated_research")
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -57,19 +74,20 @@ class IntegratedResearchSystem:
             "integration_results": []
         }
         
-    def _initialize_systems(self):
-        """5つのシステムを初期化"""
-        print("🔧 研究システム初期化中...")
-        
-        systems = {
-            "wordnet_visualizer": WordNetHierarchyVisualizer(),
-            "detection_api": MultiObjectDetectionAPI(),
-            "dataset_selector": DynamicDatasetSelector(),
-            "realtime_processor": RealtimeImageProcessor(),
-            "benchmark_system": AutoEvaluationBenchmark()
-        }
+    def _log(self, message):
+        """進捗表示（verbose時のみ）"""
+        if self.verbose:
+            print(message)
+    
+    def _initialize_systems(self, warm_up=False):
+        """5つのシステムをレジストリに登録（生成は初回利用時）"""
+        systems = LazySystemRegistry(SYSTEM_SPECS)
         
-        print("✅ 5つのシステム初期化完了")
+        if warm_up:
+            self._log("🔧 研究システムをバックグラウンドで初期化中...")
+            systems.warm_up(background=True)
+        else:
+            self._log("✅ 5つのシステムを登録（初回利用時に初期化）")
         return systems
     
     def generate_research_overview(self):
@@ -100,9 +118,73 @@ class IntegratedResearchSystem:
         
         return overview
     
+    def _build_analysis_pipeline(self):
+        """統合分析のステージ依存関係(DAG)を構築"""
+        orchestrator = StageOrchestrator(max_workers=self.stage_workers)
+        timeouts = self.stage_timeouts
+        
+        # データセット選択・WordNet分析・多層検出は互いに独立
+        orchestrator.add_stage(
+            "dataset_selection", self._stage_dataset_selection,
+            timeout=timeouts["dataset_selection"]
+        )
+        orchestrator.add_stage(
+            "wordnet_analysis", self._stage_wordnet_analysis,
+            timeout=timeouts["wordnet_analysis"]
+        )
+        orchestrator.add_stage(
+            "multi_detection", self._stage_multi_detection,
+            timeout=timeouts["multi_detection"]
+        )
+        # リアルタイム処理評価は検出結果を受け取って実行
+        orchestrator.add_stage(
+            "realtime_processing", self._stage_realtime_processing,
+            depends_on=["multi_detection"],
+            timeout=timeouts["realtime_processing"]
+        )
+        return orchestrator
+    
+    def _stage_dataset_selection(self, image_data, upstream):
+        """1. データセット選択（最適化）"""
+        self._log("  📊 動的データセット選択中...")
+        return self.systems["dataset_selector"].select_optimal_dataset(
+            image_data, top_k=3
+        )
+    
+    def _stage_wordnet_analysis(self, image_data, upstream):
+        """2. WordNet階層分析"""
+        self._log("  🌳 WordNet階層分析中...")
+        categories = image_data.get("detected_categories", ["person", "vehicle"])
+        if len(categories) >= 2:
+            return self.systems["wordnet_visualizer"].analyze_concept_relationships(
+                categories[0], categories[1]
+            )
+        # 単一カテゴリの場合は基本情報のみ
+        return {
+            "single_concept": categories[0] if categories else "unknown",
+            "hierarchy_depth": 3,
+            "analysis_type": "single_concept"
+        }
+    
+    def _stage_multi_detection(self, image_data, upstream):
+        """3. 多層物体検出"""
+        self._log("  🎯 多層物体検出実行中...")
+        return self.systems["detection_api"].detect_objects_multi_layer(image_data)
+    
+    def _stage_realtime_processing(self, image_data, upstream):
+        """4. リアルタイム処理評価（検出結果を引き継ぐ）"""
+        self._log("  ⚡ リアルタイム処理評価中...")
+        frame_data = dict(image_data)
+        frame_data["detections"] = upstream["multi_detection"].get("integrated_detections", [])
+        return self.systems["realtime_processor"].process_frame(frame_data)
+    
     def run_integrated_analysis(self, image_data):
         """統合分析実行 - 5システム連携処理"""
-        print("🔍 統合分析開始...")
+        return asyncio.run(self.run_integrated_analysis_async(image_data))
+    
+    async def run_integrated_analysis_async(self, image_data):
+        """統合分析実行（非同期版） - 独立ステージを並列実行"""
+        self._log("🔍 統合分析開始...")
         analysis_start = time.time()
         
         results = {
@@ -112,53 +194,28 @@ class IntegratedResearchSystem:
         }
         
         try:
-            # 1. データセット選択（最適化）
-            print("  📊 動的データセット選択中...")
-            dataset_result = self.systems["dataset_selector"].select_optimal_dataset(
-                image_data, top_k=3
-            )
-            results["systems_results"]["dataset_selection"] = dataset_result
-            
-            # 2. WordNet階層分析
-            print("  🌳 WordNet階層分析中...")
-            categories = image_data.get("detected_categories", ["person", "vehicle"])
-            if len(categories) >= 2:
-                wordnet_result = self.systems["wordnet_visualizer"].analyze_concept_relationships(
-                    categories[0], categories[1]
+            run = await self.orchestrator.run_async(image_data)
+            results["systems_results"] = run["outputs"]
+            results["stage_spans"] = run["spans"]
+            results["critical_path_time"] = run["critical_path_time"]
+            results["sequential_time"] = run["sequential_time"]
+            if run["errors"]:
+                results["stage_errors"] = run["errors"]
+                results["error"] = "; ".join(
+                    f"{stage}: {message}" for stage, message in run["errors"].items()
                 )
-            else:
-                # 単一カテゴリの場合は基本情報のみ
-                wordnet_result = {
-                    "single_concept": categories[0] if categories else "unknown",
-                    "hierarchy_depth": 3,
-                    "analysis_type": "single_concept"
-                }
-            results["systems_results"]["wordnet_analysis"] = wordnet_result
-            
-            # 3. 多層物体検出
-            print("  🎯 多層物体検出実行中...")
-            detection_result = self.systems["detection_api"].detect_objects_multi_layer(
-                image_data
-            )
-            results["systems_results"]["multi_detection"] = detection_result
-            
-            # 4. リアルタイム処理評価
-            print("  ⚡ リアルタイム処理評価中...")
-            realtime_result = self.systems["realtime_processor"].process_frame(
-                image_data
-            )
-            results["systems_results"]["realtime_processing"] = realtime_result
+                self._log(f"⚠️ 一部ステージ失敗: {results['error']}")
             
             # 5. 総合評価計算
             total_time = time.time() - analysis_start
             results["total_processing_time"] = round(total_time, 3)
             results["integrated_score"] = self._calculate_integrated_score(results)
             
-            print(f"✅ 統合分析完了 ({total_time:.3f}秒)")
+            self._log(f"✅ 統合分析完了 ({total_time:.3f}秒, クリティカルパス {run['critical_path_time']:.3f}秒)")
             return results
             
         except Exception as e:
-            print(f"❌ 統合分析エラー: {e}")
+            self._log(f"❌ 統合分析エラー: {e}")
             results["error"] = str(e)
             return results
     
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+モデル計測レイヤー
+評価対象モデルの推論関数をラップし、実機での資源使用量を計測する
+- ウォームアップ後、全サンプルを反復実行してサンプルあたりの実時間 / CPU時間と持続スループットを計測
+- tracemalloc による推論中の割り当てピーク（Pythonヒープ + NumPy配列）
+- プロセスのピークRSS（ベンチマークセルは使い捨てプロセスで実行されるため、そのセルのピークになる）
+
+モデル設定に "entrypoint": "モジュール名:関数名" があれば、その関数に (model_config, dataset_config) を
+渡して推論関数 predict(batch) -> 予測ラベル を得る。無い場合は NumPy の参照モデルを使う
+"""
+
+import gc
+import importlib
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 参照モデルの隠れ層の幅（entrypoint の無いモデル名に対応する計算規模）
+REFERENCE_ARCHITECTURES = {
+    "resnet50": {"hidden_layers": [1024, 1024, 512]},
+    "efficientnet": {"hidden_layers": [768, 512, 512]},
+    "mobilenet": {"hidden_layers": [256, 128]},
+    "custom_model": {"hidden_layers": [1024, 512]},
+    "ensemble": {"hidden_layers": [1024, 512], "members": 3}
+}
+DEFAULT_ARCHITECTURE = {"hidden_layers": [512, 256]}
+DEFAULT_INPUT_SHAPE = (32, 32, 3)
+
+
+class ReferenceModel:
+    """全結合ReLUネットワーク（members > 1 ならロジット平均のアンサンブル）"""
+
+    def __init__(self, input_dim, hidden_layers, num_classes, members=1, seed=0):
+        rng = np.random.default_rng(seed)
+        sizes = [input_dim, *hidden_layers, num_classes]
+        self.members = [
+            [(rng.standard_normal((n_in, n_out), dtype=np.float32) / np.sqrt(n_in)).astype(np.float32)
+             for n_in, n_out in zip(sizes[:-1], sizes[1:])]
+            for _ in range(members)
+        ]
+
+    def __call__(self, batch):
+        x = batch.reshape(len(batch), -1)
+        logits = 0
+        for weights in self.members:
+            h = x
+            for w in weights[:-1]:
+                h = np.maximum(h @ w, 0)
+            logits = logits + h @ weights[-1]
+        return np.argmax(logits, axis=1)
+
+
+def load_model(model_config, dataset_config):
+    """モデル設定から推論関数を生成"""
+    entrypoint = model_config.get("entrypoint")
+    if entrypoint:
+        module_name, func_name = entrypoint.split(":")
+        factory = getattr(importlib.import_module(module_name), func_name)
+        return factory(model_config, dataset_config)
+
+    architecture = {**REFERENCE_ARCHITECTURES.get(model_config["name"], DEFAULT_ARCHITECTURE),
+                    **{k: model_config[k] for k in ("hidden_layers", "members") if k in model_config}}
+    input_shape = tuple(dataset_config.get("input_shape", DEFAULT_INPUT_SHAPE))
+    return ReferenceModel(
+        input_dim=int(np.prod(input_shape)),
+        hidden_layers=architecture["hidden_layers"],
+        num_classes=dataset_config.get("num_classes", 5),
+        members=architecture.get("members", 1)
+    )
+
+
+def synthetic_inputs(dataset_config, num_samples, seed=0):
+    """データセット設定の入力形状に合わせた計測用入力 (num_samples, *input_shape)"""
+    input_shape = tuple(dataset_config.get("input_shape", DEFAULT_INPUT_SHAPE))
+    rng = np.random.default_rng(seed)
+    return rng.random((num_samples, *input_shape), dtype=np.float32)
+
+
+def peak_rss_mb():
+    """プロセス開始以降のピークRSS（MB）。取得できない環境では None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS はバイト単位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class ModelProfiler:
+    def __init__(self, warmup_batches=3, repetitions=5, batch_size=16):
+        self.warmup_batches = warmup_batches
+        self.repetitions = repetitions
+        self.batch_size = batch_size
+
+    def _batches(self, inputs):
+        return [inputs[i:i + self.batch_size] for i in range(0, len(inputs), self.batch_size)]
+
+    def profile(self, predict_fn, inputs):
+        """
+        推論関数を計測
+        戻り値: サンプルあたりの時間（ms）・持続スループット（samples/s）・メモリ（MB）と
+                バッチごとのサンプルあたり遅延の系列（回帰検出などの統計比較用）
+        """
+        batches = self._batches(inputs)
+        num_samples = len(inputs)
+
+        # ウォームアップ（遅延初期化・キャッシュ・BLASスレッド起動を計測から除く）
+        for batch in batches[:self.warmup_batches]:
+            predict_fn(batch)
+
+        latencies = []
+        cpu_times = []
+        throughputs = []
+        gc.collect()
+        gc_was_enabled = gc.isenabled()
+        gc.disable()  # 計測中のGC停止による外れ値を避ける（timeit と同じ方針）
+        try:
+            for _ in range(self.repetitions):
+                wall_start = time.perf_counter()
+                cpu_start = time.process_time()
+                for batch in batches:
+                    batch_start = time.perf_counter()
+                    predict_fn(batch)
+                    latencies.append((time.perf_counter() - batch_start) / len(batch) * 1000)
+                wall = time.perf_counter() - wall_start
+                cpu_times.append((time.process_time() - cpu_start) / num_samples * 1000)
+                throughputs.append(num_samples / wall)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        # 割り当て計測は tracemalloc のオーバーヘッドが時間計測に混ざらないよう別パスで行う
+        tracemalloc.start()
+        try:
+            for batch in batches:
+                predict_fn(batch)
+            _, allocated_peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        rss = peak_rss_mb()
+        allocated_mb = allocated_peak / (1024 * 1024)
+        return {
+            "processing_time": statistics.median(latencies),
+            "processing_time_p95": float(np.percentile(latencies, 95)),
+            "cpu_time": statistics.median(cpu_times),
+            "throughput": statistics.median(throughputs),
+            "memory_usage": rss if rss is not None else allocated_mb,
+            "allocated_memory": allocated_mb,
+            "peak_rss": rss,
+            "latency_samples": [round(v, 5) for v in latencies],
+            "settings": {
+                "warmup_batches": self.warmup_batches,
+                "repetitions": self.repetitions,
+                "batch_size": self.batch_size,
+                "num_samples": num_samples
+            }
+        }
@@ -161,7 +161,8 @@ class RealtimeImageProcessor:
             classified = self.classify_scene(features)
             results["classification"] = classified
             
-            final = self.postprocess_results(results)
+            # コピーを渡して結果辞書の循環参照を防ぐ（JSONシリアライズ可能に保つ）
+            final = self.postprocess_results(dict(results))
             results["postprocessing"] = final
             
             # 処理時間記録
@@ -301,7 +302,7 @@ from realtime_image_processor import RealtimeImageProcessor
 
 processor = RealtimeImageProcessor()
 
-async def handle_client(websocket, path):
+async def handle_client(websocket, path=None):
     """クライアント接続処理"""
     print(f"新規接続: {websocket.remote_address}")
     
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+ステージ並列実行オーケストレーター
+依存関係(DAG)に基づいて独立したサブシステムを並列実行し、
+各ステージの実行区間(スパン)とデッドラインを管理するモジュール
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PipelineStage:
+    """パイプラインの1ステージ定義"""
+
+    def __init__(self, name, func, depends_on=(), timeout=None):
+        self.name = name
+        self.func = func  # func(context, upstream) -> 出力
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout  # 秒（Noneで無制限）
+
+
+class StageOrchestrator:
+    def __init__(self, max_workers=4):
+        self.name = "ステージ並列実行オーケストレーター"
+        self.version = "1.0.0"
+        self.stages = {}
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="StageWorker"
+        )
+
+    def add_stage(self, name, func, depends_on=(), timeout=None):
+        """ステージを登録"""
+        if name in self.stages:
+            raise ValueError(f"ステージ {name} は既に登録されています")
+        self.stages[name] = PipelineStage(name, func, depends_on, timeout)
+        return self
+
+    def topological_order(self):
+        """依存関係を解決した実行順序を返す"""
+        order = []
+        state = {}  # name -> "visiting" / "done"
+
+        def visit(name):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"ステージ依存関係に循環があります: {name}")
+            if name not in self.stages:
+                raise ValueError(f"未登録のステージに依存しています: {name}")
+            state[name] = "visiting"
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            state[name] = "done"
+            order.append(self.stages[name])
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    async def run_async(self, context):
+        """全ステージを依存関係に従って並列実行"""
+        loop = asyncio.get_running_loop()
+        origin = time.perf_counter()
+        outputs, spans, errors = {}, {}, {}
+        tasks = {}
+
+        async def run_stage(stage):
+            if stage.depends_on:
+                await asyncio.gather(*(tasks[d] for d in stage.depends_on))
+
+            # 上流が失敗したステージはスキップ
+            failed = [d for d in stage.depends_on if d not in outputs]
+            if failed:
+                errors[stage.name] = f"依存ステージ失敗: {', '.join(failed)}"
+                now = round(time.perf_counter() - origin, 4)
+                spans[stage.name] = {
+                    "start": now, "end": now, "duration": 0.0,
+                    "status": "skipped", "depends_on": list(stage.depends_on)
+                }
+                return
+
+            upstream = {d: outputs[d] for d in stage.depends_on}
+            start = time.perf_counter()
+            status = "completed"
+            try:
+                future = loop.run_in_executor(self.executor, stage.func, context, upstream)
+                outputs[stage.name] = await asyncio.wait_for(future, stage.timeout)
+            except asyncio.TimeoutError:
+                # 実行中のスレッドは中断できないため、結果を破棄して後続を進める
+                status = "timeout"
+                errors[stage.name] = f"デッドライン超過 ({stage.timeout}秒)"
+            except Exception as e:
+                status = "error"
+                errors[stage.name] = str(e)
+            end = time.perf_counter()
+
+            spans[stage.name] = {
+                "start": round(start - origin, 4),
+                "end": round(end - origin, 4),
+                "duration": round(end - start, 4),
+                "status": status,
+                "depends_on": list(stage.depends_on)
+            }
+
+        for stage in self.topological_order():
+            tasks[stage.name] = asyncio.ensure_future(run_stage(stage))
+        await asyncio.gather(*tasks.values())
+
+        wall_time = time.perf_counter() - origin
+        return {
+            "outputs": outputs,
+            "spans": spans,
+            "errors": errors,
+            "wall_time": round(wall_time, 4),
+            "sequential_time": round(sum(s["duration"] for s in spans.values()), 4),
+            "critical_path_time": round(self.critical_path_time(spans), 4)
+        }
+
+    def run(self, context):
+        """同期呼び出し用ラッパー"""
+        return asyncio.run(self.run_async(context))
+
+    def critical_path_time(self, spans):
+        """スパンからクリティカルパス長（理論最短時間）を計算"""
+        finish = {}
+        for stage in self.topological_order():
+            span = spans.get(stage.name, {})
+            ready = max((finish[d] for d in stage.depends_on), default=0.0)
+            finish[stage.name] = ready + span.get("duration", 0.0)
+        return max(finish.values(), default=0.0)
+
+    def shutdown(self):
+        """ワーカースレッドを解放"""
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+起動時間ベンチマーク
+統合研究システムのインポートコスト・初期化時間・コールドスタート遅延を
+毎回新しいPythonプロセスで計測する（サーバーレス環境の起動を想定）
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# 子プロセス内で実行する計測コード
+PROBE_CODE = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import integrated_research_system
+t1 = time.perf_counter()
+system = integrated_research_system.IntegratedResearchSystem(verbose=False, warm_up=False)
+if sys.argv[1] == "eager":
+    system.systems.warm_up(background=False)
+t3 = time.perf_counter()
+image = {"id": "startup_probe", "detected_categories": ["person", "vehicle"]}
+system.run_integrated_analysis(image)
+t4 = time.perf_counter()
+system.run_integrated_analysis(image)
+t5 = time.perf_counter()
+print(json.dumps({
+    "import_time": t1 - t0,
+    "init_time": t3 - t1,
+    "cold_start_time": t4 - t0,
+    "first_analysis_time": t4 - t3,
+    "warm_analysis_time": t5 - t4,
+    "subsystem_load_times": system.systems.load_times
+}))
+'''
+
+
+class StartupBenchmark:
+    def __init__(self, repetitions=5):
+        self.name = "起動時間ベンチマーク"
+        self.version = "1.0.0"
+        self.repetitions = repetitions
+        self.module_dir = Path(__file__).resolve().parent
+        self.output_dir = Path("output/startup_benchmarks")
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def _run_probe(self, mode):
+        """新しいプロセスで1回計測"""
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [str(self.module_dir), env.get("PYTHONPATH")])
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE_CODE, mode],
+            capture_output=True, text=True, env=env, check=True
+        )
+        # 計測結果は最終行のJSON
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def run(self):
+        """lazy / eager 両モードを計測"""
+        results = {
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "repetitions": self.repetitions,
+            "modes": {}
+        }
+
+        for mode in ("lazy", "eager"):
+            runs = [self._run_probe(mode) for _ in range(self.repetitions)]
+            summary = {}
+            for key in ("import_time", "init_time", "cold_start_time",
+                        "first_analysis_time", "warm_analysis_time"):
+                values = [run[key] for run in runs]
+                summary[key] = {
+                    "median": round(statistics.median(values), 4),
+                    "min": round(min(values), 4),
+                    "max": round(max(values), 4)
+                }
+            summary["subsystem_load_times"] = runs[-1]["subsystem_load_times"]
+            results["modes"][mode] = summary
+
+        return results
+
+    def export_results(self, results):
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        json_path = self.output_dir / f"startup_benchmark_{timestamp}.json"
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        return str(json_path)
+
+
+def main():
+    """実行例"""
+    print("⏱️ 起動時間ベンチマーク 起動")
+    print("=" * 50)
+
+    benchmark = StartupBenchmark(repetitions=5)
+    results = benchmark.run()
+
+    for mode, summary in results["modes"].items():
+        print(f"\n📊 {mode} モード (中央値):")
+        print(f"  import: {summary['import_time']['median'] * 1000:.1f} ms")
+        print(f"  初期化: {summary['init_time']['median'] * 1000:.1f} ms")
+        print(f"  初回分析: {summary['first_analysis_time']['median'] * 1000:.1f} ms")
+        print(f"  2回目分析: {summary['warm_analysis_time']['median'] * 1000:.1f} ms")
+        print(f"  コールドスタート合計: {summary['cold_start_time']['median'] * 1000:.1f} ms")
+
+    json_path = benchmark.export_results(results)
+    print(f"\n💾 結果保存: {json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+サブシステム遅延初期化レジストリ
+モジュールのインポートとインスタンス生成を初回アクセス時まで遅延させ、
+起動時間とコールドスタート時間を短縮するためのレジストリ
+"""
+
+import importlib
+import threading
+import time
+
+
+class LazySystemRegistry:
+    """名前 → (モジュール名, クラス名) の定義から初回利用時に生成する辞書風コンテナ"""
+
+    def __init__(self, specs):
+        self.specs = dict(specs)
+        self._instances = {}
+        self._locks = {name: threading.Lock() for name in self.specs}
+        self.load_times = {}  # name -> {"import": 秒, "construct": 秒}
+        self._warmup_thread = None
+
+    def __getitem__(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self.specs:
+            raise KeyError(name)
+
+        # 並列ステージから同時に要求されても生成は1回だけ
+        with self._locks[name]:
+            if name not in self._instances:
+                module_name, class_name = self.specs[name]
+                start = time.perf_counter()
+                module = importlib.import_module(module_name)
+                imported = time.perf_counter()
+                self._instances[name] = getattr(module, class_name)()
+                constructed = time.perf_counter()
+                self.load_times[name] = {
+                    "import": round(imported - start, 4),
+                    "construct": round(constructed - imported, 4)
+                }
+        return self._instances[name]
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def keys(self):
+        return self.specs.keys()
+
+    def items(self):
+        """全サブシステムを生成して返す"""
+        return [(name, self[name]) for name in self.specs]
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def loaded_systems(self):
+        return [name for name in self.specs if name in self._instances]
+
+    def warm_up(self, names=None, background=True):
+        """サブシステムを事前生成（backgroundならバックグラウンドスレッドで実行）"""
+        names = list(names) if names is not None else list(self.specs)
+
+        def load_all():
+            for name in names:
+                self[name]
+
+        if not background:
+            load_all()
+            return None
+
+        self._warmup_thread = threading.Thread(
+            target=load_all,
+            name="SystemWarmUp",
+            daemon=True
+        )
+        self._warmup_thread.start()
+        return self._warmup_thread
+
+    def wait_until_ready(self, timeout=None):
+        """バックグラウンドのウォームアップ完了を待機"""
+        if self._warmup_thread is not None:
+            self._warmup_thread.join(timeout)
+        return not (self._warmup_thread and self._warmup_thread.is_alive())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+自動評価ベンチマークの回帰検出のテスト（python -m pytest test_auto_evaluation_benchmark.py）
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from auto_evaluation_benchmark import AutoEvaluationBenchmark
+
+DELAY_ENV = "BENCHMARK_TEST_DELAY_SECONDS"
+MODELS = [{"name": "delayed", "entrypoint": "test_auto_evaluation_benchmark:delayed_model"}]
+DATASETS = [{"name": "tiny", "num_classes": 3, "input_shape": [4, 4, 3]}]
+
+
+def delayed_model(model_config, dataset_config):
+    """
+    バッチごとに環境変数で指定した時間だけ計算し続ける推論関数（ワーカープロセスで生成される）
+    実時間で区切ったビジーループなので、処理時間・CPU時間ともに実行間でほぼ一定になる
+    """
+    delay = float(os.environ.get(DELAY_ENV, "0"))
+
+    def predict(batch):
+        end = time.perf_counter() + delay
+        while time.perf_counter() < end:
+            pass
+        return np.zeros(len(batch), dtype=np.int64)
+
+    return predict
+
+
+def _run(benchmark, **kwargs):
+    report = benchmark.run_comparative_benchmark(MODELS, DATASETS, max_workers=1, num_samples=64, **kwargs)
+    benchmark.export_results(report)
+    return report
+
+
+def _latency_change(diff):
+    (cell,) = diff["cells"]
+    return next(change for change in cell["changes"] if change["metric"] == "processing_time")
+
+
+def test_slower_second_run_is_flagged(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    benchmark = AutoEvaluationBenchmark()
+
+    monkeypatch.setenv(DELAY_ENV, "0")
+    _run(benchmark)
+    monkeypatch.setenv(DELAY_ENV, "0.005")
+    report = _run(benchmark)
+
+    assert not report["results"][0]["cached"]
+    diff = benchmark.compare_with_previous(report)
+    assert _latency_change(diff)["status"] == "regression"
+    assert any(r["metric"] == "processing_time" for r in diff["regressions"])
+
+
+def test_identical_runs_report_no_regressions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv(DELAY_ENV, "0.002")
+    benchmark = AutoEvaluationBenchmark()
+
+    _run(benchmark)
+    report = _run(benchmark)
+
+    diff = benchmark.compare_with_previous(report)
+    assert len(diff["cells"]) == 1
+    assert diff["regressions"] == []
+    # 精度系メトリクスはセルごとに固定のシードで生成されるため変わらない
+    (cell,) = diff["cells"]
+    quality = [change for change in cell["changes"] if not benchmark.metrics[change["metric"]]["unit"]]
+    assert quality and all(change["change"] == 0 for change in quality)
+
+
+def test_cached_cells_are_not_compared(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    benchmark = AutoEvaluationBenchmark()
+
+    _run(benchmark)
+    report = _run(benchmark, use_cache=True)
+
+    assert report["results"][0]["cached"]
+    diff = benchmark.compare_with_previous(report)
+    assert diff["cells"] == []
+    assert diff["cached_cells"] == [("delayed", "tiny")]
+    assert diff["regressions"] == []
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+コーパス一括分析ランナーの中断再開のテスト（python -m pytest test_corpus_runner.py）
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from corpus_runner import CorpusAnalysisRunner
+
+
+class EchoSystem:
+    """画像IDをそのまま返す統合システムの代わり"""
+
+    def run_integrated_analysis(self, image_data):
+        return {"image_id": image_data["id"], "integrated_score": {"overall_score": 1.0}}
+
+
+def test_resume_from_truncated_jsonl(tmp_path):
+    manifest = tmp_path / "manifest.txt"
+    ids = [f"img_{i:02d}.jpg" for i in range(12)]
+    manifest.write_text("\n".join(ids) + "\n", encoding="utf-8")
+
+    # 5件書き終えた後、6件目の途中でクラッシュした出力
+    output = tmp_path / "results.jsonl"
+    lines = [json.dumps({"image_id": image_id}) + "\n" for image_id in ids[:5]]
+    fragment = json.dumps({"image_id": ids[5]})[:10]
+    output.write_text("".join(lines) + fragment, encoding="utf-8")
+
+    runner = CorpusAnalysisRunner(output_path=output, num_workers=2, system=EchoSystem())
+    summary = runner.run(manifest)
+
+    assert summary["skipped_from_checkpoint"] == 5
+    assert summary["processed"] == 7
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert sorted(record["image_id"] for record in records) == ids
+    assert runner.load_completed_ids() == set(ids)
@@ -11,7 +11,7 @@ from realtime_image_processor import RealtimeImageProcessor
 
 processor = RealtimeImageProcessor()
 
-async def handle_client(websocket, path):
+async def handle_client(websocket, path=None):
     """クライアント接続処理"""
     print(f"新規接続: {websocket.remote_address}")
     